@@ -1,3 +1,41 @@
-from . import policy
+from importlib import import_module
 from .constants import *
-from .environment import Environment
+
+# The submodules are only imported when one of their names is used for the first time, so that "import Environment"
+# stays cheap for short-lived processes. Rendering, GIF recording and plotting load their dependencies on first use.
+LAZY_NAMES = {
+  "policy": (".policy", None),
+  "Environment": (".environment", "Environment"),
+  "VectorEnvironment": (".vector_environment", "VectorEnvironment"),
+  "Tracer": (".tracing", "Tracer"),
+  "FrameRecorder": (".recording", "FrameRecorder"),
+  "NumpyRenderer": (".raster", "NumpyRenderer"),
+  "TrafficSchedule": (".traffic", "TrafficSchedule"),
+}
+
+# "from Environment import *" provides the public constants and the lazy names. The star import loads the submodules
+# of the lazy names, but none of the optional dependencies.
+__all__ = [
+  "DIRECTION_UP", "DIRECTION_NONE", "DIRECTION_DOWN", "DIRECTIONS",
+  "DOOR_OPEN", "DOOR_CLOSED", "DOORS",
+  "ACTION_UP", "ACTION_DOWN", "ACTION_STOP", "ACTION_DOOR", "ACTION_NOOP", "ACTIONS",
+  "PASSENGER_DISTRIBUTION", "NUMBER_OF_FLOORS",
+  *LAZY_NAMES,
+]
+
+
+def __getattr__(name):
+  if name not in LAZY_NAMES:
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+  module_name, attribute = LAZY_NAMES[name]
+  module = import_module(module_name, __name__)
+  value = module if attribute is None else getattr(module, attribute)
+
+  # Later accesses do not pass through __getattr__ anymore
+  globals()[name] = value
+  return value
+
+
+def __dir__():
+  return sorted(set(globals()) | set(LAZY_NAMES))
@@ -0,0 +1,169 @@
+import numpy as np
+from .traffic import TrafficSchedule
+
+class ArrivalStream:
+  """
+  This class pre-draws the arrivals of persons for a block of timesteps and serves them tick by tick.
+
+  In every tick, a person with start i and destination j appears with probability distribution[i, j], independently
+  of all other cells and ticks. For a block of T ticks this is equivalent to drawing the number of arrivals of every
+  cell from Binomial(T, p) and placing them on distinct ticks chosen uniformly at random. Hence a whole block costs
+  one binomial draw plus one draw of tick positions per cell, and serving a tick is a slice of a sorted event list.
+
+  Arrivals are given as flat cell indices (start * floors + destination) in row-major order, i.e. in the same order
+  as np.where returns them for the full matrix.
+
+  With a TrafficSchedule, a block never extends over the end of a period of the schedule, hence every block is
+  drawn with the constant probabilities of its period.
+  """
+
+  def __init__(self, distribution, rng, block_size=4096, time=0):
+    """
+    Creates a stream and draws the first block.
+
+    Parameters
+    ----------
+    distribution : np.ndarray or TrafficSchedule
+      The probability of a new person per start and destination floor and tick, or a schedule of them.
+
+    rng : np.random.Generator
+      The random generator of the environment.
+
+    block_size : int
+      The maximal number of ticks drawn at once.
+
+    time : int
+      The tick of the first block, used to look up the period of the schedule.
+    """
+
+    if not isinstance(distribution, TrafficSchedule):
+      distribution = TrafficSchedule.constant(distribution)
+
+    self.traffic = distribution
+    self.rng = rng
+    self.block_size = block_size
+
+    # The first tick of the current block and its length, no block has been drawn yet
+    self.time = time
+    self.length = 0
+
+    self._draw_block()
+    return
+
+  def next(self):
+    """
+    Get the arrivals of the next tick.
+
+    Returns
+    -------
+    cells : np.ndarray or None
+      The flat cell indices of the new persons, None if nobody arrives.
+    """
+
+    if self.cursor == self.length:
+      self._draw_block()
+
+    start = self.offsets[self.cursor]
+    end = self.offsets[self.cursor + 1]
+    self.cursor += 1
+
+    if start == end:
+      return None
+
+    return self.cells[start:end]
+
+  def next_arrival(self, max_ticks=None):
+    """
+    Skip all ticks without arrivals and return the arrivals of the first tick with at least one new person.
+
+    Parameters
+    ----------
+    max_ticks : int or None
+      The maximum number of ticks to advance.
+
+    Returns
+    -------
+    ticks : int
+      The number of ticks advanced, including the tick of the arrival.
+
+    cells : np.ndarray or None
+      The flat cell indices of the new persons, None if nobody arrives within max_ticks.
+    """
+
+    ticks = 0
+
+    while True:
+      if self.cursor == self.length:
+        self._draw_block()
+
+      # The next event in this block, if any
+      event = self.offsets[self.cursor]
+
+      if event < len(self.ticks):
+        tick = self.ticks[event]
+        advance = int(tick - self.cursor) + 1
+
+        if max_ticks is not None and ticks + advance > max_ticks:
+          self.cursor += max_ticks - ticks
+          return max_ticks, None
+
+        self.cursor = tick + 1
+        return ticks + advance, self.cells[event:self.offsets[tick + 1]]
+
+      # No more events in this block
+      advance = self.length - self.cursor
+
+      if max_ticks is not None and ticks + advance > max_ticks:
+        self.cursor += max_ticks - ticks
+        return max_ticks, None
+
+      ticks += advance
+      self.cursor = self.length
+
+  def snapshot(self):
+    """
+    Returns
+    -------
+    snapshot : tuple
+      The current block and the position in it. The block arrays are replaced, never modified, hence they are not
+      copied.
+    """
+    return self.ticks, self.cells, self.offsets, self.cursor, self.time
+
+  def restore(self, snapshot):
+    """
+    Continue from a snapshot. The random generator has to be restored separately.
+
+    Parameters
+    ----------
+    snapshot : tuple
+      A snapshot returned by snapshot.
+    """
+    self.ticks, self.cells, self.offsets, self.cursor, self.time = snapshot
+    self.length = len(self.offsets) - 1
+    return
+
+  def _draw_block(self):
+    """
+    Draw the arrivals of the next block_size ticks, or of the remaining ticks of the current period.
+    """
+
+    # The next block starts where the current one ends
+    self.time += self.length
+    remaining = self.traffic.remaining(self.time)
+    self.length = self.block_size if remaining is None else min(self.block_size, remaining)
+    probabilities = self.traffic.probabilities[self.traffic.period(self.time)]
+
+    counts = self.rng.binomial(self.length, probabilities)
+    cells = np.repeat(np.arange(len(probabilities)), counts)
+
+    # Every cell can have at most one arrival per tick, hence the ticks of a cell are drawn without replacement
+    ticks = np.concatenate([self.rng.choice(self.length, count, replace=False) for count in counts if count]
+                           or [np.zeros(0, dtype=np.int64)])
+
+    order = np.lexsort((cells, ticks))
+    self.ticks = ticks[order]
+    self.cells = cells[order]
+    self.offsets = np.searchsorted(self.ticks, np.arange(self.length + 1))
+    self.cursor = 0
+    return
@@ -0,0 +1,104 @@
+from .constants import *
+from .encoding import HEAD_SHIFT, NUMBER_OF_HEADS, HEAD_ACTION_MASKS, SIMPLIFIED_TABLE, decode_state
+from . import policy
+
+# Batch versions of the policies for encoded states (see encoding.py). They take an integer array of codes and return
+# an integer array with the indices of the actions in ACTIONS.
+
+
+def _head_table(function):
+  """
+  Tabulate a policy which only depends on floor, direction and door (and not on the buttons) for every head.
+
+  Parameters
+  ----------
+  function : callable
+    A policy of policy.py (state -> action).
+
+  Returns
+  -------
+  table : np.ndarray
+    The index of the chosen action for every head.
+  """
+
+  return np.array([ACTIONS.index(function(decode_state(head << HEAD_SHIFT))) for head in range(NUMBER_OF_HEADS)])
+
+
+UP_TABLE = _head_table(policy.up)
+ALTERNATE_TABLE = _head_table(policy.alternate)
+
+
+def up(codes):
+  """
+  Batch version of policy.up.
+
+  Parameters
+  ----------
+  codes : np.ndarray
+    Encoded states.
+
+  Returns
+  -------
+  actions : np.ndarray
+    The indices of the actions.
+  """
+
+  return UP_TABLE[np.asarray(codes) >> HEAD_SHIFT]
+
+
+def alternate(codes):
+  """
+  Batch version of policy.alternate.
+
+  Parameters
+  ----------
+  codes : np.ndarray
+    Encoded states.
+
+  Returns
+  -------
+  actions : np.ndarray
+    The indices of the actions.
+  """
+
+  return ALTERNATE_TABLE[np.asarray(codes) >> HEAD_SHIFT]
+
+
+def greedy(q_table, codes, rng, epsilon=0.0):
+  """
+  Choose the best allowed action of a Q-table over the simplified states (QTable of q_table.py) for every state.
+  Ties are broken at random. With epsilon > 0, each state gets a uniformly random allowed action with probability
+  epsilon instead.
+
+  Parameters
+  ----------
+  q_table : QTable
+    The Q-table.
+
+  codes : np.ndarray
+    Encoded states.
+
+  rng : np.random.Generator
+    The random source of the tie-breaking and the exploration.
+
+  epsilon : float
+    The exploration rate.
+
+  Returns
+  -------
+  actions : np.ndarray
+    The indices of the actions.
+  """
+
+  codes = np.asarray(codes)
+  masks = HEAD_ACTION_MASKS[codes >> HEAD_SHIFT]
+  actions = q_table.greedy(SIMPLIFIED_TABLE[codes], masks, rng)
+
+  if epsilon > 0:
+    explore = rng.random(len(codes)) < epsilon
+
+    if explore.any():
+      allowed = masks[explore]
+      actions[explore] = np.argmax(allowed * rng.random(allowed.shape), axis=1)
+
+  return actions
@@ -5,11 +5,13 @@ DIRECTION_UP = "up"
 DIRECTION_NONE = "none"
 DIRECTION_DOWN = "down"
 DIRECTIONS = [DIRECTION_UP, DIRECTION_NONE, DIRECTION_DOWN]
+DIRECTION_IDS = {direction: i for i, direction in enumerate(DIRECTIONS)}
 
 # Names for the door states
 DOOR_OPEN = "open"
 DOOR_CLOSED = "closed"
 DOORS = [DOOR_OPEN, DOOR_CLOSED]
+DOOR_IDS = {door: i for i, door in enumerate(DOORS)}
 
 # Names of the actions
 ACTION_UP = "up"
@@ -34,4 +36,10 @@ PASSENGER_DISTRIBUTION = np.array([
 
 NUMBER_OF_FLOORS = PASSENGER_DISTRIBUTION.shape[0]
 
+# Bit value of every floor in the button masks
+FLOOR_BITS = 1 << np.arange(NUMBER_OF_FLOORS, dtype=np.int64)
 
+# The button tuples of the states for every bitmask and vice versa
+BUTTON_TUPLES = [tuple(bool(mask >> floor & 1) for floor in range(NUMBER_OF_FLOORS))
+                 for mask in range(2 ** NUMBER_OF_FLOORS)]
+BUTTON_MASKS = {buttons: mask for mask, buttons in enumerate(BUTTON_TUPLES)}
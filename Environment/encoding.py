@@ -0,0 +1,208 @@
+from .constants import *
+from .environment import ACTION_MASK_TABLE, HEAD_ACTIONS
+from .vector_environment import STATE_FLOOR, STATE_DIRECTION, STATE_DOOR, STATE_CABIN_BUTTONS, \
+  STATE_CALL_BUTTONS
+
+# Integer encoding of a state:
+#   code = head << (2 * NUMBER_OF_FLOORS) | cabin_buttons << NUMBER_OF_FLOORS | call_buttons
+# with head = (floor * len(DIRECTIONS) + direction) * len(DOORS) + door, where direction and door are the indices in
+# DIRECTIONS and DOORS, and the buttons are bitmasks (bit i belongs to floor i) as in VectorEnvironment.
+BUTTON_BITS = NUMBER_OF_FLOORS
+BUTTONS = (1 << BUTTON_BITS) - 1
+HEAD_SHIFT = 2 * BUTTON_BITS
+NUMBER_OF_HEADS = NUMBER_OF_FLOORS * len(DIRECTIONS) * len(DOORS)
+NUMBER_OF_CODES = NUMBER_OF_HEADS << HEAD_SHIFT
+
+# The allowed actions only depend on the head of a code
+HEAD_ACTION_MASKS = ACTION_MASK_TABLE.reshape(NUMBER_OF_HEADS, len(ACTIONS))
+
+
+def _build_simplified_table():
+  """
+  Precompute the row of the simplified state (see learning.simplify_state and QTable.key_index) for every code.
+
+  Returns
+  -------
+  table : np.ndarray
+    An int16 array of length NUMBER_OF_CODES.
+  """
+
+  codes = np.arange(NUMBER_OF_CODES, dtype=np.int64)
+  head = codes >> HEAD_SHIFT
+  floor = head // (len(DIRECTIONS) * len(DOORS))
+  buttons = ((codes >> BUTTON_BITS) | codes) & BUTTONS
+
+  above = (buttons >> (floor + 1)) != 0
+  below = (buttons & ((1 << floor) - 1)) != 0
+  here = ((buttons >> floor) & 1) != 0
+
+  return (head * 8 + 4 * above + 2 * below + here).astype(np.int16)
+
+
+SIMPLIFIED_TABLE = _build_simplified_table()
+
+
+def encode_state(state):
+  """
+  Pack a state tuple into its integer code.
+
+  Parameters
+  ----------
+  state : tuple
+    A state of the environment.
+
+  Returns
+  -------
+  code : int
+    The encoded state.
+  """
+
+  floor, direction, door, cabin_buttons, call_buttons = state
+
+  head = (floor * len(DIRECTIONS) + DIRECTION_IDS[direction]) * len(DOORS) + DOOR_IDS[door]
+  return head << HEAD_SHIFT | BUTTON_MASKS[cabin_buttons] << BUTTON_BITS | BUTTON_MASKS[call_buttons]
+
+
+def decode_state(code):
+  """
+  Unpack an integer code into the state tuple.
+
+  Parameters
+  ----------
+  code : int
+    An encoded state.
+
+  Returns
+  -------
+  state : tuple
+    The state of the environment.
+  """
+
+  code = int(code)
+  head = code >> HEAD_SHIFT
+
+  return (head // (len(DIRECTIONS) * len(DOORS)),
+          DIRECTIONS[head // len(DOORS) % len(DIRECTIONS)],
+          DOORS[head % len(DOORS)],
+          BUTTON_TUPLES[code >> BUTTON_BITS & BUTTONS],
+          BUTTON_TUPLES[code & BUTTONS])
+
+
+def encode_states(states):
+  """
+  Pack a batch of states of the VectorEnvironment into codes.
+
+  Parameters
+  ----------
+  states : np.ndarray
+    An integer array of shape (N, 5) as returned by VectorEnvironment.step.
+
+  Returns
+  -------
+  codes : np.ndarray
+    The encoded states.
+  """
+
+  head = (states[:, STATE_FLOOR] * len(DIRECTIONS) + states[:, STATE_DIRECTION]) * len(DOORS) + states[:, STATE_DOOR]
+  return head << HEAD_SHIFT | states[:, STATE_CABIN_BUTTONS] << BUTTON_BITS | states[:, STATE_CALL_BUTTONS]
+
+
+def decode_states(codes):
+  """
+  Unpack codes into the state array of the VectorEnvironment.
+
+  Parameters
+  ----------
+  codes : np.ndarray
+    The encoded states.
+
+  Returns
+  -------
+  states : np.ndarray
+    An integer array of shape (N, 5).
+  """
+
+  codes = np.asarray(codes, dtype=np.int64)
+  head = codes >> HEAD_SHIFT
+
+  states = np.empty((len(codes), 5), dtype=np.int64)
+  states[:, STATE_FLOOR] = head // (len(DIRECTIONS) * len(DOORS))
+  states[:, STATE_DIRECTION] = head // len(DOORS) % len(DIRECTIONS)
+  states[:, STATE_DOOR] = head % len(DOORS)
+  states[:, STATE_CABIN_BUTTONS] = codes >> BUTTON_BITS & BUTTONS
+  states[:, STATE_CALL_BUTTONS] = codes & BUTTONS
+  return states
+
+
+def available_actions(code):
+  """
+  Get the allowed actions of an encoded state, in the order of ACTIONS.
+
+  Parameters
+  ----------
+  code : int
+    An encoded state.
+
+  Returns
+  -------
+  actions : tuple
+    The allowed actions.
+  """
+
+  return HEAD_ACTIONS[code >> HEAD_SHIFT]
+
+
+def state_actions(state):
+  """
+  Get the allowed actions of a state tuple, in the order of ACTIONS.
+  Only the head of the state is computed, the buttons are not encoded.
+
+  Parameters
+  ----------
+  state : tuple
+    A state of the environment.
+
+  Returns
+  -------
+  actions : tuple
+    The allowed actions.
+  """
+
+  floor, direction, door = state[:3]
+  return HEAD_ACTIONS[(floor * len(DIRECTIONS) + DIRECTION_IDS[direction]) * len(DOORS) + DOOR_IDS[door]]
+
+
+def action_masks(codes):
+  """
+  Get the allowed actions of encoded states as boolean masks over ACTIONS.
+
+  Parameters
+  ----------
+  codes : int or np.ndarray
+    Encoded states.
+
+  Returns
+  -------
+  masks : np.ndarray
+    A boolean array of shape (..., len(ACTIONS)).
+  """
+
+  return HEAD_ACTION_MASKS[codes >> HEAD_SHIFT]
+
+
+def simplified_indices(codes):
+  """
+  Get the rows of the simplified states (as used by QTable) of encoded states.
+
+  Parameters
+  ----------
+  codes : int or np.ndarray
+    Encoded states.
+
+  Returns
+  -------
+  indices : int or np.ndarray
+    The rows of the simplified states.
+  """
+
+  return SIMPLIFIED_TABLE[codes]
@@ -1,4 +1,9 @@
 from .constants import *
+from .passengers import PassengerCounts
+from .arrivals import ArrivalStream
+from .traffic import CONSTANT_TRAFFIC
+from pathlib import Path
+from time import perf_counter
 
 class Person:
   """
@@ -51,21 +56,71 @@ class Environment:
     "render_fps": 5,
   }
 
-  def __init__(self, max_capacity=4, render_mode='human', frames_dir=None, seed=None):
-    """ Creates a fresh instance of the lift environment. """
+  def __init__(self, max_capacity=4, render_mode='human', frames_dir=None, seed=None, compact=False, tracer=None,
+               recorder=None, save_frames=False, render_backend='pygame', arrival_block=None, traffic=None,
+               start_time=0):
+    """
+    Creates a fresh instance of the lift environment.
+
+    With compact=True, the passengers are stored as counts in PassengerCounts instead of Person objects in the
+    buffer_floor and buffer_cabin lists. The dynamics are the same, but the cost of a step does not grow with the
+    number of waiting persons.
+
+    A Tracer can be passed to record the time spent in the phases of step and counters of spawned, boarded,
+    delivered and waiting persons.
+
+    Rendered frames are streamed into a FrameRecorder. If only frames_dir is given, the frames are written to
+    frames_dir/animation.gif and, with save_frames=True, additionally as PNG files into frames_dir.
+
+    With arrival_block, the arrivals of persons are pre-drawn for blocks of that many timesteps by an ArrivalStream
+    instead of sampling the full PASSENGER_DISTRIBUTION in every step. The statistics are the same, the random
+    numbers differ.
+
+    With render_backend="numpy", the "rgb_array" mode draws with NumpyRenderer and does not need Pygame.
+
+    With a TrafficSchedule (see traffic.py) as traffic, the passenger distribution depends on the time of day, which
+    is start_time plus the timesteps since the reset. Without, PASSENGER_DISTRIBUTION is used all the time.
+    """
+
+    if render_backend == "numpy" and render_mode == "human":
+      raise ValueError("The numpy render backend only supports the render mode 'rgb_array'.")
 
     self.render_mode = render_mode
+    self.render_backend = render_backend
+    self.raster = None
     self.screen_width = 600
     self.screen_height = 800
     self.screen = None
     self.clock = None
 
+    # Every environment owns its random generator, hence several environments do not interfere.
+    # The seed sequence allows to derive independent seeds for child environments and workers.
     self.seed = seed
+    self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    self.rng = np.random.default_rng(self.seed_sequence)
+
     self.max_capacity = max_capacity
     self.person_counter = 0
     self.frame_count = 0
-    self.frames_dir = frames_dir
+    self.frames_dir = None if frames_dir is None else Path(frames_dir)
 
+    if recorder is None and self.frames_dir is not None:
+      # The import is done here, the recording is only needed when frames are saved
+      from .recording import FrameRecorder
+
+      recorder = FrameRecorder(self.frames_dir / 'animation.gif',
+                               fps=self.metadata["render_fps"],
+                               frames_dir=self.frames_dir if save_frames else None)
+
+    self.recorder = recorder
+
+    self.tracer = tracer
+    self.arrival_block = arrival_block
+    self.arrivals = None
+    self.traffic = CONSTANT_TRAFFIC if traffic is None else traffic
+    self.start_time = start_time
+    self.compact = compact
+    self.passengers = None
     self.buffer_cabin = []
     self.buffer_floor = {i: [] for i in range(NUMBER_OF_FLOORS)}
     self.state = None
@@ -86,46 +141,63 @@ class Environment:
     -------
     new_state : tuple
       The new state of the environment after taking the action.
+      The numbers of persons who left and entered the cabin in this step are stored in delivered and boarded.
     """
 
+    tracer = self.tracer
+    if tracer is not None:
+      started = perf_counter()
+
+    # Unpack the state for easy access
+    current_floor, move_direction, door_state, cabin_buttons, call_buttons = self.state
+
     #Überprüfe erlaubten actions
-    valid_actions = Environment.get_available_actions(self.state)
+    valid_actions = HEAD_ACTIONS[(current_floor * len(DIRECTIONS) + DIRECTION_IDS[move_direction]) * len(DOORS)
+                                 + DOOR_IDS[door_state]]
 
     if action not in valid_actions:
       raise ValueError(f"It is not allowed to execute <{action}> in state {self.state}.\n"
-                       f"Valid actions are {valid_actions}.")
+                       f"Valid actions are {list(valid_actions)}.")
 
-    # Unpack the state for easy access
-    current_floor, move_direction, door_state, cabin_buttons, call_buttons = self.state
+    # The buttons are handled as bitmasks
+    cabin_buttons = BUTTON_MASKS[cabin_buttons]
+    call_buttons = BUTTON_MASKS[call_buttons]
 
-    # Convert the buttons to a list for easier manipulation
-    cabin_buttons = list(cabin_buttons)
-    call_buttons = list(call_buttons)
+    self.delivered = 0
+    self.boarded = 0
+
+    if tracer is not None:
+      started = tracer.record("validate", started)
 
     # The call button is active on every floor, where people are waiting.
-    self._update_call_buttons(call_buttons)
+    call_buttons |= self.waiting_floors
+
+    if tracer is not None:
+      started = tracer.record("call_buttons", started)
 
     # If the door is open, people leave and enter the cabin
     if door_state == DOOR_OPEN:
 
       # The buttons for the current floor are turned off since that floor is served
-      cabin_buttons[current_floor] = False
-      call_buttons[current_floor] = False
+      cabin_buttons &= ~(1 << current_floor)
+      call_buttons &= ~(1 << current_floor)
 
       # Let people out, they arrived at their desired floor and are removed from the buffer
-      at_destination = [p for p in self.buffer_cabin if p.destination == current_floor]
-
-      for p in at_destination:
-        self.buffer_cabin.remove(p)
+      self.delivered = delivered = self._move_out_cabin(current_floor)
 
       # Let people in (as long as there is space) and let the press the cabin buttons
       # If not all fit, then the call button is activated again during the next step
-      self._move_in_cabin(current_floor)
-      self._update_cabin_buttons(cabin_buttons)
+      self.boarded = boarded = self._move_in_cabin(current_floor)
+      cabin_buttons |= self.cabin_destinations
 
       if action == ACTION_DOOR:
         door_state = DOOR_CLOSED
 
+      if tracer is not None:
+        started = tracer.record("door", started)
+        tracer.count("delivered", delivered)
+        tracer.count("boarded", boarded)
+
     # If the door is closed, the lift moves or waits
     else:
 
@@ -189,19 +261,133 @@ class Environment:
           raise RuntimeError("This should not happen")
 
       # end if moving
+
+      if tracer is not None:
+        started = tracer.record("move", started)
+
     # end if door
 
     # Combine all parts into the next state.
-    # Lists are converted back to tuples to ensure immutability of the state
-    self.state = current_floor, move_direction, door_state, tuple(cabin_buttons), tuple(call_buttons)
+    # The bitmasks are converted back to tuples to ensure immutability of the state
+    self.state = current_floor, move_direction, door_state, BUTTON_TUPLES[cabin_buttons], BUTTON_TUPLES[call_buttons]
 
     # Generate new persons with random start and destination floors for the next step.
     # This is done after the state transition to avoid the new persons to appear in the cabin in the same step.
     # This would look weird during rendering
-    self._new_persons()
+    if tracer is not None:
+      spawned = self.person_counter
+      self._new_persons()
+      tracer.record("spawn", started)
+      tracer.count("spawned", self.person_counter - spawned)
+      tracer.count("waiting", self.active_persons - self.get_persons_in_cabin())
+      tracer.count("in_cabin", self.get_persons_in_cabin())
+    else:
+      self._new_persons()
+
+    self.time += 1
 
     return self.state
 
+  def is_idle(self):
+    """
+    Check whether nothing can happen until the next person appears: the lift waits with closed door,
+    no button is pressed and nobody is waiting or travelling.
+
+    Returns
+    -------
+    idle : bool
+      Indicates whether the environment is idle.
+    """
+
+    current_floor, move_direction, door_state, cabin_buttons, call_buttons = self.state
+
+    return (door_state == DOOR_CLOSED and move_direction == DIRECTION_NONE
+            and not any(cabin_buttons) and not any(call_buttons) and self.active_persons == 0)
+
+  def advance_idle(self, max_ticks=None):
+    """
+    Jump over an idle period in one call.
+
+    While the environment is idle, a step with ACTION_NOOP does not change the state unless persons appear. Instead
+    of sampling the arrivals tick by tick, the number of ticks until the next arrival is drawn from the geometric
+    distribution implied by the passenger distribution, and the arrivals of that tick are drawn conditioned on at
+    least one person appearing. With a traffic schedule, this is done period by period. Afterwards, the environment
+    is in the same situation as after the corresponding number of step(ACTION_NOOP) calls (statistically, not for
+    the same random numbers).
+
+    Parameters
+    ----------
+    max_ticks : int or None
+      The maximum number of ticks to skip, e.g. the remaining steps of an episode.
+
+    Returns
+    -------
+    ticks : int
+      The number of skipped ticks, each corresponding to one step with ACTION_NOOP.
+      The rewards of these steps have to be accumulated by the caller. Zero if the environment is not idle.
+    """
+
+    if not self.is_idle():
+      return 0
+
+    # As in a step with ACTION_NOOP, nobody leaves or enters the cabin
+    self.delivered = 0
+    self.boarded = 0
+
+    # The pre-drawn arrivals already contain the ticks without arrivals
+    if self.arrivals is not None:
+      ticks, cells = self.arrivals.next_arrival(max_ticks)
+
+      if cells is not None:
+        self._add_persons(self._cells_to_locations(cells))
+
+      self.time += ticks
+      return ticks
+
+    traffic = self.traffic
+    skipped = 0
+
+    while True:
+      time = self.start_time + self.time
+      period = traffic.period(time)
+      remaining = traffic.remaining(time)
+
+      # The arrivals are memoryless within a period, hence the waiting time can be drawn anew in every period
+      if traffic.no_arrival[period] < 1:
+        ticks = int(self.rng.geometric(1 - traffic.no_arrival[period]))
+      elif remaining is None and max_ticks is None:
+        raise RuntimeError("Nobody ever appears in an idle environment without a limit of ticks.")
+      else:
+        ticks = None
+
+      # Nobody appears in the rest of the period, continue with the next one
+      if remaining is not None and (ticks is None or ticks > remaining) and \
+          (max_ticks is None or skipped + remaining <= max_ticks):
+        self.time += remaining
+        skipped += remaining
+        continue
+
+      # No person appears within the allowed ticks
+      if ticks is None or (max_ticks is not None and skipped + ticks > max_ticks):
+        self.time += max_ticks - skipped
+        return max_ticks
+
+      break
+
+    probabilities = traffic.probabilities[period]
+
+    # The first new person is drawn from the conditional distribution, all later cells independently
+    first = self.rng.choice(len(probabilities), p=traffic.first_arrival[period])
+
+    person_locations = np.zeros(len(probabilities), dtype=np.int64)
+    person_locations[first] = 1
+    person_locations[first + 1:] = self.rng.binomial(1, probabilities[first + 1:])
+
+    self._add_persons(person_locations.reshape(PASSENGER_DISTRIBUTION.shape))
+    self.time += ticks
+
+    return skipped + ticks
+
   def reset(self):
     """
     Reset the environment to its initial state.
@@ -216,49 +402,62 @@ class Environment:
     """
 
     if self.seed is not None:
-      np.random.seed(self.seed)
+      self.rng = np.random.default_rng(self.seed_sequence)
+
+    # The persons of the initial state are drawn tick by tick, the pre-drawn arrivals start with the first step
+    self.arrivals = None
 
     self.frames = []
     self.frame_count = 0
     self.person_counter = 0
-
-    self.buffer_cabin = []
-    self.buffer_floor = {i: [] for i in range(NUMBER_OF_FLOORS)}
+    self.time = 0
+
+    # Bookkeeping which is updated whenever persons appear, board or leave
+    self.waiting_floors = 0
+    self.cabin_destinations = 0
+    self.active_persons = 0
+    self.delivered_persons = 0
+    self.boarded_persons = 0
+    self.delivered = 0
+    self.boarded = 0
+
+    if self.compact:
+      self.passengers = PassengerCounts()
+      self.buffer_cabin = None
+      self.buffer_floor = None
+    else:
+      self.buffer_cabin = []
+      self.buffer_floor = {i: [] for i in range(NUMBER_OF_FLOORS)}
 
     # Random starting position
-    current_floor = np.random.randint(NUMBER_OF_FLOORS)
+    current_floor = int(self.rng.integers(NUMBER_OF_FLOORS))
 
     # These are fixed because this makes the resetting behaviour easier to implement
     move_direction = DIRECTION_NONE
     door_state = DOOR_CLOSED
 
-    # No buttons are pressed at the beginning
-    # Can be changed if persons are spawned in the later code
-    cabin_buttons = list([False for _ in range(NUMBER_OF_FLOORS)])
-    call_buttons = list([False for _ in range(NUMBER_OF_FLOORS)])
-
     # Create persons at the beginning by exploiting the binomial distribution
     # in the existing function. This will handle buffers and counters correctly
-    persons_to_create = np.random.randint(10)
+    persons_to_create = self.rng.integers(10)
     attempts_left = 15
 
-    while self.get_active_persons() < persons_to_create and attempts_left > 0:
+    while self.active_persons < persons_to_create and attempts_left > 0:
       attempts_left -= 1
       self._new_persons()
 
+    if self.arrival_block is not None:
+      self.arrivals = ArrivalStream(self.traffic, self.rng, self.arrival_block, self.start_time)
+
     # Move persons into the cabin on the floor where the lift starts
     # It is fine if there are more persons than the max capacity
     self._move_in_cabin(current_floor)
 
-    # Adjust the state of buttons according to the existing persons
-    self._update_cabin_buttons(cabin_buttons)
-    self._update_call_buttons(call_buttons)
-
+    # The buttons are pressed according to the existing persons
     self.state = (current_floor,
                   move_direction,
                   door_state,
-                  tuple(cabin_buttons),
-                  tuple(call_buttons))
+                  BUTTON_TUPLES[self.cabin_destinations],
+                  BUTTON_TUPLES[self.waiting_floors])
 
     return self.state
 
@@ -303,17 +502,116 @@ class Environment:
 
 
 
+
+  def spawn(self, n, **kwargs):
+    """
+    Create child environments with independent random generators derived from the seed sequence of this environment.
+    The children are reproducible if this environment has been created with a seed.
+
+    Parameters
+    ----------
+    n : int
+      The number of child environments.
+
+    kwargs : dict
+      Further arguments for the child environments. By default, they share the capacity and render mode.
+
+    Returns
+    -------
+    environments : list
+      The child environments.
+    """
+
+    kwargs.setdefault("max_capacity", self.max_capacity)
+    kwargs.setdefault("render_mode", self.render_mode)
+
+    return [Environment(seed=seed, **kwargs) for seed in self.seed_sequence.spawn(n)]
+
+  def snapshot(self):
+    """
+    Capture the simulation state, e.g. to try out actions and return to the current situation afterwards.
+
+    A snapshot holds the state, the counters, the passengers and the state of the random generator (including
+    pre-drawn arrivals). Persons never change, hence the buffers are stored as tuples of the same Person objects,
+    with compact=True the count arrays are copied. Rendering, recording and tracing are not part of a snapshot.
+
+    Returns
+    -------
+    snapshot : tuple
+      An opaque snapshot which can be passed to restore, also of another environment with the same settings.
+    """
+
+    if self.compact:
+      passengers = self.passengers.snapshot()
+    else:
+      passengers = tuple(self.buffer_cabin), tuple(tuple(self.buffer_floor[i]) for i in range(NUMBER_OF_FLOORS))
+
+    arrivals = None if self.arrivals is None else self.arrivals.snapshot()
+
+    return (self.compact, self.state, self.time, self.person_counter,
+            self.waiting_floors, self.cabin_destinations, self.active_persons,
+            self.delivered_persons, self.boarded_persons, self.delivered, self.boarded,
+            passengers, self.rng.bit_generator.state, arrivals)
+
+  def restore(self, snapshot, rng=True):
+    """
+    Return to the situation captured by snapshot.
+
+    Parameters
+    ----------
+    snapshot : tuple
+      A snapshot returned by snapshot.
+
+    rng : bool
+      Whether the random generator (and the pre-drawn arrivals) are restored as well. Then the environment
+      reproduces exactly the same future for the same actions. With rng=False, the environment keeps drawing from
+      its own generator, e.g. to simulate different futures of the same situation.
+    """
+
+    (compact, self.state, self.time, self.person_counter,
+     self.waiting_floors, self.cabin_destinations, self.active_persons,
+     self.delivered_persons, self.boarded_persons, self.delivered, self.boarded,
+     passengers, rng_state, arrivals) = snapshot
+
+    if compact != self.compact:
+      raise ValueError(f"The snapshot was taken with compact={compact}, but this environment uses "
+                       f"compact={self.compact}.")
+
+    if self.compact:
+      self.passengers.restore(passengers)
+    else:
+      cabin, floors = passengers
+      self.buffer_cabin = list(cabin)
+      self.buffer_floor = {i: list(persons) for i, persons in enumerate(floors)}
+
+    if rng:
+      if (arrivals is None) != (self.arrivals is None):
+        raise ValueError("The snapshot and this environment differ in the use of pre-drawn arrivals.")
+
+      # The arrival stream draws from self.rng, hence restoring the generator in place covers both
+      self.rng.bit_generator.state = rng_state
+
+      if arrivals is not None:
+        self.arrivals.restore(arrivals)
+
+    return
 
   def render(self):
     """
     Render the current state of the environment.
 
+    The parts of the image which never change (floor lines, lift shaft, floor numbers) and the font are prepared
+    once per environment in _build_render_cache. Each frame only draws the cabin, the persons and the counters.
+
     Returns
     -------
     image : np.ndarray or None
-      The rendered image of the environment, if render_mode is "rgb_array".
+      The rendered image of the environment, if render_mode is "rgb_array". The array is read-only.
     """
 
+    if self.render_backend == "numpy":
+      return self._render_numpy()
+
     # The import is done here to avoid a dependency on Pygame if the environment is not rendered
     # E.g. training on a headless server
     import pygame
@@ -333,144 +631,88 @@ class Environment:
       else:
         self.screen = pygame.Surface((self.screen_width, self.screen_height))
 
+      self._build_render_cache()
+
     # Initialize the clock for the Pygame window, which is used to control the frame rate
     if self.clock is None:
       self.clock = pygame.time.Clock()
 
     # Define the dimensions of the lift and the floors
-    info_height = 150
-    floor_height = (self.screen_height - info_height) / NUMBER_OF_FLOORS
-    lift_width = 100
-
-    # Create the surfaces for the lift, text, and figures
-    lift_surface = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
-    text_surface = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
-    figure_surface = pygame.Surface((self.screen_width, self.screen_height), pygame.SRCALPHA)
-
-    def draw_stickman(position, color=(0, 0, 0)):
-      """ Draw a stick figure at the given position. """
-
-      pos_x, pos_y = position
-
-      # Head
-      pygame.draw.circle(figure_surface, color, center=(pos_x, pos_y - 15), radius=5)
-      # Body
-      pygame.draw.line(figure_surface, color, start_pos=position, end_pos=(pos_x, pos_y - 15))
-
-      # Left leg
-      pygame.draw.line(figure_surface, color, start_pos=position, end_pos=(pos_x - 10, pos_y + 20))
-      # Right leg
-      pygame.draw.line(figure_surface, color, start_pos=position, end_pos=(pos_x + 10, pos_y + 20))
-
-      # Left arm
-      pygame.draw.line(figure_surface, color, start_pos=(pos_x, pos_y - 5), end_pos=(pos_x - 10, pos_y - 10))
-      # Right arm
-      pygame.draw.line(figure_surface, color, start_pos=(pos_x, pos_y - 5), end_pos=(pos_x + 10, pos_y - 10))
-
-      return
-
-    # Draw floors and people waiting
-    for i in range(NUMBER_OF_FLOORS):
-      pygame.draw.line(lift_surface,
-                       color=(150, 150, 150),
-                       start_pos=(0, i * floor_height),
-                       end_pos=((self.screen_width - lift_width) // 2, i * floor_height),
-                       width=1)
-      pygame.draw.line(lift_surface,
-                       color=(150, 150, 150),
-                       start_pos=((self.screen_width + lift_width) // 2, i * floor_height),
-                       end_pos=(self.screen_width, i * floor_height),
-                       width=1)
-      font = pygame.font.SysFont('Arial', 18)
-      text = font.render(f"{i}", True, (0, 0, 0))
-      text_surface.blit(text, (10, (NUMBER_OF_FLOORS - i - 1) * floor_height + 10))
-      num_people_waiting = len(self.buffer_floor[i])
-      text = font.render(f"Waiting: {num_people_waiting}", True, (0, 0, 0))
-      text_surface.blit(text, (10, (NUMBER_OF_FLOORS - i) * floor_height - 24))
-
-      if num_people_waiting > 0:
-        stick_figure_pos = (self.screen_width // 2 - lift_width, (NUMBER_OF_FLOORS - i) * floor_height - 40)
-        draw_stickman(stick_figure_pos)
+    info_height = self.info_height
+    floor_height = self.floor_height
+    lift_width = self.lift_width
 
-    # Draw the bottom line
-    pygame.draw.line(lift_surface,
-                     color=(0, 0, 0),
-                     start_pos=(0, NUMBER_OF_FLOORS * floor_height),
-                     end_pos=(self.screen_width, NUMBER_OF_FLOORS * floor_height),
-                     width=5)
-
-    # Draw lift shaft
-    pygame.draw.line(lift_surface,
-                     color=(0, 0, 0),
-                     start_pos=((self.screen_width - lift_width) // 2, 0),
-                     end_pos=((self.screen_width - lift_width) // 2, self.screen_height - info_height),
-                     width=5)
-    pygame.draw.line(lift_surface,
-                     color=(0, 0, 0),
-                     start_pos=((self.screen_width + lift_width) // 2, 0),
-                     end_pos=((self.screen_width + lift_width) // 2, self.screen_height - info_height),
-                     width=5)
+    # Start from the static background
+    self.screen.blit(self.background, (0, 0))
 
     # Draw cabin
     dist = 5
 
     # If doors are closed add grey background
     if door_state == DOOR_CLOSED:
-      pygame.draw.rect(lift_surface,
+      pygame.draw.rect(self.screen,
                        color=(150, 150, 150),
                        rect=((self.screen_width - lift_width) // 2 + dist,
                              (NUMBER_OF_FLOORS - current_floor - 1) * floor_height + dist,
                              lift_width - dist * 2,
                              floor_height - dist * 2),
                        width=0)
-      pygame.draw.line(lift_surface,
+      pygame.draw.line(self.screen,
                        color=(0, 0, 0),
                        start_pos=(self.screen_width // 2, (NUMBER_OF_FLOORS - current_floor - 1) * floor_height + dist),
                        end_pos=(self.screen_width // 2, (NUMBER_OF_FLOORS - current_floor) * floor_height - dist - 2),
                        width=3)
 
-    pygame.draw.rect(lift_surface, color=(0, 0, 0),
+    pygame.draw.rect(self.screen, color=(0, 0, 0),
                      rect=((self.screen_width - lift_width) // 2 + dist,
                            (NUMBER_OF_FLOORS - current_floor - 1) * floor_height + dist,
                            lift_width - dist * 2,
                            floor_height - dist * 2),
                      width=5)
 
-    # Draw people in the cabin
-    if len(self.buffer_cabin) > 0:
-      stick_figure_pos = (self.screen_width // 2 - 10, (NUMBER_OF_FLOORS - current_floor) * floor_height - 40)
-      draw_stickman(stick_figure_pos)
+    # Draw the number of people waiting
+    waiting_persons = self.get_waiting_persons()
 
-    # Draw info
-    font = pygame.font.SysFont('Arial', 18)
+    for i in range(NUMBER_OF_FLOORS):
+      self.screen.blit(self._render_text(f"Waiting: {waiting_persons[i]}"),
+                       (10, (NUMBER_OF_FLOORS - i) * floor_height - 24))
 
-    num_people_in_cabin = len(self.buffer_cabin)
+    # Draw info
+    num_people_in_cabin = self.get_persons_in_cabin()
 
-    text = font.render(f"People in cabin: {num_people_in_cabin}", True, (0, 0, 0))
-    text_surface.blit(text, (10, self.screen_height - info_height + 10))
+    text = self._render_text(f"People in cabin: {num_people_in_cabin}")
+    self.screen.blit(text, (10, self.screen_height - info_height + 10))
 
     pressed_buttons = [index for index, value in enumerate(cabin_buttons) if value]
-    text = font.render(f"Cabin buttons: {', '.join(map(str, pressed_buttons))}", True, (0, 0, 0))
-    text_surface.blit(text, (10, self.screen_height - info_height + 40))
+    text = self._render_text(f"Cabin buttons: {', '.join(map(str, pressed_buttons))}")
+    self.screen.blit(text, (10, self.screen_height - info_height + 40))
 
     pressed_buttons = [index for index, value in enumerate(call_buttons) if value]
-    text = font.render(f"Call buttons: {', '.join(map(str, pressed_buttons))}", True, (0, 0, 0))
-    text_surface.blit(text, (10, self.screen_height - info_height + 70))
+    text = self._render_text(f"Call buttons: {', '.join(map(str, pressed_buttons))}")
+    self.screen.blit(text, (10, self.screen_height - info_height + 70))
+
+    text = self._render_text(f"Moving direction: {move_direction}")
+    self.screen.blit(text, (10, self.screen_height - info_height + 100))
 
-    text = font.render(f"Moving direction: {move_direction}", True, (0, 0, 0))
-    text_surface.blit(text, (10, self.screen_height - info_height + 100))
+    # Draw people waiting and in the cabin
+    for i in range(NUMBER_OF_FLOORS):
+      if waiting_persons[i] > 0:
+        self.screen.blit(self.stickman, (self.screen_width // 2 - lift_width - 10,
+                                         (NUMBER_OF_FLOORS - i) * floor_height - 40 - 20))
+
+    if num_people_in_cabin > 0:
+      self.screen.blit(self.stickman, (self.screen_width // 2 - 10 - 10,
+                                       (NUMBER_OF_FLOORS - current_floor) * floor_height - 40 - 20))
 
-    self.screen.fill((255, 255, 255))
-    self.screen.blit(lift_surface, (0, 0))
-    self.screen.blit(text_surface, (0, 0))
-    self.screen.blit(figure_surface, (0, 0))
+    # The screen is converted at most once per frame, the recorder and the caller share the read-only array
+    image = None
 
-    # Save the frame
-    if self.frames_dir is not None:
-      self.frames_dir.mkdir(exist_ok=True, parents=True)
-      frame_filename = self.frames_dir / f"frame_{self.frame_count:03d}.png"
+    if self.render_mode == "rgb_array" or self.recorder is not None:
+      image = self._screen_array()
 
-      pygame.image.save(self.screen, frame_filename)
+    # Record the frame
+    if self.recorder is not None:
+      self.recorder.append(image)
 
     self.frame_count += 1
 
@@ -481,33 +723,180 @@ class Environment:
       return None
 
     elif self.render_mode == "rgb_array":
-      return np.transpose(np.array(pygame.surfarray.pixels3d(self.screen)), axes=(1, 0, 2))
+      return image
+
+    return None
+
+  def _render_numpy(self):
+    """
+    Render the current state with the NumPy rasterizer, without Pygame.
+
+    Returns
+    -------
+    image : np.ndarray or None
+      The rendered image of the environment, if render_mode is "rgb_array".
+    """
+
+    if self.raster is None:
+      # The import is done here, building the glyph tables of the rasterizer is not needed without rendering
+      from .raster import NumpyRenderer
+
+      self.raster = NumpyRenderer(self.screen_width, self.screen_height)
+
+    image = self.raster.render(self)
+
+    if self.recorder is not None:
+      self.recorder.append(image)
+
+    self.frame_count += 1
+
+    if self.render_mode == "rgb_array":
+      return image
 
     return None
 
+  def _screen_array(self):
+    """
+    Convert the screen into a contiguous, read-only (height, width, 3) array in a single copy.
+
+    Returns
+    -------
+    image : np.ndarray
+      The RGB image of the screen.
+    """
+
+    import pygame
+
+    return np.frombuffer(pygame.image.tobytes(self.screen, "RGB"), dtype=np.uint8).reshape(
+      self.screen_height, self.screen_width, 3)
+
+  def _build_render_cache(self):
+    """
+    Prepare everything for render that does not depend on the state:
+    the font, the background with floors, floor numbers and lift shaft, and the stick figure.
+    """
+
+    import pygame
+
+    # Define the dimensions of the lift and the floors
+    self.info_height = 150
+    self.floor_height = (self.screen_height - self.info_height) / NUMBER_OF_FLOORS
+    self.lift_width = 100
+
+    info_height = self.info_height
+    floor_height = self.floor_height
+    lift_width = self.lift_width
+
+    self.font = pygame.font.SysFont('Arial', 18)
+    self.text_cache = {}
+
+    self.background = pygame.Surface((self.screen_width, self.screen_height))
+    self.background.fill((255, 255, 255))
+
+    # Draw floors and floor numbers
+    for i in range(NUMBER_OF_FLOORS):
+      pygame.draw.line(self.background,
+                       color=(150, 150, 150),
+                       start_pos=(0, i * floor_height),
+                       end_pos=((self.screen_width - lift_width) // 2, i * floor_height),
+                       width=1)
+      pygame.draw.line(self.background,
+                       color=(150, 150, 150),
+                       start_pos=((self.screen_width + lift_width) // 2, i * floor_height),
+                       end_pos=(self.screen_width, i * floor_height),
+                       width=1)
+      self.background.blit(self._render_text(f"{i}"), (10, (NUMBER_OF_FLOORS - i - 1) * floor_height + 10))
+
+    # Draw the bottom line
+    pygame.draw.line(self.background,
+                     color=(0, 0, 0),
+                     start_pos=(0, NUMBER_OF_FLOORS * floor_height),
+                     end_pos=(self.screen_width, NUMBER_OF_FLOORS * floor_height),
+                     width=5)
+
+    # Draw lift shaft
+    pygame.draw.line(self.background,
+                     color=(0, 0, 0),
+                     start_pos=((self.screen_width - lift_width) // 2, 0),
+                     end_pos=((self.screen_width - lift_width) // 2, self.screen_height - info_height),
+                     width=5)
+    pygame.draw.line(self.background,
+                     color=(0, 0, 0),
+                     start_pos=((self.screen_width + lift_width) // 2, 0),
+                     end_pos=((self.screen_width + lift_width) // 2, self.screen_height - info_height),
+                     width=5)
+
+    # Draw a stick figure with its hip at (10, 20) on a transparent surface
+    self.stickman = pygame.Surface((21, 41), pygame.SRCALPHA)
+    pos_x, pos_y = position = (10, 20)
+    color = (0, 0, 0)
+
+    # Head
+    pygame.draw.circle(self.stickman, color, center=(pos_x, pos_y - 15), radius=5)
+    # Body
+    pygame.draw.line(self.stickman, color, start_pos=position, end_pos=(pos_x, pos_y - 15))
+
+    # Left leg
+    pygame.draw.line(self.stickman, color, start_pos=position, end_pos=(pos_x - 10, pos_y + 20))
+    # Right leg
+    pygame.draw.line(self.stickman, color, start_pos=position, end_pos=(pos_x + 10, pos_y + 20))
+
+    # Left arm
+    pygame.draw.line(self.stickman, color, start_pos=(pos_x, pos_y - 5), end_pos=(pos_x - 10, pos_y - 10))
+    # Right arm
+    pygame.draw.line(self.stickman, color, start_pos=(pos_x, pos_y - 5), end_pos=(pos_x + 10, pos_y - 10))
+
+    return
+
+  def _render_text(self, text):
+    """
+    Render a text with the cached font. The surfaces of recently used texts are reused.
+
+    Parameters
+    ----------
+    text : str
+      The text to render.
+
+    Returns
+    -------
+    surface : pygame.Surface
+      The rendered text.
+    """
+
+    surface = self.text_cache.get(text)
+
+    if surface is None:
+      # The counters can take many values, hence the cache is bounded
+      if len(self.text_cache) > 256:
+        self.text_cache.clear()
+
+      surface = self.text_cache[text] = self.font.render(text, True, (0, 0, 0))
+
+    return surface
+
   def close(self):
     """
     Close the environment, including the Pygame window (if any).
-    Creates a gif if the frames directory is specified and render outputs have been stored.
+    Finishes the recording if frames have been recorded.
     """
 
+    if self.recorder is not None:
+      self.recorder.close()
+
     # There was no screen, hence nothing to process
     if self.screen is None:
       return
 
-    # A directory for the frames was specified, hence fetch the stored frames and create a gif
-    if self.frames_dir is not None:
-      import imageio
-      gif_filename = self.frames_dir / 'animation.gif'
-      frames = [imageio.imread(frame) for frame in sorted(self.frames_dir.glob("frame_*.png"))]
-      imageio.mimsave(gif_filename, frames, 'GIF', fps=self.metadata["render_fps"], loop=True)
-
     import pygame
     pygame.display.quit()
     pygame.quit()
 
     self.screen = None
     self.clock = None
+    self.background = None
+    self.stickman = None
+    self.font = None
+    self.text_cache = {}
 
     return
 
@@ -525,57 +914,115 @@ class Environment:
       Indicates whether new persons have been spawned.
     """
 
+    # Serve the pre-drawn arrivals of this step
+    if self.arrivals is not None:
+      cells = self.arrivals.next()
+
+      if cells is None:
+        return False
+
+      self._add_persons(self._cells_to_locations(cells))
+      return True
+
     # N rounds of a pick-and-replace random event
     # The resulting matrix indicates, at which floors new persons with destinations are waiting
-    person_locations = np.random.binomial(1, PASSENGER_DISTRIBUTION)
+    distribution = self.traffic.distributions[self.traffic.period(self.start_time + self.time)]
+    person_locations = self.rng.binomial(1, distribution)
 
     # Not a single person has been created, hence there is not a single non-zero element
     if not person_locations.any():
       return False
 
-    # Get the indices of the non-zero elements, which represent the start and destination floors
-    non_zero_indices = np.where(person_locations != 0)
+    self._add_persons(person_locations)
+    return True
+
+  @staticmethod
+  def _cells_to_locations(cells):
+    """
+    Convert flat cell indices of new persons into a start×destination matrix.
 
-    # Unpack the indices and spawn people
-    for start_floor, dest_floor in zip(*non_zero_indices):
-      self.buffer_floor[start_floor].append(Person(start_floor, dest_floor))
-      self.person_counter += 1
+    Parameters
+    ----------
+    cells : np.ndarray
+      The flat indices (start * NUMBER_OF_FLOORS + destination) of the new persons.
 
-    return True
+    Returns
+    -------
+    person_locations : np.ndarray
+      A start×destination matrix with ones where a new person appears.
+    """
 
-  def _update_call_buttons(self, call_buttons):
+    person_locations = np.zeros(PASSENGER_DISTRIBUTION.shape, dtype=np.int64)
+    person_locations.flat[cells] = 1
+    return person_locations
+
+  def _add_persons(self, person_locations):
     """
-    The call button is active on every floor, where people are waiting.
+    Add waiting persons to the floor buffers.
 
     Parameters
     ----------
-    call_buttons : list
-      A list of booleans indicating which buttons are pressed on the floors.
+    person_locations : np.ndarray
+      A start×destination matrix with ones where a new person appears.
     """
 
-    for floor, people in self.buffer_floor.items():
-      if people:
-        call_buttons[floor] = True
+    if self.compact:
+      self.passengers.spawn(person_locations)
+      spawned = int(person_locations.sum())
+      self.waiting_floors |= int(FLOOR_BITS @ person_locations.any(axis=1))
+    else:
+      # Get the indices of the non-zero elements, which represent the start and destination floors
+      start_floors, dest_floors = np.where(person_locations != 0)
+
+      # Unpack the indices and spawn people, they press the call button of their floor
+      for start_floor, dest_floor in zip(start_floors.tolist(), dest_floors.tolist()):
+        self.buffer_floor[start_floor].append(Person(start_floor, dest_floor))
+        self.waiting_floors |= 1 << start_floor
+
+      spawned = len(start_floors)
+
+    self.person_counter += spawned
+    self.active_persons += spawned
     return
 
-  def _update_cabin_buttons(self, cabin_buttons):
+  def _move_out_cabin(self, current_floor):
     """
-    The cabin button is active for every destination of a person in the cabin.
+    Let all people with the current floor as destination leave the cabin.
+    The cabin button of the floor is released and the counters are updated.
 
     Parameters
     ----------
-    cabin_buttons : list
-      A list of booleans indicating which buttons are pressed in the cabin.
+    current_floor : int
+      The current floor of the lift.
+
+    Returns
+    -------
+    delivered : int
+      The number of people who left the cabin.
     """
 
-    for person in self.buffer_cabin:
-      cabin_buttons[person.destination] = True
-    return
+    self.cabin_destinations &= ~(1 << current_floor)
+
+    if self.compact:
+      delivered = self.passengers.unload(current_floor)
+    else:
+      at_destination = [p for p in self.buffer_cabin if p.destination == current_floor]
+
+      for p in at_destination:
+        self.buffer_cabin.remove(p)
+
+      delivered = len(at_destination)
+
+    self.active_persons -= delivered
+    self.delivered_persons += delivered
+    return delivered
 
   def _move_in_cabin(self, current_floor):
     """
     Move people from a floor buffer to the cabin buffer.
     The number of people transferred is limited by the max_capacity and the number of people already in the cabin.
+    The boarded persons press the cabin buttons of their destinations, the call button of the floor is released if
+    nobody is left waiting.
 
     Parameters
     ----------
@@ -588,25 +1035,69 @@ class Environment:
       The number of people transferred from the floor buffer to the cabin buffer.
     """
 
-    counter = 0
+    if self.compact:
+      counter = self.passengers.board(current_floor, self.max_capacity)
 
-    while len(self.buffer_cabin) < self.max_capacity and self.buffer_floor[current_floor]:
-      p = self.buffer_floor[current_floor].pop(0)
-      self.buffer_cabin.append(p)
-      counter += 1
+      if counter:
+        self.cabin_destinations = int(FLOOR_BITS @ (self.passengers.cabin_counts > 0))
+
+      still_waiting = self.passengers.queue_length[current_floor] > 0
+    else:
+      counter = 0
 
+      while len(self.buffer_cabin) < self.max_capacity and self.buffer_floor[current_floor]:
+        p = self.buffer_floor[current_floor].pop(0)
+        self.buffer_cabin.append(p)
+        self.cabin_destinations |= 1 << p.destination
+        counter += 1
+
+      still_waiting = bool(self.buffer_floor[current_floor])
+
+    if not still_waiting:
+      self.waiting_floors &= ~(1 << current_floor)
+
+    self.boarded_persons += counter
     return counter
 
   def get_active_persons(self):
     """
     Get the number of active persons in the lift.
+    The number is counted while persons appear and leave, hence this does not iterate over the buffers.
 
     Returns
     -------
     active_persons : int
       The number of active persons in the lift.
     """
-    return len(self.buffer_cabin) + sum(map(len, self.buffer_floor.values()))
+    return self.active_persons
+
+  def get_waiting_persons(self):
+    """
+    Get the number of persons waiting on each floor.
+
+    Returns
+    -------
+    waiting_persons : list
+      The number of waiting persons per floor.
+    """
+    if self.compact:
+      return self.passengers.waiting().tolist()
+
+    return [len(self.buffer_floor[i]) for i in range(NUMBER_OF_FLOORS)]
+
+  def get_persons_in_cabin(self):
+    """
+    Get the number of persons in the cabin.
+
+    Returns
+    -------
+    persons_in_cabin : int
+      The number of persons in the cabin.
+    """
+    if self.compact:
+      return self.passengers.in_cabin()
+
+    return len(self.buffer_cabin)
 
   @staticmethod
   def get_available_actions(state):
@@ -645,3 +1136,35 @@ class Environment:
 
     # The lift is moving: stop at the next floor or keep going
     return [ACTION_NOOP, ACTION_STOP]
+
+
+def _build_action_mask_table():
+  """
+  Precompute the valid actions for every combination of floor, direction and door.
+  The buttons do not influence the available actions, hence they are not part of the table.
+
+  Returns
+  -------
+  table : np.ndarray
+    A boolean array of shape (floors, directions, doors, actions).
+  """
+
+  table = np.zeros((NUMBER_OF_FLOORS, len(DIRECTIONS), len(DOORS), len(ACTIONS)), dtype=bool)
+  no_buttons = tuple(False for _ in range(NUMBER_OF_FLOORS))
+
+  for floor in range(NUMBER_OF_FLOORS):
+    for d, direction in enumerate(DIRECTIONS):
+      for o, door in enumerate(DOORS):
+        state = (floor, direction, door, no_buttons, no_buttons)
+        for action in Environment.get_available_actions(state):
+          table[floor, d, o, ACTIONS.index(action)] = True
+
+  return table
+
+
+ACTION_MASK_TABLE = _build_action_mask_table()
+
+# The rows of ACTION_MASK_TABLE as tuples of actions (in the order of ACTIONS), indexed by the head of a state,
+# i.e. (floor * len(DIRECTIONS) + direction) * len(DOORS) + door as in encoding.py
+HEAD_ACTIONS = [tuple(ACTIONS[action] for action in np.flatnonzero(mask))
+                for mask in ACTION_MASK_TABLE.reshape(-1, len(ACTIONS))]
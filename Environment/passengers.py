@@ -0,0 +1,200 @@
+from .constants import *
+
+FLOORS = np.arange(NUMBER_OF_FLOORS)
+
+
+def grow_ring_buffers(queue, queue_head, required):
+  """
+  Enlarge ring buffers so that at least the required number of persons fits into each of them.
+  The buffers are stored along the last axis of queue. The waiting persons are moved to the front of the new buffers
+  and queue_head is set to 0 in place.
+
+  Parameters
+  ----------
+  queue : np.ndarray
+    The ring buffers, the last axis holds the destinations of the waiting persons.
+
+  queue_head : np.ndarray
+    The position of the first waiting person in every buffer, with the shape of queue without its last axis.
+
+  required : int
+    The number of persons which must fit into a single buffer.
+
+  Returns
+  -------
+  queue : np.ndarray
+    The given buffers if they are large enough, otherwise new buffers with the doubled size (as often as needed).
+  """
+
+  size = queue.shape[-1]
+  new_size = size
+
+  while new_size < required:
+    new_size *= 2
+
+  if new_size == size:
+    return queue
+
+  offsets = (queue_head[..., None] + np.arange(size)) % size
+  grown = np.zeros(queue.shape[:-1] + (new_size,), dtype=queue.dtype)
+  grown[..., :size] = np.take_along_axis(queue, offsets, axis=-1)
+
+  queue_head[...] = 0
+  return grown
+
+
+class PassengerCounts:
+  """
+  This class is a compact replacement for the Person buffers of the environment.
+
+  The destinations of the waiting persons are stored in one ring buffer per floor, which keeps the boarding order of
+  the Person buffers, and the persons in the cabin are counted in a destination vector. Boarding, unloading and
+  counting are array operations over the floors.
+  """
+
+  def __init__(self, queue_size=16):
+    """
+    Creates empty buffers.
+
+    Parameters
+    ----------
+    queue_size : int
+      The initial number of persons per floor buffer. The buffers grow if more persons are waiting.
+    """
+
+    self.cabin_counts = np.zeros(NUMBER_OF_FLOORS, dtype=np.int64)
+
+    # Destinations of the waiting persons in the order of their arrival
+    self.queue = np.zeros((NUMBER_OF_FLOORS, queue_size), dtype=np.int64)
+    self.queue_head = np.zeros(NUMBER_OF_FLOORS, dtype=np.int64)
+    self.queue_length = np.zeros(NUMBER_OF_FLOORS, dtype=np.int64)
+    return
+
+  def spawn(self, person_locations):
+    """
+    Add new waiting persons.
+    On each floor, the persons queue up in the order of their destination floors.
+
+    Parameters
+    ----------
+    person_locations : np.ndarray
+      An origin×destination matrix with the number of new persons.
+    """
+
+    spawned = person_locations.sum(axis=1)
+    required = self.queue_length + spawned
+    self.queue = grow_ring_buffers(self.queue, self.queue_head, int(required.max()))
+
+    size = self.queue.shape[1]
+
+    for start_floor in np.flatnonzero(spawned):
+      destinations = np.repeat(FLOORS, person_locations[start_floor])
+      tail = self.queue_head[start_floor] + self.queue_length[start_floor]
+      self.queue[start_floor, (tail + np.arange(len(destinations))) % size] = destinations
+
+    self.queue_length = required
+    return
+
+  def unload(self, floor):
+    """
+    Let all persons with the given destination leave the cabin.
+
+    Parameters
+    ----------
+    floor : int
+      The floor at which the cabin is.
+
+    Returns
+    -------
+    delivered : int
+      The number of persons who left the cabin.
+    """
+
+    delivered = int(self.cabin_counts[floor])
+    self.cabin_counts[floor] = 0
+    return delivered
+
+  def board(self, floor, max_capacity):
+    """
+    Move the first waiting persons of a floor into the cabin, as long as there is space.
+
+    Parameters
+    ----------
+    floor : int
+      The floor at which the cabin is.
+
+    max_capacity : int
+      The maximum number of persons in the cabin.
+
+    Returns
+    -------
+    transferred : int
+      The number of persons who entered the cabin.
+    """
+
+    count = int(min(max_capacity - self.cabin_counts.sum(), self.queue_length[floor]))
+
+    if count <= 0:
+      return 0
+
+    positions = (self.queue_head[floor] + np.arange(count)) % self.queue.shape[1]
+    boarded = np.bincount(self.queue[floor, positions], minlength=NUMBER_OF_FLOORS)
+
+    self.cabin_counts += boarded
+    self.queue_head[floor] = (self.queue_head[floor] + count) % self.queue.shape[1]
+    self.queue_length[floor] -= count
+
+    return count
+
+  def waiting(self):
+    """
+    Returns
+    -------
+    waiting : np.ndarray
+      The number of waiting persons on each floor.
+    """
+    return self.queue_length
+
+  def in_cabin(self):
+    """
+    Returns
+    -------
+    in_cabin : int
+      The number of persons in the cabin.
+    """
+    return int(self.cabin_counts.sum())
+
+  def active(self):
+    """
+    Returns
+    -------
+    active : int
+      The number of waiting and travelling persons.
+    """
+    return int(self.cabin_counts.sum() + self.queue_length.sum())
+
+  def snapshot(self):
+    """
+    Returns
+    -------
+    snapshot : tuple
+      Copies of the count arrays and ring buffers.
+    """
+    return self.cabin_counts.copy(), self.queue.copy(), self.queue_head.copy(), self.queue_length.copy()
+
+  def restore(self, snapshot):
+    """
+    Restore the buffers from a snapshot. The snapshot stays valid and can be restored again.
+
+    Parameters
+    ----------
+    snapshot : tuple
+      A snapshot returned by snapshot.
+    """
+    cabin_counts, queue, queue_head, queue_length = snapshot
+
+    self.cabin_counts = cabin_counts.copy()
+    self.queue = queue.copy()
+    self.queue_head = queue_head.copy()
+    self.queue_length = queue_length.copy()
+    return
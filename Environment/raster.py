@@ -0,0 +1,421 @@
+from .constants import *
+
+# A 5×7 bitmap font for the characters used in the info texts.
+# Every glyph is given as 7 rows of 5 pixels, "#" marks a set pixel.
+FONT_5X7 = {
+  " ": [".....", ".....", ".....", ".....", ".....", ".....", "....."],
+  ",": [".....", ".....", ".....", ".....", ".##..", "..#..", ".#..."],
+  ":": [".....", ".##..", ".##..", ".....", ".##..", ".##..", "....."],
+  "0": [".###.", "#...#", "#..##", "#.#.#", "##..#", "#...#", ".###."],
+  "1": ["..#..", ".##..", "..#..", "..#..", "..#..", "..#..", ".###."],
+  "2": [".###.", "#...#", "....#", "...#.", "..#..", ".#...", "#####"],
+  "3": ["#####", "...#.", "..#..", "...#.", "....#", "#...#", ".###."],
+  "4": ["...#.", "..##.", ".#.#.", "#..#.", "#####", "...#.", "...#."],
+  "5": ["#####", "#....", "####.", "....#", "....#", "#...#", ".###."],
+  "6": ["..##.", ".#...", "#....", "####.", "#...#", "#...#", ".###."],
+  "7": ["#####", "....#", "...#.", "..#..", ".#...", ".#...", ".#..."],
+  "8": [".###.", "#...#", "#...#", ".###.", "#...#", "#...#", ".###."],
+  "9": [".###.", "#...#", "#...#", ".####", "....#", "...#.", ".##.."],
+  "C": [".###.", "#...#", "#....", "#....", "#....", "#...#", ".###."],
+  "M": ["#...#", "##.##", "#.#.#", "#.#.#", "#...#", "#...#", "#...#"],
+  "P": ["####.", "#...#", "#...#", "####.", "#....", "#....", "#...."],
+  "W": ["#...#", "#...#", "#...#", "#.#.#", "#.#.#", "#.#.#", ".#.#."],
+  "a": [".....", ".....", ".###.", "....#", ".####", "#...#", ".####"],
+  "b": ["#....", "#....", "#.##.", "##..#", "#...#", "#...#", "####."],
+  "c": [".....", ".....", ".###.", "#....", "#....", "#...#", ".###."],
+  "d": ["....#", "....#", ".##.#", "#..##", "#...#", "#...#", ".####"],
+  "e": [".....", ".....", ".###.", "#...#", "#####", "#....", ".###."],
+  "g": [".....", ".####", "#...#", "#...#", ".####", "....#", ".###."],
+  "i": ["..#..", ".....", ".##..", "..#..", "..#..", "..#..", ".###."],
+  "l": [".##..", "..#..", "..#..", "..#..", "..#..", "..#..", ".###."],
+  "n": [".....", ".....", "#.##.", "##..#", "#...#", "#...#", "#...#"],
+  "o": [".....", ".....", ".###.", "#...#", "#...#", "#...#", ".###."],
+  "p": [".....", ".....", "####.", "#...#", "####.", "#....", "#...."],
+  "r": [".....", ".....", "#.##.", "##..#", "#....", "#....", "#...."],
+  "s": [".....", ".....", ".####", "#....", ".###.", "....#", "####."],
+  "t": [".#...", ".#...", "###..", ".#...", ".#...", ".#..#", "..##."],
+  "u": [".....", ".....", "#...#", "#...#", "#...#", "#..##", ".##.#"],
+  "v": [".....", ".....", "#...#", "#...#", "#...#", ".#.#.", "..#.."],
+  "w": [".....", ".....", "#...#", "#...#", "#.#.#", "#.#.#", ".#.#."],
+}
+
+GLYPHS = "".join(FONT_5X7)
+GLYPH_IDS = {character: i for i, character in enumerate(GLYPHS)}
+
+# Every glyph pixel is drawn as a 2×2 block, the glyphs are placed in cells of 12×16 pixels
+GLYPH_SCALE = 2
+CELL_WIDTH = 12
+CELL_HEIGHT = 16
+
+# Maximal number of digits shown for the counters
+COUNTER_DIGITS = 4
+
+
+def _build_glyph_atlas():
+  """
+  Rasterize the font into an atlas of glyph cells.
+
+  Returns
+  -------
+  atlas : np.ndarray
+    A boolean array of shape (glyphs, CELL_HEIGHT, CELL_WIDTH), True marks a text pixel.
+  """
+
+  atlas = np.zeros((len(GLYPHS), CELL_HEIGHT, CELL_WIDTH), dtype=bool)
+
+  for i, character in enumerate(GLYPHS):
+    bitmap = np.array([[pixel == "#" for pixel in row] for row in FONT_5X7[character]])
+    bitmap = bitmap.repeat(GLYPH_SCALE, axis=0).repeat(GLYPH_SCALE, axis=1)
+    atlas[i, 1:1 + bitmap.shape[0], 1:1 + bitmap.shape[1]] = bitmap
+
+  return atlas
+
+
+def _text_table(texts, length):
+  """
+  Convert texts into rows of glyph indices, padded with spaces.
+
+  Parameters
+  ----------
+  texts : list
+    The texts.
+
+  length : int
+    The number of cells per row.
+
+  Returns
+  -------
+  table : np.ndarray
+    An integer array of shape (len(texts), length).
+  """
+
+  table = np.full((len(texts), length), GLYPH_IDS[" "], dtype=np.intp)
+
+  for i, text in enumerate(texts):
+    table[i, :len(text)] = [GLYPH_IDS[character] for character in text[:length]]
+
+  return table
+
+
+GLYPH_ATLAS = _build_glyph_atlas()
+
+# Precomputed glyph rows for all values of the dynamic texts
+COUNTER_TABLE = _text_table([str(i) for i in range(10 ** COUNTER_DIGITS)], COUNTER_DIGITS)
+BUTTONS_TABLE = _text_table([", ".join(str(floor) for floor in range(NUMBER_OF_FLOORS) if mask >> floor & 1)
+                             for mask in range(2 ** NUMBER_OF_FLOORS)], 3 * NUMBER_OF_FLOORS - 2)
+DIRECTION_TABLE = _text_table(DIRECTIONS, max(map(len, DIRECTIONS)))
+
+
+class NumpyRenderer:
+  """
+  This class draws the lift into NumPy arrays without Pygame.
+
+  It reproduces the layout of Environment.render (floors, shaft, cabin with door shading, stick figures for waiting
+  persons and persons in the cabin, and optionally the texts) with a built-in bitmap font. Everything that does not
+  depend on the state is drawn once into a background image. A frame is produced by copying the background and
+  placing precomputed sprites, so a whole batch of states is rendered with a few array operations.
+  """
+
+  def __init__(self, width=600, height=800, text=True):
+    """
+    Creates a renderer and prepares the background and the sprites.
+
+    Parameters
+    ----------
+    width : int
+      The width of the image.
+
+    height : int
+      The height of the image.
+
+    text : bool
+      Whether the texts (floor numbers, waiting persons and the info panel) are drawn.
+    """
+
+    self.width = width
+    self.height = height
+    self.text = text
+
+    # The dimensions follow Environment.render
+    self.info_height = 150
+    self.floor_height = (height - self.info_height) / NUMBER_OF_FLOORS
+    self.lift_width = 100
+    self.dist = 5
+
+    self.background = self._build_background()
+    self.cabin_sprites, self.cabin_box = self._build_cabin_sprites()
+    self.stickman = self._build_stickman()
+    return
+
+  def render(self, env, out=None):
+    """
+    Render the current state of an Environment.
+
+    Parameters
+    ----------
+    env : Environment
+      The environment to draw.
+
+    out : np.ndarray or None
+      A preallocated uint8 array of shape (height, width, 3).
+
+    Returns
+    -------
+    image : np.ndarray
+      The rendered image.
+    """
+
+    floor, direction, door, cabin_buttons, call_buttons = env.state
+    bits = 1 << np.arange(NUMBER_OF_FLOORS)
+
+    frames = self.render_batch(np.array([floor]),
+                               np.array([DIRECTIONS.index(direction)]),
+                               np.array([DOORS.index(door)]),
+                               np.array([bits @ np.array(cabin_buttons, dtype=int)]),
+                               np.array([bits @ np.array(call_buttons, dtype=int)]),
+                               np.array([env.get_waiting_persons()]),
+                               np.array([env.get_persons_in_cabin()]),
+                               out=None if out is None else out[None])
+    return frames[0]
+
+  def render_vector(self, venv, out=None):
+    """
+    Render all lanes of a VectorEnvironment.
+
+    Parameters
+    ----------
+    venv : VectorEnvironment
+      The environments to draw.
+
+    out : np.ndarray or None
+      A preallocated uint8 array of shape (N, height, width, 3).
+
+    Returns
+    -------
+    images : np.ndarray
+      The rendered images.
+    """
+
+    states = venv.get_states()
+    return self.render_batch(states[:, 0], states[:, 1], states[:, 2], states[:, 3], states[:, 4],
+                             venv.queue_length, venv.cabin.sum(axis=1), out=out)
+
+  def render_batch(self, floors, directions, doors, cabin_buttons, call_buttons, waiting, in_cabin, out=None):
+    """
+    Render a batch of states.
+
+    Parameters
+    ----------
+    floors : np.ndarray
+      The current floors, shape (N,).
+
+    directions : np.ndarray
+      The indices of the move directions in DIRECTIONS.
+
+    doors : np.ndarray
+      The indices of the door states in DOORS.
+
+    cabin_buttons : np.ndarray
+      Bitmasks of the pressed cabin buttons.
+
+    call_buttons : np.ndarray
+      Bitmasks of the pressed call buttons.
+
+    waiting : np.ndarray
+      The number of waiting persons per floor, shape (N, NUMBER_OF_FLOORS).
+
+    in_cabin : np.ndarray
+      The number of persons in the cabin.
+
+    out : np.ndarray or None
+      A preallocated uint8 array of shape (N, height, width, 3).
+
+    Returns
+    -------
+    images : np.ndarray
+      The rendered images.
+    """
+
+    n = len(floors)
+
+    if out is None:
+      out = np.empty((n, self.height, self.width, 3), dtype=np.uint8)
+
+    out[:] = self.background
+
+    # Cabin, one sprite per floor and door state
+    x0, x1, height = self.cabin_box
+    door_closed = doors == DOORS.index(DOOR_CLOSED)
+
+    for floor in range(NUMBER_OF_FLOORS):
+      y0 = self._floor_top(floor) + self.dist
+
+      for closed in (False, True):
+        lanes = np.flatnonzero((floors == floor) & (door_closed == closed))
+
+        if len(lanes):
+          out[lanes, y0:y0 + height, x0:x1] = self.cabin_sprites[int(closed)]
+
+    # Stick figures for waiting persons and persons in the cabin
+    for floor in range(NUMBER_OF_FLOORS):
+      self._draw_stickman(out, np.flatnonzero(waiting[:, floor] > 0),
+                          self.width // 2 - self.lift_width, self._floor_bottom(floor) - 40)
+
+    for floor in range(NUMBER_OF_FLOORS):
+      self._draw_stickman(out, np.flatnonzero((in_cabin > 0) & (floors == floor)),
+                          self.width // 2 - 10, self._floor_bottom(floor) - 40)
+
+    if self.text:
+      waiting = np.minimum(waiting, 10 ** COUNTER_DIGITS - 1)
+      in_cabin = np.minimum(in_cabin, 10 ** COUNTER_DIGITS - 1)
+      info_top = self.height - self.info_height
+
+      for floor in range(NUMBER_OF_FLOORS):
+        self._draw_glyphs(out, COUNTER_TABLE[waiting[:, floor]],
+                          10 + len("Waiting: ") * CELL_WIDTH, self._floor_bottom(floor) - 24)
+
+      self._draw_glyphs(out, COUNTER_TABLE[in_cabin], 10 + len("People in cabin: ") * CELL_WIDTH, info_top + 10)
+      self._draw_glyphs(out, BUTTONS_TABLE[cabin_buttons], 10 + len("Cabin buttons: ") * CELL_WIDTH, info_top + 40)
+      self._draw_glyphs(out, BUTTONS_TABLE[call_buttons], 10 + len("Call buttons: ") * CELL_WIDTH, info_top + 70)
+      self._draw_glyphs(out, DIRECTION_TABLE[directions], 10 + len("Moving direction: ") * CELL_WIDTH, info_top + 100)
+
+    return out
+
+  def _floor_top(self, floor):
+    """ The first pixel row of a floor. """
+    return int((NUMBER_OF_FLOORS - floor - 1) * self.floor_height)
+
+  def _floor_bottom(self, floor):
+    """ The pixel row of the lower edge of a floor. """
+    return int((NUMBER_OF_FLOORS - floor) * self.floor_height)
+
+  def _draw_glyphs(self, out, glyphs, x, y):
+    """
+    Draw one row of glyphs per image.
+
+    Parameters
+    ----------
+    out : np.ndarray
+      The images.
+
+    glyphs : np.ndarray
+      The glyph indices, shape (N, length).
+
+    x, y : int
+      The position of the upper left corner of the first glyph.
+    """
+
+    for i in range(glyphs.shape[1]):
+      left = x + i * CELL_WIDTH
+      region = out[:, y:y + CELL_HEIGHT, left:left + CELL_WIDTH]
+      mask = GLYPH_ATLAS[glyphs[:, i]][..., None]
+      np.copyto(region, 0, where=mask[:, :region.shape[1], :region.shape[2]])
+    return
+
+  def _draw_stickman(self, out, lanes, x, y):
+    """
+    Draw a stick figure with its hip at (x, y) into the selected images.
+    """
+
+    if not len(lanes):
+      return
+
+    height, width = self.stickman.shape
+    top, left = y - 20, x - 10
+    region = out[lanes, top:top + height, left:left + width]
+    region[:, self.stickman] = 0
+    out[lanes, top:top + height, left:left + width] = region
+    return
+
+  def _build_background(self):
+    """
+    Draw the static parts: white background, floor lines, floor numbers, bottom line, lift shaft and text labels.
+    """
+
+    image = np.full((self.height, self.width, 3), 255, dtype=np.uint8)
+    shaft_left = (self.width - self.lift_width) // 2
+    shaft_right = (self.width + self.lift_width) // 2
+    building_height = self.height - self.info_height
+
+    for i in range(NUMBER_OF_FLOORS):
+      y = int(i * self.floor_height)
+      image[y, :shaft_left] = 150
+      image[y, shaft_right:] = 150
+
+    # Bottom line and lift shaft (5 pixels wide)
+    image[int(NUMBER_OF_FLOORS * self.floor_height) - 2:int(NUMBER_OF_FLOORS * self.floor_height) + 3, :] = 0
+    image[:building_height, shaft_left - 2:shaft_left + 3] = 0
+    image[:building_height, shaft_right - 2:shaft_right + 3] = 0
+
+    if self.text:
+      batch = image[None]
+
+      for floor in range(NUMBER_OF_FLOORS):
+        self._draw_glyphs(batch, _text_table([str(floor)], 1), 10, self._floor_top(floor) + 10)
+        self._draw_glyphs(batch, _text_table(["Waiting:"], 8), 10, self._floor_bottom(floor) - 24)
+
+      info_top = self.height - self.info_height
+      for i, label in enumerate(["People in cabin:", "Cabin buttons:", "Call buttons:", "Moving direction:"]):
+        self._draw_glyphs(batch, _text_table([label], len(label)), 10, info_top + 10 + 30 * i)
+
+    return image
+
+  def _build_cabin_sprites(self):
+    """
+    Draw the cabin with open and closed door.
+
+    Returns
+    -------
+    sprites : list
+      The images of the cabin with open (index 0) and closed (index 1) door.
+
+    box : tuple
+      The first and last column and the height of the sprites.
+    """
+
+    x0 = (self.width - self.lift_width) // 2 + self.dist
+    x1 = x0 + self.lift_width - 2 * self.dist
+    height = int(self.floor_height - 2 * self.dist)
+    border = 5
+
+    open_door = np.full((height, x1 - x0, 3), 255, dtype=np.uint8)
+    open_door[:border] = 0
+    open_door[-border:] = 0
+    open_door[:, :border] = 0
+    open_door[:, -border:] = 0
+
+    closed_door = open_door.copy()
+    closed_door[border:-border, border:-border] = 150
+
+    # The line between both door wings (3 pixels wide)
+    middle = self.width // 2 - x0
+    closed_door[:height - 2, middle - 1:middle + 2] = 0
+
+    return [open_door, closed_door], (x0, x1, height)
+
+  def _build_stickman(self):
+    """
+    Rasterize a stick figure with its hip at (10, 20) into a boolean mask of shape (41, 21).
+    """
+
+    mask = np.zeros((41, 21), dtype=bool)
+    hip_x, hip_y = 10, 20
+
+    def line(start, end):
+      steps = max(abs(end[0] - start[0]), abs(end[1] - start[1])) + 1
+      xs = np.rint(np.linspace(start[0], end[0], steps)).astype(int)
+      ys = np.rint(np.linspace(start[1], end[1], steps)).astype(int)
+      mask[ys, xs] = True
+
+    # Head
+    yy, xx = np.mgrid[:41, :21]
+    mask |= (xx - hip_x) ** 2 + (yy - (hip_y - 15)) ** 2 <= 5 ** 2
+
+    # Body, legs and arms
+    line((hip_x, hip_y), (hip_x, hip_y - 15))
+    line((hip_x, hip_y), (hip_x - 10, hip_y + 20))
+    line((hip_x, hip_y), (hip_x + 10, hip_y + 20))
+    line((hip_x, hip_y - 5), (hip_x - 10, hip_y - 10))
+    line((hip_x, hip_y - 5), (hip_x + 10, hip_y - 10))
+
+    return mask
@@ -0,0 +1,161 @@
+from pathlib import Path
+import numpy as np
+
+class FrameRecorder:
+  """
+  This class writes rendered frames into an animation while they are produced.
+
+  Each frame is appended to an open writer, hence neither the frames nor intermediate PNG files have to be kept until
+  the end of a recording. GIFs are written by a GifWriter, which encodes every frame with Pillow and writes it to the
+  file directly. Other formats (e.g. mp4) use the default imageio writer of the file type.
+  """
+
+  def __init__(self, path, fps=5, frame_skip=1, scale=1, frames_dir=None):
+    """
+    Creates a recorder. The output file is opened with the first frame.
+
+    Parameters
+    ----------
+    path : str or Path
+      The output file, e.g. animation.gif.
+
+    fps : int
+      The frame rate of the rendered frames.
+
+    frame_skip : int
+      Only every frame_skip-th frame is recorded. The frame rate of the output is reduced accordingly.
+
+    scale : int
+      The frames are downscaled by this integer factor (by averaging blocks of scale×scale pixels).
+
+    frames_dir : str, Path or None
+      If given, every recorded frame is additionally saved as PNG in this directory.
+    """
+
+    self.path = Path(path)
+    self.fps = fps
+    self.frame_skip = frame_skip
+    self.scale = scale
+    self.frames_dir = None if frames_dir is None else Path(frames_dir)
+
+    self.writer = None
+    self.frame_count = 0
+    self.recorded = 0
+    return
+
+  def append(self, frame):
+    """
+    Record a frame (unless it is skipped).
+
+    Parameters
+    ----------
+    frame : np.ndarray
+      An RGB image of shape (height, width, 3).
+    """
+
+    index = self.frame_count
+    self.frame_count += 1
+
+    if index % self.frame_skip != 0:
+      return
+
+    if self.scale > 1:
+      height = frame.shape[0] // self.scale * self.scale
+      width = frame.shape[1] // self.scale * self.scale
+      frame = frame[:height, :width].reshape(height // self.scale, self.scale, width // self.scale, self.scale, 3)
+      frame = frame.mean(axis=(1, 3)).astype(np.uint8)
+
+    if self.writer is None:
+      self.path.parent.mkdir(exist_ok=True, parents=True)
+
+      if self.path.suffix.lower() == ".gif":
+        self.writer = GifWriter(self.path, fps=self.fps / self.frame_skip)
+      else:
+        import imageio
+        self.writer = imageio.get_writer(self.path, mode="I", fps=self.fps / self.frame_skip)
+
+    self.writer.append_data(frame)
+
+    if self.frames_dir is not None:
+      import imageio
+      self.frames_dir.mkdir(exist_ok=True, parents=True)
+      imageio.imwrite(self.frames_dir / f"frame_{self.recorded:03d}.png", frame)
+
+    self.recorded += 1
+    return
+
+  def close(self):
+    """
+    Finish the output file.
+    """
+
+    if self.writer is not None:
+      self.writer.close()
+      self.writer = None
+    return
+
+
+class GifWriter:
+  """
+  This class writes an animated GIF frame by frame.
+
+  Every frame is converted to a palette image with at most 256 colours and encoded by Pillow together with its own
+  local colour table, whose size always matches the palette. Frames with fewer than 256 colours are stored exactly.
+  Only the current frame is held in memory.
+  """
+
+  def __init__(self, path, fps=5, loop=0):
+    """
+    Opens the output file.
+
+    Parameters
+    ----------
+    path : str or Path
+      The output file.
+
+    fps : float
+      The frame rate of the animation.
+
+    loop : int
+      The number of repetitions, 0 repeats the animation forever.
+    """
+
+    self.file = open(path, "wb")
+    self.duration = round(1000 / fps)
+    self.loop = loop
+    self.count = 0
+    return
+
+  def append_data(self, frame):
+    """
+    Encode a frame and append it to the file.
+
+    Parameters
+    ----------
+    frame : np.ndarray
+      An RGB image of shape (height, width, 3).
+    """
+
+    from PIL import Image, GifImagePlugin
+
+    image = Image.fromarray(np.ascontiguousarray(frame[..., :3], dtype=np.uint8))
+    image = image.quantize(colors=256, dither=Image.Dither.NONE)
+
+    if self.count == 0:
+      header, _ = GifImagePlugin.getheader(image, info={"loop": self.loop, "duration": self.duration})
+      self.file.write(b"".join(header))
+
+    # Disposal 1 keeps the frame in place, the next frame covers the whole canvas anyway
+    data = GifImagePlugin.getdata(image, duration=self.duration, disposal=1, include_color_table=True)
+    self.file.write(b"".join(data))
+    self.count += 1
+    return
+
+  def close(self):
+    """
+    Write the trailer and close the file.
+    """
+
+    self.file.write(b";")
+    self.file.close()
+    return
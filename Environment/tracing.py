@@ -0,0 +1,175 @@
+import json
+from collections import deque
+from time import perf_counter
+import numpy as np
+
+class Tracer:
+  """
+  This class collects timings of the phases and counters of the hot paths.
+
+  A tracer is passed to Environment (and to the training loop), which then report how long each phase of a step
+  takes and how many persons are spawned, boarded, delivered or waiting. Without a tracer, the only cost is a check
+  against None per phase.
+
+  Timings are aggregated in histograms with power-of-two bins in nanoseconds, counters in histograms of their values.
+  Hence the memory usage does not grow with the number of steps. The percentiles of the histograms are only exact up
+  to a factor of two; for selected phases, the most recent timings can additionally be kept to compute exact ones.
+  """
+
+  def __init__(self, samples=None):
+    """
+    Creates an empty tracer.
+
+    Parameters
+    ----------
+    samples : dict or None
+      Maps phase names to the number of most recent timings which are kept exactly, e.g. {"decision": 65536}.
+      The percentiles of these phases are computed from the kept timings instead of the histogram.
+    """
+    self.timings = {}
+    self.totals = {}
+    self.counters = {}
+    self.samples = {phase: deque(maxlen=size) for phase, size in (samples or {}).items()}
+    return
+
+  def record(self, phase, since):
+    """
+    Record the time passed since a previous timestamp.
+
+    Parameters
+    ----------
+    phase : str
+      The name of the phase.
+
+    since : float
+      The timestamp (from time.perf_counter) at which the phase started.
+
+    Returns
+    -------
+    now : float
+      The current timestamp, which can be used as start of the next phase.
+    """
+
+    now = perf_counter()
+    nanoseconds = int((now - since) * 1e9)
+
+    bins = self.timings.get(phase)
+    if bins is None:
+      bins = self.timings[phase] = [0] * 64
+      self.totals[phase] = 0
+
+    bins[min(nanoseconds.bit_length(), 63)] += 1
+    self.totals[phase] += nanoseconds
+
+    window = self.samples.get(phase)
+    if window is not None:
+      window.append(nanoseconds)
+
+    return now
+
+  def count(self, name, value):
+    """
+    Record a value of a counter, e.g. the number of persons spawned in one step.
+
+    Parameters
+    ----------
+    name : str
+      The name of the counter.
+
+    value : int
+      The observed value.
+    """
+
+    histogram = self.counters.get(name)
+    if histogram is None:
+      histogram = self.counters[name] = {}
+
+    value = int(value)
+    histogram[value] = histogram.get(value, 0) + 1
+    return
+
+  def summary(self):
+    """
+    Aggregate the recorded data.
+
+    Returns
+    -------
+    summary : dict
+      For every phase the number of calls, the total and mean time, the percentiles as well as the histogram (upper
+      bin edge in nanoseconds to count). The percentiles are exact over the kept timings (their number is given as
+      "samples") for the phases given to the constructor, otherwise the upper edges of the histogram bins.
+      For every counter the number of observations, the sum, mean and maximum value and the histogram.
+    """
+
+    phases = {}
+
+    for phase, bins in self.timings.items():
+      calls = sum(bins)
+      total = self.totals[phase]
+      phases[phase] = {
+        "calls": calls,
+        "total_s": total / 1e9,
+        "mean_us": total / calls / 1e3,
+        "p50_us": self._percentile(bins, 0.50) / 1e3,
+        "p99_us": self._percentile(bins, 0.99) / 1e3,
+        "histogram_ns": {2 ** i: n for i, n in enumerate(bins) if n},
+      }
+
+      window = self.samples.get(phase)
+      if window:
+        p50, p99 = np.percentile(np.fromiter(window, dtype=np.int64, count=len(window)), [50, 99]) / 1e3
+        phases[phase].update({"p50_us": float(p50), "p99_us": float(p99), "samples": len(window)})
+
+    counters = {}
+
+    for name, histogram in self.counters.items():
+      observations = sum(histogram.values())
+      total = sum(value * n for value, n in histogram.items())
+      counters[name] = {
+        "observations": observations,
+        "sum": total,
+        "mean": total / observations,
+        "max": max(histogram),
+        "histogram": dict(sorted(histogram.items())),
+      }
+
+    return {"phases": phases, "counters": counters}
+
+  def save(self, path):
+    """
+    Write the summary as JSON.
+
+    Parameters
+    ----------
+    path : str or Path
+      The output file.
+    """
+
+    with open(path, "w") as f:
+      json.dump(self.summary(), f, indent=2)
+    return
+
+  def report(self):
+    """
+    Print a table of the phases, sorted by total time.
+    """
+
+    phases = self.summary()["phases"]
+    for phase, data in sorted(phases.items(), key=lambda item: -item[1]["total_s"]):
+      print(f"{phase:16s} {data['calls']:10d} calls {data['total_s']:9.3f} s "
+            f"mean {data['mean_us']:8.2f} us p99 {data['p99_us']:8.2f} us")
+    return
+
+  @staticmethod
+  def _percentile(bins, q):
+    """ Upper edge of the histogram bin containing the q-quantile. """
+
+    target = q * sum(bins)
+    seen = 0
+
+    for i, n in enumerate(bins):
+      seen += n
+      if seen >= target:
+        return 2 ** i
+
+    return 2 ** (len(bins) - 1)
@@ -0,0 +1,171 @@
+from .constants import *
+
+# Number of timesteps of a simulated day, one timestep corresponds to 10 seconds
+DAY_LENGTH = 24 * 60 * 6
+
+class TrafficSchedule:
+  """
+  This class describes passenger traffic which changes with the time of day.
+
+  The schedule is given by keyframes, each a time of day in hours with a passenger distribution like
+  PASSENGER_DISTRIBUTION. Between two keyframes, the distributions are blended with a cosine ramp, hence the
+  traffic changes smoothly and the day wraps around from the last keyframe to the first one.
+
+  The day is divided into periods of equal length. For every period, the blended distribution and the derived
+  sampling tables (arrival probabilities, probability of no arrival and the conditional distribution of the first
+  arrival, see Environment.advance_idle) are computed once in the constructor. During a step, the environment only
+  looks up the tables of the current period.
+  """
+
+  def __init__(self, keyframes, day_length=DAY_LENGTH, periods=96):
+    """
+    Creates a schedule and precomputes the tables of all periods.
+
+    Parameters
+    ----------
+    keyframes : list
+      Pairs (hour, distribution) with 0 <= hour < 24 and a NUMBER_OF_FLOORS×NUMBER_OF_FLOORS matrix holding the
+      probability of a new person per start and destination floor and timestep.
+
+    day_length : int
+      The number of timesteps of a day.
+
+    periods : int
+      The number of periods of a day, the distribution is constant within a period.
+    """
+
+    if not keyframes:
+      raise ValueError("A traffic schedule needs at least one keyframe.")
+
+    keyframes = sorted(((float(hour), np.asarray(distribution, dtype=np.float64)) for hour, distribution in keyframes),
+                       key=lambda keyframe: keyframe[0])
+    hours = np.array([hour for hour, _ in keyframes])
+    distributions = np.array([distribution for _, distribution in keyframes])
+
+    if distributions.shape[1:] != PASSENGER_DISTRIBUTION.shape:
+      raise ValueError(f"Expected distributions of shape {PASSENGER_DISTRIBUTION.shape}, "
+                       f"got {distributions.shape[1:]}.")
+
+    if ((distributions < 0) | (distributions > 1)).any() or ((hours < 0) | (hours >= 24)).any():
+      raise ValueError("Probabilities have to be within [0, 1] and hours within [0, 24).")
+
+    if len(keyframes) == 1:
+      periods = 1
+
+    self.day_length = day_length
+    self.periods = periods
+
+    # The blended distribution at the middle of every period
+    middles = (np.arange(periods) + 0.5) * 24 / periods
+    nexts = np.searchsorted(hours, middles, side="right") % len(hours)
+    previous = (nexts - 1) % len(hours)
+    span = (hours[nexts] - hours[previous]) % 24
+    progress = np.divide((middles - hours[previous]) % 24, span, out=np.zeros(periods), where=span > 0)
+    weights = ((1 - np.cos(np.pi * progress)) / 2)[:, None, None]
+
+    self.distributions = (1 - weights) * distributions[previous] + weights * distributions[nexts]
+    self.probabilities = self.distributions.reshape(periods, -1)
+
+    # Probability that not a single person appears in one timestep of a period
+    self.no_arrival = np.prod(1 - self.probabilities, axis=1)
+
+    # Given that at least one person appears, the probability that cell k is the first cell (in row-major order) with
+    # a new person: p_k * prod_{j<k} (1 - p_j) / (1 - no_arrival)
+    first = self.probabilities * np.concatenate((np.ones((periods, 1)),
+                                                 np.cumprod(1 - self.probabilities, axis=1)[:, :-1]), axis=1)
+    self.first_arrival = np.divide(first, (1 - self.no_arrival)[:, None], out=np.zeros_like(first),
+                                   where=self.no_arrival[:, None] < 1)
+
+  @classmethod
+  def constant(cls, distribution):
+    """
+    Create a schedule with the same distribution all day long.
+
+    Parameters
+    ----------
+    distribution : np.ndarray
+      The passenger distribution.
+
+    Returns
+    -------
+    schedule : TrafficSchedule
+      A schedule with a single period.
+    """
+
+    return cls([(0, distribution)])
+
+  def period(self, time):
+    """
+    Get the period of a timestep.
+
+    Parameters
+    ----------
+    time : int
+      The timestep, counted from midnight of the first day.
+
+    Returns
+    -------
+    period : int
+      The index of the period in the tables.
+    """
+
+    if self.periods == 1:
+      return 0
+
+    return time % self.day_length * self.periods // self.day_length
+
+  def remaining(self, time):
+    """
+    Get the number of timesteps until the next period starts.
+
+    Parameters
+    ----------
+    time : int
+      The timestep, counted from midnight of the first day.
+
+    Returns
+    -------
+    ticks : int or None
+      The number of timesteps including the given one, None if the distribution never changes.
+    """
+
+    if self.periods == 1:
+      return None
+
+    # The first timestep of the next period is the smallest t with t * periods >= (period + 1) * day_length
+    day_time = time % self.day_length
+    end = -(-(self.period(time) + 1) * self.day_length // self.periods)
+    return end - day_time
+
+
+def _office_day():
+  """
+  Build the keyframes of a day in an office building with floor 0 as entrance.
+
+  Returns
+  -------
+  keyframes : list
+    The keyframes for TrafficSchedule.
+  """
+
+  up_peak = PASSENGER_DISTRIBUTION * 0.3
+  up_peak[0, 1:] += 0.015
+
+  down_peak = PASSENGER_DISTRIBUTION * 0.3
+  down_peak[1:, 0] += 0.015
+
+  lunch = PASSENGER_DISTRIBUTION * 0.3
+  lunch[0, 1:] += 0.006
+  lunch[1:, 0] += 0.006
+
+  night = PASSENGER_DISTRIBUTION * 0.05
+
+  return [(0, night), (6, night), (8.5, up_peak), (10.5, PASSENGER_DISTRIBUTION), (12.5, lunch),
+          (14, PASSENGER_DISTRIBUTION), (17.5, down_peak), (20, PASSENGER_DISTRIBUTION * 0.3), (22, night)]
+
+
+# Traffic with the static PASSENGER_DISTRIBUTION, used if no schedule is given
+CONSTANT_TRAFFIC = TrafficSchedule.constant(PASSENGER_DISTRIBUTION)
+
+# Morning up-peak, lunch traffic and evening down-peak of an office building
+OFFICE_DAY = TrafficSchedule(_office_day())
@@ -0,0 +1,391 @@
+from .constants import *
+from .environment import Environment, ACTION_MASK_TABLE
+from .passengers import grow_ring_buffers
+
+# Column layout of the state array returned by VectorEnvironment
+STATE_FLOOR = 0
+STATE_DIRECTION = 1
+STATE_DOOR = 2
+STATE_CABIN_BUTTONS = 3
+STATE_CALL_BUTTONS = 4
+
+# Integer codes of the directions, door states and actions (their index in the constant lists)
+DIRECTION_UP_ID = DIRECTIONS.index(DIRECTION_UP)
+DIRECTION_NONE_ID = DIRECTIONS.index(DIRECTION_NONE)
+DIRECTION_DOWN_ID = DIRECTIONS.index(DIRECTION_DOWN)
+
+DOOR_OPEN_ID = DOORS.index(DOOR_OPEN)
+DOOR_CLOSED_ID = DOORS.index(DOOR_CLOSED)
+
+ACTION_UP_ID = ACTIONS.index(ACTION_UP)
+ACTION_DOWN_ID = ACTIONS.index(ACTION_DOWN)
+ACTION_STOP_ID = ACTIONS.index(ACTION_STOP)
+ACTION_DOOR_ID = ACTIONS.index(ACTION_DOOR)
+ACTION_NOOP_ID = ACTIONS.index(ACTION_NOOP)
+
+
+class VectorEnvironment:
+  """
+  This class simulates N independent lifts at once.
+  All lanes follow exactly the transition rules of Environment.step, but the state of every lane is kept in
+  NumPy arrays so that a single call to step advances the whole batch.
+
+  The state of the batch is an integer array of shape (N, 5) with the columns
+  * STATE_FLOOR: The current floor of the lift.
+  * STATE_DIRECTION: The index of the move direction in DIRECTIONS.
+  * STATE_DOOR: The index of the door state in DOORS.
+  * STATE_CABIN_BUTTONS: A bitmask of the pressed cabin buttons (bit i belongs to floor i).
+  * STATE_CALL_BUTTONS: A bitmask of the pressed call buttons.
+
+  Actions are given as an integer array holding indices into ACTIONS.
+
+  Waiting persons are stored per floor in ring buffers holding their destinations, so that they enter the cabin in
+  the same order as in Environment. The cabin only stores how many persons travel to each floor.
+
+  With num_envs=1 and the same seed, the lift produces the same states as Environment for the same actions.
+  With more lanes, all lanes draw from the one generator owned by the batch.
+  """
+
+  def __init__(self, num_envs, max_capacity=4, episode_length=None, seed=None, queue_size=16):
+    """
+    Creates a batch of fresh lift environments.
+
+    Parameters
+    ----------
+    num_envs : int
+      The number of independent lifts (lanes).
+
+    max_capacity : int
+      The maximum number of persons in a cabin.
+
+    episode_length : int or None
+      The number of steps after which a lane is reset automatically. None disables the auto-reset.
+
+    seed : int, np.random.SeedSequence or None
+      The seed of the random number generator.
+
+    queue_size : int
+      The initial number of persons per floor buffer. The buffers grow if more persons are waiting.
+    """
+
+    self.num_envs = num_envs
+    self.max_capacity = max_capacity
+    self.episode_length = episode_length
+    self.seed = seed
+    self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    self.rng = np.random.default_rng(self.seed_sequence)
+    self.lanes = np.arange(num_envs)
+
+    self.floor = np.zeros(num_envs, dtype=np.int64)
+    self.direction = np.full(num_envs, DIRECTION_NONE_ID, dtype=np.int64)
+    self.door = np.full(num_envs, DOOR_CLOSED_ID, dtype=np.int64)
+    self.cabin_buttons = np.zeros((num_envs, NUMBER_OF_FLOORS), dtype=bool)
+    self.call_buttons = np.zeros((num_envs, NUMBER_OF_FLOORS), dtype=bool)
+
+    # Destinations of the waiting persons per lane and floor, stored as ring buffers
+    self.queue = np.zeros((num_envs, NUMBER_OF_FLOORS, queue_size), dtype=np.int64)
+    self.queue_head = np.zeros((num_envs, NUMBER_OF_FLOORS), dtype=np.int64)
+    self.queue_length = np.zeros((num_envs, NUMBER_OF_FLOORS), dtype=np.int64)
+
+    # Number of persons in the cabin per destination
+    self.cabin = np.zeros((num_envs, NUMBER_OF_FLOORS), dtype=np.int64)
+
+    self.person_counter = np.zeros(num_envs, dtype=np.int64)
+    self.elapsed = np.zeros(num_envs, dtype=np.int64)
+
+    self.reset()
+    return
+
+  def step(self, actions):
+    """
+    Take a step in every lane.
+
+    Parameters
+    ----------
+    actions : np.ndarray
+      An integer array of shape (N,) with the index of the action to take in each lane.
+
+    Returns
+    -------
+    states : np.ndarray
+      The new states of the lanes. Lanes which have been reset contain their fresh initial state.
+
+    dones : np.ndarray
+      A boolean array indicating which lanes reached the episode length and have been reset.
+      The last state of these lanes before the reset is stored in final_states.
+      The number of persons who left the cabin in this step is stored in delivered.
+    """
+
+    actions = np.asarray(actions, dtype=np.int64)
+
+    # Check the allowed actions
+    valid = ACTION_MASK_TABLE[self.floor, self.direction, self.door, actions]
+
+    if not valid.all():
+      lane = int(np.flatnonzero(~valid)[0])
+      raise ValueError(f"It is not allowed to execute <{ACTIONS[actions[lane]]}> in lane {lane} "
+                       f"with state {self.get_state(lane)}.\n"
+                       f"Valid actions are {Environment.get_available_actions(self.get_state(lane))}.")
+
+    # The call button is active on every floor, where people are waiting.
+    self.call_buttons |= self.queue_length > 0
+
+    # If the door is open, people leave and enter the cabin
+    door_open = self.door == DOOR_OPEN_ID
+    self.delivered = np.zeros(self.num_envs, dtype=np.int64)
+
+    if door_open.any():
+      lanes = self.lanes[door_open]
+      floors = self.floor[door_open]
+
+      # The buttons for the current floor are turned off since that floor is served
+      self.cabin_buttons[lanes, floors] = False
+      self.call_buttons[lanes, floors] = False
+
+      # Let people out, they arrived at their desired floor
+      self.delivered[lanes] = self.cabin[lanes, floors]
+      self.cabin[lanes, floors] = 0
+
+      # Let people in (as long as there is space) and let them press the cabin buttons
+      self._move_in_cabin(door_open)
+      self.cabin_buttons[door_open] |= self.cabin[door_open] > 0
+
+      self.door[door_open & (actions == ACTION_DOOR_ID)] = DOOR_CLOSED_ID
+
+    # If waiting, doors can be opened or the lift can start to move
+    waiting = ~door_open & (self.direction == DIRECTION_NONE_ID)
+
+    self.door[waiting & (actions == ACTION_DOOR_ID)] = DOOR_OPEN_ID
+    self.direction[waiting & (actions == ACTION_UP_ID)] = DIRECTION_UP_ID
+    self.direction[waiting & (actions == ACTION_DOWN_ID)] = DIRECTION_DOWN_ID
+
+    # If moving, the lift updates its current floor and stops at the top and ground floor
+    moving_up = ~door_open & ~waiting & (self.direction == DIRECTION_UP_ID)
+    moving_down = ~door_open & ~waiting & (self.direction == DIRECTION_DOWN_ID)
+
+    self.floor += moving_up
+    self.floor -= moving_down
+
+    arrived = (moving_up & (self.floor == NUMBER_OF_FLOORS - 1)) | (moving_down & (self.floor == 0))
+    stopped = (moving_up | moving_down) & (actions == ACTION_STOP_ID)
+    self.direction[arrived | stopped] = DIRECTION_NONE_ID
+
+    # Generate new persons for the next step (after the transition, as in Environment)
+    self._new_persons(np.ones(self.num_envs, dtype=bool))
+
+    self.elapsed += 1
+
+    # Reset the lanes which reached the end of their episode
+    dones = np.zeros(self.num_envs, dtype=bool)
+    self.final_states = None
+
+    if self.episode_length is not None:
+      dones = self.elapsed >= self.episode_length
+
+      if dones.any():
+        self.final_states = self.get_states()
+        self._reset_lanes(dones)
+
+    return self.get_states(), dones
+
+  def reset(self):
+    """
+    Reset all lanes to their initial state.
+
+    Returns
+    -------
+    states : np.ndarray
+      The fresh initial states of the lanes.
+    """
+
+    if self.seed is not None:
+      self.rng = np.random.default_rng(self.seed_sequence)
+
+    self.final_states = None
+    self.delivered = np.zeros(self.num_envs, dtype=np.int64)
+    self._reset_lanes(np.ones(self.num_envs, dtype=bool))
+
+    return self.get_states()
+
+  def get_states(self):
+    """
+    Get the states of all lanes as an integer array.
+
+    Returns
+    -------
+    states : np.ndarray
+      An integer array of shape (N, 5), see the class description for the columns.
+    """
+
+    states = np.empty((self.num_envs, 5), dtype=np.int64)
+    states[:, STATE_FLOOR] = self.floor
+    states[:, STATE_DIRECTION] = self.direction
+    states[:, STATE_DOOR] = self.door
+    states[:, STATE_CABIN_BUTTONS] = self.cabin_buttons @ FLOOR_BITS
+    states[:, STATE_CALL_BUTTONS] = self.call_buttons @ FLOOR_BITS
+
+    return states
+
+  def get_state(self, lane):
+    """
+    Get the state of a single lane in the tuple format of Environment.
+
+    Parameters
+    ----------
+    lane : int
+      The index of the lane.
+
+    Returns
+    -------
+    state : tuple
+      The state of the lane.
+    """
+
+    return (int(self.floor[lane]),
+            DIRECTIONS[self.direction[lane]],
+            DOORS[self.door[lane]],
+            tuple(bool(b) for b in self.cabin_buttons[lane]),
+            tuple(bool(b) for b in self.call_buttons[lane]))
+
+  def get_active_persons(self):
+    """
+    Get the number of active persons in every lane.
+
+    Returns
+    -------
+    active_persons : np.ndarray
+      The number of waiting and travelling persons per lane.
+    """
+    return self.cabin.sum(axis=1) + self.queue_length.sum(axis=1)
+
+  @staticmethod
+  def get_available_actions(states):
+    """
+    Get the available actions for a batch of states.
+
+    Parameters
+    ----------
+    states : np.ndarray
+      An integer array of shape (N, 5) with states of the VectorEnvironment.
+
+    Returns
+    -------
+    mask : np.ndarray
+      A boolean array of shape (N, len(ACTIONS)) marking the allowed actions.
+    """
+    return ACTION_MASK_TABLE[states[:, STATE_FLOOR], states[:, STATE_DIRECTION], states[:, STATE_DOOR]]
+
+  def _reset_lanes(self, mask):
+    """
+    Reset the selected lanes to a random initial state, following Environment.reset.
+
+    Parameters
+    ----------
+    mask : np.ndarray
+      A boolean array selecting the lanes to reset.
+    """
+
+    count = int(mask.sum())
+
+    self.elapsed[mask] = 0
+    self.person_counter[mask] = 0
+    self.queue_head[mask] = 0
+    self.queue_length[mask] = 0
+    self.cabin[mask] = 0
+
+    # Random starting position, the direction and door are fixed
+    self.floor[mask] = self.rng.integers(NUMBER_OF_FLOORS, size=count)
+    self.direction[mask] = DIRECTION_NONE_ID
+    self.door[mask] = DOOR_CLOSED_ID
+
+    # Create persons at the beginning by spawning until the desired number is reached
+    persons_to_create = np.zeros(self.num_envs, dtype=np.int64)
+    persons_to_create[mask] = self.rng.integers(10, size=count)
+
+    for _ in range(15):
+      spawning = mask & (self.get_active_persons() < persons_to_create)
+
+      if not spawning.any():
+        break
+
+      self._new_persons(spawning)
+
+    # Move persons into the cabin on the floor where the lift starts
+    self._move_in_cabin(mask)
+
+    # Adjust the state of buttons according to the existing persons
+    self.cabin_buttons[mask] = self.cabin[mask] > 0
+    self.call_buttons[mask] = self.queue_length[mask] > 0
+
+    return
+
+  def _new_persons(self, mask):
+    """
+    Generate new persons with random start and destination floors in the selected lanes.
+
+    Parameters
+    ----------
+    mask : np.ndarray
+      A boolean array selecting the lanes in which persons are spawned.
+    """
+
+    lanes = self.lanes[mask]
+    person_locations = self.rng.binomial(1, PASSENGER_DISTRIBUTION, size=(len(lanes),) + PASSENGER_DISTRIBUTION.shape)
+
+    if not person_locations.any():
+      return
+
+    spawned = person_locations.sum(axis=2)
+    self.person_counter[lanes] += spawned.sum(axis=1)
+
+    self.queue = grow_ring_buffers(self.queue, self.queue_head, int((self.queue_length[lanes] + spawned).max()))
+
+    # Persons are queued in the order of their destination floors, as np.where does in Environment
+    size = self.queue.shape[2]
+
+    for destination in range(NUMBER_OF_FLOORS):
+      new = person_locations[:, :, destination].astype(bool)
+
+      if not new.any():
+        continue
+
+      lane_index, floor_index = np.nonzero(new)
+      lane_index = lanes[lane_index]
+
+      tail = (self.queue_head[lane_index, floor_index] + self.queue_length[lane_index, floor_index]) % size
+      self.queue[lane_index, floor_index, tail] = destination
+      self.queue_length[lane_index, floor_index] += 1
+
+    return
+
+  def _move_in_cabin(self, mask):
+    """
+    Move people from the floor buffer of the current floor to the cabin in the selected lanes.
+    The number of people transferred is limited by the max_capacity.
+
+    Parameters
+    ----------
+    mask : np.ndarray
+      A boolean array selecting the lanes in which persons enter the cabin.
+    """
+
+    size = self.queue.shape[2]
+
+    for _ in range(self.max_capacity):
+      lanes = self.lanes[mask]
+      floors = self.floor[mask]
+
+      can_enter = (self.cabin[lanes].sum(axis=1) < self.max_capacity) & (self.queue_length[lanes, floors] > 0)
+
+      if not can_enter.any():
+        break
+
+      lanes = lanes[can_enter]
+      floors = floors[can_enter]
+
+      head = self.queue_head[lanes, floors]
+      self.cabin[lanes, self.queue[lanes, floors, head]] += 1
+      self.queue_head[lanes, floors] = (head + 1) % size
+      self.queue_length[lanes, floors] -= 1
+
+    return
@@ -0,0 +1,396 @@
+"""
+Benchmarks for the hot paths of the environment and the training.
+
+Every benchmark uses fixed seeds and reports a throughput (higher is better). Results can be saved as JSON and
+compared against a stored baseline:
+
+    python -m benchmarks.run --save results.json --compare benchmarks/baseline.json
+
+Additionally, the time of "import Environment" in a fresh interpreter is checked against IMPORT_BUDGET.
+"""
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import numpy as np
+from Environment import policy, batch_policy
+from Environment.encoding import encode_states
+from Environment.environment import Environment
+from Environment.raster import NumpyRenderer
+from Environment.constants import ACTION_NOOP
+from Environment.traffic import OFFICE_DAY, DAY_LENGTH
+from Environment.vector_environment import VectorEnvironment
+from q_table import QTable, ACTION_IDS, NUMBER_OF_STATES, NUMBER_OF_ACTIONS
+import learning
+
+SEED = 0
+
+# Policies of Environment/policy.py which run without user input
+POLICIES = {"up": policy.up, "alternate": policy.alternate}
+
+# Time budget of "import Environment" in a fresh interpreter, most of it is the import of NumPy
+IMPORT_BUDGET = 0.2
+
+# Modules which are only loaded on first use and must not be imported by "import Environment"
+LAZY_MODULES = ["pygame", "imageio", "matplotlib", "tqdm", "Environment.environment", "Environment.raster",
+                "Environment.recording", "Environment.policy"]
+
+
+def measure(function, repeat=3):
+    """
+    Run a benchmark several times and keep the fastest run.
+
+    Parameters
+    ----------
+    function : callable
+        Runs the benchmark once and returns the number of processed items.
+
+    repeat : int
+        The number of runs.
+
+    Returns
+    -------
+    throughput : float
+        Items per second of the fastest run.
+    """
+    best = 0.0
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        items = function()
+        best = max(best, items / (time.perf_counter() - start))
+
+    return best
+
+
+def bench_step(policy_function, steps=20000, **kwargs):
+    env = Environment(render_mode="none", seed=SEED, **kwargs)
+
+    def run():
+        state = env.reset()
+        for _ in range(steps):
+            state = env.step(policy_function(state))
+        return steps
+
+    return measure(run)
+
+
+def bench_random_step(steps=20000):
+    env = Environment(render_mode="none", seed=SEED)
+    rng = np.random.default_rng(SEED)
+
+    def run():
+        state = env.reset()
+        for _ in range(steps):
+            allowed = Environment.get_available_actions(state)
+            state = env.step(allowed[rng.integers(len(allowed))])
+        return steps
+
+    return measure(run)
+
+
+def bench_office_day(jump, days=1):
+    # The baseline policy waits while nobody needs the lift, hence the quiet hours can be skipped
+    from demonstration import baseline
+
+    env = Environment(render_mode="none", seed=SEED, traffic=OFFICE_DAY, arrival_block=4096)
+    steps = days * DAY_LENGTH
+
+    def run():
+        state = env.reset()
+        step = 0
+        total = 0.0
+
+        while step < steps:
+            if jump and env.is_idle() and baseline(state) == ACTION_NOOP:
+                ticks = env.advance_idle(steps - step)
+                total += ticks * learning.effective_reward(env, state, ACTION_NOOP, state)
+                step += ticks
+                continue
+
+            action = baseline(state)
+            next_state = env.step(action)
+            total += learning.effective_reward(env, state, action, next_state)
+            state = next_state
+            step += 1
+
+        return steps
+
+    return measure(run)
+
+
+def bench_reset(resets=2000):
+    env = Environment(render_mode="none", seed=SEED)
+
+    def run():
+        for _ in range(resets):
+            env.reset()
+        return resets
+
+    return measure(run)
+
+
+def bench_q_update(steps=20000):
+    # Record a trajectory first, only the state abstraction and the update are timed
+    env = Environment(render_mode="none", seed=SEED)
+    rng = np.random.default_rng(SEED)
+    states = [env.reset()]
+    actions = []
+
+    for _ in range(steps):
+        allowed = Environment.get_available_actions(states[-1])
+        actions.append(allowed[rng.integers(len(allowed))])
+        states.append(env.step(actions[-1]))
+
+    Q = QTable()
+
+    def run():
+        for state, action, next_state in zip(states, actions, states[1:]):
+            learning.simplify_state(state)
+            Q.update(QTable.state_index(state), ACTION_IDS[action], 1.0, QTable.state_index(next_state),
+                     learning.alpha, learning.gamma)
+        return steps
+
+    return measure(run)
+
+
+def bench_training(episodes=20):
+    _, seeds = learning.episode_seeds(SEED, episodes)
+
+    def run():
+        Q = QTable()
+        rng = np.random.default_rng(SEED)
+        for ep, seed in enumerate(seeds):
+            learning.run_episode(Q, Environment(render_mode="none", seed=seed), learning.epsilon_at(ep), rng)
+        return episodes
+
+    return measure(run)
+
+
+def bench_render(frames=100):
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    env = Environment(render_mode="rgb_array", seed=SEED)
+
+    def run():
+        env.reset()
+        for _ in range(frames):
+            env.render()
+            env.step(policy.alternate(env.state))
+        return frames
+
+    try:
+        return measure(run)
+    finally:
+        env.close()
+
+
+def bench_numpy_render(lanes=64, steps=10):
+    venv = VectorEnvironment(lanes, seed=SEED)
+    renderer = NumpyRenderer()
+    out = np.empty((lanes, renderer.height, renderer.width, 3), dtype=np.uint8)
+
+    def run():
+        for _ in range(steps):
+            renderer.render_vector(venv, out)
+            venv.step(np.argmax(VectorEnvironment.get_available_actions(venv.get_states()), axis=1))
+        return lanes * steps
+
+    return measure(run)
+
+
+def bench_batch_policy(lanes=4096, steps=50):
+    # Decisions of the greedy Q-policy for batches of encoded states, the states are recorded beforehand
+    venv = VectorEnvironment(lanes, seed=SEED)
+    batches = []
+
+    for _ in range(steps):
+        batches.append(encode_states(venv.get_states()))
+        venv.step(batch_policy.alternate(batches[-1]))
+
+    Q = QTable(np.random.default_rng(SEED).random((NUMBER_OF_STATES, NUMBER_OF_ACTIONS)))
+    rng = np.random.default_rng(SEED)
+
+    def run():
+        for codes in batches:
+            batch_policy.greedy(Q, codes, rng, epsilon=0.05)
+        return lanes * steps
+
+    return measure(run)
+
+
+def import_time(statement="import Environment", repeat=5):
+    """
+    Measure an import statement in fresh interpreters.
+
+    Parameters
+    ----------
+    statement : str
+        The import statement, e.g. "import Environment" or "from Environment import *".
+
+    repeat : int
+        The number of interpreters started, the fastest import is kept.
+
+    Returns
+    -------
+    seconds : float
+        The time of the fastest import.
+
+    loaded : list
+        The modules of LAZY_MODULES which have been loaded by the import.
+    """
+    code = (f"import sys, time; start = time.perf_counter(); {statement}; "
+            f"print(time.perf_counter() - start, *[m for m in {LAZY_MODULES!r} if m in sys.modules])")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    best, loaded = float("inf"), []
+
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        seconds, *loaded = output.stdout.split()
+        best = min(best, float(seconds))
+
+    return best, loaded
+
+
+def bench_import():
+    seconds, loaded = import_time()
+
+    if loaded:
+        print(f"import Environment loaded {', '.join(loaded)}")
+
+    return 1 / seconds
+
+
+def check_import_budget(budget=IMPORT_BUDGET):
+    """
+    Check that "import Environment" stays within the time budget and does not load any of LAZY_MODULES.
+
+    Returns
+    -------
+    ok : bool
+        True if the import is within the budget.
+    """
+    seconds, loaded = import_time()
+    ok = seconds <= budget and not loaded
+    print(f"{'import Environment':32s} {seconds * 1e3:9.1f} ms (budget {budget * 1e3:.0f} ms) "
+          f"{'ok' if ok else 'OVER BUDGET'}{' loads ' + ', '.join(loaded) if loaded else ''}")
+
+    return ok
+
+
+def run_benchmarks(selected=None):
+    """
+    Run the benchmarks.
+
+    Parameters
+    ----------
+    selected : list or None
+        Names of the benchmarks to run, None runs all.
+
+    Returns
+    -------
+    results : dict
+        The throughput of every benchmark. Benchmarks with missing dependencies are reported as None.
+    """
+    benchmarks = {f"step_{name}_steps_per_s": (lambda f=function: bench_step(f)) for name, function in POLICIES.items()}
+    benchmarks.update({
+        "step_random_steps_per_s": bench_random_step,
+        "step_alternate_presampled_steps_per_s": lambda: bench_step(policy.alternate, arrival_block=4096),
+        "office_day_steps_per_s": lambda: bench_step(policy.alternate, traffic=OFFICE_DAY),
+        "office_day_presampled_steps_per_s":
+            lambda: bench_step(policy.alternate, traffic=OFFICE_DAY, arrival_block=4096),
+        "office_day_baseline_steps_per_s": lambda: bench_office_day(jump=False),
+        "office_day_idle_jump_steps_per_s": lambda: bench_office_day(jump=True),
+        "reset_per_s": bench_reset,
+        "q_update_per_s": bench_q_update,
+        "training_episodes_per_s": bench_training,
+        "render_rgb_array_frames_per_s": bench_render,
+        "render_numpy_batch_frames_per_s": bench_numpy_render,
+        "policy_batch_decisions_per_s": bench_batch_policy,
+        "import_environment_per_s": bench_import,
+    })
+
+    results = {}
+
+    for name, benchmark in benchmarks.items():
+        if selected and name not in selected:
+            continue
+
+        try:
+            results[name] = benchmark()
+        except ImportError as e:
+            print(f"{name:32s} skipped ({e})")
+            results[name] = None
+            continue
+
+        print(f"{name:32s} {results[name]:12.1f}")
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare results against a baseline.
+
+    Parameters
+    ----------
+    results : dict
+        The current results.
+
+    baseline : dict
+        The stored results.
+
+    tolerance : float
+        The allowed relative slowdown, e.g. 0.2 for 20 %.
+
+    Returns
+    -------
+    regressions : list
+        The names of the benchmarks which are slower than allowed.
+    """
+    regressions = []
+
+    for name, value in results.items():
+        reference = baseline.get(name)
+
+        if value is None or reference is None:
+            continue
+
+        change = value / reference - 1
+        status = "REGRESSION" if change < -tolerance else "ok"
+        print(f"{name:32s} {reference:12.1f} -> {value:12.1f} ({change:+7.1%}) {status}")
+
+        if change < -tolerance:
+            regressions.append(name)
+
+    return regressions
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark the environment and the training.")
+    parser.add_argument("benchmarks", nargs="*", help="names of the benchmarks to run (default: all)")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown")
+    parser.add_argument("--import-budget", type=float, default=IMPORT_BUDGET,
+                        help="allowed time of 'import Environment' in seconds")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.benchmarks)
+    within_budget = check_import_budget(args.import_budget)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": sys.version.split()[0], "numpy": np.__version__, "machine": platform.machine(),
+                       "results": results}, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+        sys.exit(1 if compare(results, baseline, args.tolerance) or not within_budget else 0)
+
+    sys.exit(0 if within_budget else 1)
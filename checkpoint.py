@@ -0,0 +1,162 @@
+import json
+import os
+import struct
+import threading
+import numpy as np
+from q_table import NUMBER_OF_STATES, NUMBER_OF_ACTIONS
+
+# Binary checkpoint format: a fixed header, a JSON block with the scalar training state (episode, seed,
+# hyperparameters, state of the random generator and of the metrics log), followed by the Q-values as little-endian
+# float64 so that a resumed run continues bit-exactly.
+CHECKPOINT_MAGIC = b"QCKP"
+CHECKPOINT_VERSION = 2
+CHECKPOINT_HEADER = struct.Struct("<4sHI")
+
+
+def save_checkpoint(path, episode, values, metadata):
+    """
+    Write a training checkpoint.
+    The file is written to a temporary location, flushed to disk and moved into place, so that a crash during the
+    write leaves the previous checkpoint intact.
+
+    Parameters
+    ----------
+    path : str or Path
+        The output file.
+
+    episode : int
+        The number of finished episodes, the training resumes with this episode.
+
+    values : np.ndarray
+        The Q-values of shape (NUMBER_OF_STATES, NUMBER_OF_ACTIONS).
+
+    metadata : dict
+        JSON-serializable training state, e.g. seed, hyperparameters and the state of the random generator.
+    """
+    values = np.ascontiguousarray(values, dtype="<f8")
+
+    if values.shape != (NUMBER_OF_STATES, NUMBER_OF_ACTIONS):
+        raise ValueError(f"Expected Q-values of shape {(NUMBER_OF_STATES, NUMBER_OF_ACTIONS)}, got {values.shape}.")
+
+    encoded = json.dumps({**metadata, "episode": episode}).encode("utf-8")
+    header = CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION, len(encoded))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(encoded)
+        f.write(values.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path):
+    """
+    Read a checkpoint written by save_checkpoint.
+
+    Parameters
+    ----------
+    path : str or Path
+        The input file.
+
+    Returns
+    -------
+    checkpoint : dict
+        The metadata (including "episode") together with the Q-values as "values".
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    magic, version, metadata_length = CHECKPOINT_HEADER.unpack_from(data)
+
+    if magic != CHECKPOINT_MAGIC:
+        raise ValueError(f"{path} is not a training checkpoint.")
+
+    if version != CHECKPOINT_VERSION:
+        raise ValueError(f"{path} has version {version}, only version {CHECKPOINT_VERSION} is supported.")
+
+    offset = CHECKPOINT_HEADER.size + metadata_length
+    expected = offset + 8 * NUMBER_OF_STATES * NUMBER_OF_ACTIONS
+
+    if len(data) != expected:
+        raise ValueError(f"{path} is truncated or was written for a different state space.")
+
+    checkpoint = json.loads(data[CHECKPOINT_HEADER.size:offset].decode("utf-8"))
+    checkpoint["values"] = np.frombuffer(data, dtype="<f8", offset=offset).astype(np.float64).reshape(
+        NUMBER_OF_STATES, NUMBER_OF_ACTIONS)
+
+    return checkpoint
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints in a background thread.
+
+    submit copies the training state, which takes microseconds, the serialization and the disk write happen in the
+    writer thread. If a new checkpoint is submitted while the previous one is still waiting, only the newer one is
+    written. Errors of the writer thread are raised by the next call of submit or close.
+    """
+
+    def __init__(self, path):
+        """
+        Creates a writer and starts its thread.
+
+        Parameters
+        ----------
+        path : str or Path
+            The checkpoint file, it is replaced by every write.
+        """
+        self.path = path
+        self.pending = None
+        self.closed = False
+        self.error = None
+        self.written = 0
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, episode, values, metadata):
+        """
+        Schedule a checkpoint, see save_checkpoint for the parameters. The arrays are copied immediately.
+        """
+        self._raise_error()
+        snapshot = (episode, np.array(values, dtype=np.float64), metadata)
+
+        with self.condition:
+            self.pending = snapshot
+            self.condition.notify()
+
+    def close(self):
+        """
+        Write the pending checkpoint and stop the thread.
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+        self.thread.join()
+        self._raise_error()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+
+                if self.pending is None:
+                    return
+
+                snapshot, self.pending = self.pending, None
+
+            try:
+                save_checkpoint(self.path, *snapshot)
+                self.written += 1
+            except Exception as e:
+                self.error = e
+
+    def _raise_error(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
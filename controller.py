@@ -0,0 +1,560 @@
+"""
+Controller service: answers "what should the car do now?" for live buildings.
+
+The server keeps a policy in memory and listens on a local socket. Every line sent by a client is a JSON message,
+every answer is a JSON line with the same id:
+
+    {"id": 1, "type": "state", "state": [2, "none", "closed", [false, ...], [true, ...]]}
+    {"id": 2, "type": "events", "events": [{"event": "press", "button": "call", "floor": 4},
+                                           {"event": "car", "floor": 3, "direction": "up", "door": "closed"}]}
+    {"id": 3, "type": "metrics"}
+
+    {"id": 1, "action": "door", "latency_us": 41.3}
+
+A state message replaces the state of the building of the connection, event messages update it (car position,
+pressed and released buttons). Both are answered with an action. Requests of all connections are collected and
+decided in batches. If a decision is not ready within the deadline of a request or the decision function fails, the
+first allowed action (noop or closing the door) is returned and the answer is marked as fallback.
+
+    python controller.py serve --q-table q_table.qtab
+    python controller.py simulate --buildings 8
+"""
+import asyncio
+import json
+import logging
+import time
+import numpy as np
+from Environment import batch_policy, policy
+from Environment.constants import ACTIONS, DIRECTIONS, DOORS, NUMBER_OF_FLOORS, DIRECTION_NONE, DOOR_CLOSED, \
+    BUTTON_TUPLES, ACTION_NOOP, ACTION_DOOR
+from Environment.encoding import HEAD_SHIFT, HEAD_ACTION_MASKS, encode_state, decode_state
+from Environment.environment import Environment
+from Environment.tracing import Tracer
+from q_table import QTable
+import learning
+
+DEFAULT_SOCKET = "lift_controller.sock"
+
+# Number of most recent decisions whose latencies are kept exactly for the percentiles of the metrics
+LATENCY_SAMPLES = 65536
+
+logger = logging.getLogger(__name__)
+
+# The fallback answer per head of an encoded state: noop where it is allowed, otherwise the door is open and closed
+FALLBACK_ACTIONS = [ACTION_NOOP if mask[ACTIONS.index(ACTION_NOOP)] else ACTION_DOOR for mask in HEAD_ACTION_MASKS]
+
+
+class Building:
+    """
+    The state of the lift of one building as seen by the controller.
+    """
+
+    def __init__(self):
+        self.floor = 0
+        self.direction = DIRECTION_NONE
+        self.door = DOOR_CLOSED
+        self.buttons = {"cabin": 0, "call": 0}
+
+    def set_state(self, state):
+        """
+        Replace the state by a state of the environment, e.g. parsed from JSON.
+
+        Raises
+        ------
+        ValueError
+            If the state is not a valid state of the environment.
+        """
+        floor, direction, door, cabin_buttons, call_buttons = state
+
+        self.set_car(floor, direction, door)
+
+        if len(cabin_buttons) != NUMBER_OF_FLOORS or len(call_buttons) != NUMBER_OF_FLOORS:
+            raise ValueError(f"Expected {NUMBER_OF_FLOORS} cabin and call buttons.")
+
+        self.buttons["cabin"] = sum(1 << i for i, pressed in enumerate(cabin_buttons) if pressed)
+        self.buttons["call"] = sum(1 << i for i, pressed in enumerate(call_buttons) if pressed)
+
+    def set_car(self, floor, direction, door):
+        if not isinstance(floor, int) or not 0 <= floor < NUMBER_OF_FLOORS:
+            raise ValueError(f"Invalid floor {floor!r}.")
+
+        if direction not in DIRECTIONS or door not in DOORS:
+            raise ValueError(f"Invalid direction {direction!r} or door state {door!r}.")
+
+        self.floor, self.direction, self.door = floor, direction, door
+
+    def apply(self, event):
+        """
+        Apply a button or car event.
+
+        Parameters
+        ----------
+        event : dict
+            {"event": "car", "floor": ..., "direction": ..., "door": ...} or
+            {"event": "press" | "release", "button": "cabin" | "call", "floor": ...}.
+
+        Raises
+        ------
+        ValueError
+            If the event is malformed.
+        """
+        kind = event.get("event")
+
+        if kind == "car":
+            self.set_car(event.get("floor"), event.get("direction"), event.get("door"))
+            return
+
+        button, floor = event.get("button"), event.get("floor")
+
+        if kind not in ("press", "release") or button not in self.buttons or \
+                not isinstance(floor, int) or not 0 <= floor < NUMBER_OF_FLOORS:
+            raise ValueError(f"Invalid event {event!r}.")
+
+        if kind == "press":
+            self.buttons[button] |= 1 << floor
+        else:
+            self.buttons[button] &= ~(1 << floor)
+
+    def state(self):
+        return (self.floor, self.direction, self.door,
+                BUTTON_TUPLES[self.buttons["cabin"]], BUTTON_TUPLES[self.buttons["call"]])
+
+
+def q_table_policy(Q, seed=None):
+    """
+    Create a batch decision function for the greedy policy of a Q-table. Ties are broken at random.
+
+    Parameters
+    ----------
+    Q : QTable
+        The Q-table.
+
+    seed : int or None
+        The seed of the tie-breaking.
+
+    Returns
+    -------
+    decide : callable
+        Maps an array of encoded states to an array of action indices, see Environment/batch_policy.py.
+    """
+    rng = np.random.default_rng(seed)
+
+    def decide(codes):
+        return batch_policy.greedy(Q, codes, rng)
+
+    return decide
+
+
+def function_policy(function):
+    """
+    Create a batch decision function for any policy with the interface of Environment/policy.py (state -> action).
+    The policy is called once per state, policies with a batch version should be used through batch_policy instead.
+    """
+
+    def decide(codes):
+        return [ACTIONS.index(function(decode_state(code))) for code in codes]
+
+    return decide
+
+
+class ControllerServer:
+    """
+    Asyncio server which answers decision requests of several buildings.
+
+    Requests are put into a queue. A single batching task takes all waiting requests (after waiting batch_window
+    seconds for more to arrive), decides them with one call of the decision function and resolves their futures.
+    If the decision function raises, the error is logged and the requests of the batch are answered with the fallback.
+    The latency from receiving a request until the answer is written is recorded in a Tracer, which keeps the
+    latencies of the last LATENCY_SAMPLES decisions for exact percentiles.
+    """
+
+    def __init__(self, decide, batch_size=256, batch_window=0.0, deadline=0.005, tracer=None):
+        """
+        Creates a server.
+
+        Parameters
+        ----------
+        decide : callable
+            Maps an array of encoded states to action indices, e.g. batch_policy.alternate, q_table_policy or
+            function_policy.
+
+        batch_size : int
+            The maximal number of requests decided at once.
+
+        batch_window : float
+            The time in seconds the batching task waits for further requests after the first one. With 0, it only
+            lets the requests in flight be read.
+
+        deadline : float
+            The default deadline of a request in seconds. Requests can set their own with "deadline_ms".
+
+        tracer : Tracer or None
+            Collects the latencies and batch sizes, a new one is created if None.
+        """
+        self.decide = decide
+        self.batch_size = batch_size
+        self.batch_window = batch_window
+        self.deadline = deadline
+        self.tracer = Tracer(samples={"decision": LATENCY_SAMPLES}) if tracer is None else tracer
+        self.queue = None
+        self.server = None
+        self.batcher = None
+        self.connections = set()
+
+    async def start(self, path=None, host="127.0.0.1", port=None):
+        """
+        Start listening on a Unix socket (path) or on a TCP port.
+        """
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self._batch_loop())
+
+        if port is None:
+            self.server = await asyncio.start_unix_server(self._handle, path or DEFAULT_SOCKET)
+        else:
+            self.server = await asyncio.start_server(self._handle, host, port)
+
+        return self.server
+
+    async def close(self):
+        """
+        Stop listening and wait until the open connections are finished.
+        """
+        self.server.close()
+        await self.server.wait_closed()
+        await asyncio.gather(*self.connections, return_exceptions=True)
+        self.batcher.cancel()
+
+    def metrics(self):
+        """
+        Returns
+        -------
+        metrics : dict
+            Number of decisions, p50/p99 latency in microseconds, fallbacks, failed decisions and the batch size
+            histogram.
+        """
+        summary = self.tracer.summary()
+        latency = summary["phases"].get("decision", {"calls": 0, "p50_us": None, "p99_us": None, "mean_us": None})
+        counters = summary["counters"]
+
+        return {
+            "decisions": latency["calls"],
+            "p50_us": latency["p50_us"],
+            "p99_us": latency["p99_us"],
+            "mean_us": latency["mean_us"],
+            "fallbacks": counters.get("fallback", {}).get("sum", 0),
+            "failures": counters.get("failure", {}).get("sum", 0),
+            "batch_size": counters.get("batch_size", {}).get("histogram", {}),
+        }
+
+    async def _handle(self, reader, writer):
+        """
+        Serve one connection (one building). Messages are parsed in order, the answers are written as soon as they
+        are ready, hence a client may send further requests before the previous answer arrived.
+        """
+        building = Building()
+        pending = set()
+        self.connections.add(asyncio.current_task())
+
+        try:
+            while line := await reader.readline():
+                received = time.perf_counter()
+                message = None
+
+                try:
+                    message = json.loads(line)
+                    request_id = message.get("id")
+                    kind = message.get("type")
+
+                    if kind == "metrics":
+                        self._write(writer, {"id": request_id, "metrics": self.metrics()})
+                        continue
+
+                    if kind == "state":
+                        building.set_state(message["state"])
+                    elif kind == "events":
+                        for event in message["events"]:
+                            building.apply(event)
+                    else:
+                        raise ValueError(f"Unknown message type {kind!r}.")
+
+                    deadline = message.get("deadline_ms", self.deadline * 1e3) / 1e3
+
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    self._write(writer, {"id": None if not isinstance(message, dict) else message.get("id"),
+                                         "error": str(e)})
+                    continue
+
+                task = asyncio.create_task(self._answer(writer, request_id, building.state(), received, deadline))
+                pending.add(task)
+                task.add_done_callback(pending.discard)
+
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            self.connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _answer(self, writer, request_id, state, received, deadline):
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((state, future))
+        fallback = False
+
+        failure = False
+
+        try:
+            action = await asyncio.wait_for(future, deadline - (time.perf_counter() - received))
+        except asyncio.TimeoutError:
+            fallback = True
+        except Exception:
+            # The batching task has logged the error already
+            fallback = failure = True
+
+        if fallback:
+            action = FALLBACK_ACTIONS[encode_state(state) >> HEAD_SHIFT]
+
+        self.tracer.record("decision", received)
+        self.tracer.count("fallback", fallback)
+        self.tracer.count("failure", failure)
+
+        answer = {"id": request_id, "action": action, "latency_us": (time.perf_counter() - received) * 1e6}
+        if fallback:
+            answer["fallback"] = True
+
+        self._write(writer, answer)
+
+    async def _batch_loop(self):
+        while True:
+            batch = [await self.queue.get()]
+
+            # Give other connections the chance to add their requests
+            await asyncio.sleep(self.batch_window)
+
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            # Requests which already received the fallback answer are skipped
+            batch = [(state, future) for state, future in batch if not future.done()]
+
+            if not batch:
+                continue
+
+            try:
+                actions = self.decide(np.array([encode_state(state) for state, _ in batch]))
+            except Exception as e:
+                logger.exception("Deciding a batch of %d requests failed", len(batch))
+
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+                continue
+
+            self.tracer.count("batch_size", len(batch))
+
+            for (_, future), action in zip(batch, actions):
+                if not future.done():
+                    future.set_result(ACTIONS[action])
+
+    @staticmethod
+    def _write(writer, message):
+        writer.write(json.dumps(message).encode() + b"\n")
+
+
+async def drive_building(connect, seed, steps=learning.steps_per_episode, events=False, deadline_ms=None):
+    """
+    Simulate one building with an Environment whose lift is controlled by the server.
+
+    Parameters
+    ----------
+    connect : callable
+        Coroutine function returning (reader, writer) of a new connection.
+
+    seed : np.random.SeedSequence
+        The seed of the environment.
+
+    steps : int
+        The number of steps.
+
+    events : bool
+        Send the changes of the state as events instead of the full state.
+
+    deadline_ms : float or None
+        The deadline of the requests, None uses the default of the server.
+
+    Returns
+    -------
+    total_reward : float
+        The total reward of the episode (learning.effective_reward).
+
+    round_trips : list
+        The round trip time of every request in microseconds.
+
+    fallbacks : int
+        The number of answers marked as fallback.
+    """
+    reader, writer = await connect()
+    env = Environment(render_mode="none", seed=seed)
+    state = env.reset()
+    previous = None
+
+    total_reward = 0.0
+    round_trips = []
+    fallbacks = 0
+
+    for step in range(steps):
+        if events:
+            message = {"id": step, "type": "events", "events": _state_events(previous, state)}
+        else:
+            message = {"id": step, "type": "state", "state": state}
+
+        if deadline_ms is not None:
+            message["deadline_ms"] = deadline_ms
+
+        sent = time.perf_counter()
+        writer.write(json.dumps(message).encode() + b"\n")
+        answer = json.loads(await reader.readline())
+        round_trips.append((time.perf_counter() - sent) * 1e6)
+
+        if "error" in answer:
+            raise RuntimeError(answer["error"])
+
+        fallbacks += answer.get("fallback", False)
+
+        next_state = env.step(answer["action"])
+        total_reward += learning.effective_reward(env, state, answer["action"], next_state)
+        previous, state = state, next_state
+
+    writer.close()
+    await writer.wait_closed()
+    return total_reward, round_trips, fallbacks
+
+
+def _state_events(previous, state):
+    """
+    Describe the change from previous to state as car and button events.
+    """
+    floor, direction, door, cabin_buttons, call_buttons = state
+    events = [{"event": "car", "floor": floor, "direction": direction, "door": door}]
+
+    for button, now, before in (("cabin", cabin_buttons, None if previous is None else previous[3]),
+                                ("call", call_buttons, None if previous is None else previous[4])):
+        for i in range(NUMBER_OF_FLOORS):
+            if before is None or now[i] != before[i]:
+                events.append({"event": "press" if now[i] else "release", "button": button, "floor": i})
+
+    return events
+
+
+async def simulate(connect, buildings=4, steps=learning.steps_per_episode, seed=learning.seed, events=False,
+                   deadline_ms=None):
+    """
+    Drive several buildings concurrently and print the client and server latencies.
+    """
+    results = await asyncio.gather(*(drive_building(connect, building_seed, steps, events, deadline_ms)
+                                     for building_seed in np.random.SeedSequence(seed).spawn(buildings)))
+
+    rewards = [reward for reward, _, _ in results]
+    round_trips = np.concatenate([trips for _, trips, _ in results])
+    fallbacks = sum(count for _, _, count in results)
+
+    reader, writer = await connect()
+    writer.write(json.dumps({"id": 0, "type": "metrics"}).encode() + b"\n")
+    metrics = json.loads(await reader.readline())["metrics"]
+    writer.close()
+    await writer.wait_closed()
+
+    print(f"Buildings: {buildings} | average reward {np.mean(rewards):.1f} | fallbacks {fallbacks}")
+    print(f"Round trip: p50 {np.percentile(round_trips, 50):.0f} us | p99 {np.percentile(round_trips, 99):.0f} us")
+    print(f"Server: {metrics['decisions']} decisions | p50 {metrics['p50_us']:.1f} us | "
+          f"p99 {metrics['p99_us']:.1f} us | batch sizes {metrics['batch_size']}")
+
+    return metrics
+
+
+def _baseline():
+    # demonstration.py is only imported when the baseline is served
+    from demonstration import baseline
+    return function_policy(baseline)
+
+
+# Policies which can be served by --policy, "q-table" serves the greedy policy of the Q-table given by --q-table
+POLICIES = {
+    "up": lambda: batch_policy.up,
+    "alternate": lambda: batch_policy.alternate,
+    "up-function": lambda: function_policy(policy.up),
+    "alternate-function": lambda: function_policy(policy.alternate),
+    "baseline": _baseline,
+}
+
+
+def load_decide(args):
+    """
+    Create the decision function selected by the command line arguments --policy, --q-table and --seed.
+
+    Raises
+    ------
+    ValueError
+        If the Q-table policy is selected without a Q-table file, or a Q-table is given for another policy.
+    """
+    name = args.policy or ("q-table" if args.q_table else "alternate")
+
+    if name == "q-table":
+        if not args.q_table:
+            raise ValueError("The policy q-table needs the Q-table file, use --q-table.")
+
+        return q_table_policy(QTable.load(args.q_table), args.seed)
+
+    if args.q_table:
+        raise ValueError(f"--q-table is only used by the policy q-table, not by {name!r}.")
+
+    return POLICIES[name]()
+
+
+async def main(args):
+    if args.port is None:
+        async def connect():
+            return await asyncio.open_unix_connection(args.socket)
+    else:
+        async def connect():
+            return await asyncio.open_connection(args.host, args.port)
+
+    if args.command == "simulate" and not args.inline:
+        await simulate(connect, args.buildings, args.steps, args.seed, args.events, args.deadline_ms)
+        return
+
+    server = ControllerServer(load_decide(args), args.batch_size, args.batch_window_us / 1e6, args.deadline_ms / 1e3)
+    await server.start(args.socket, args.host, args.port)
+
+    try:
+        if args.command == "serve":
+            print(f"Listening on {args.socket if args.port is None else f'{args.host}:{args.port}'}")
+            await server.server.serve_forever()
+        else:
+            await simulate(connect, args.buildings, args.steps, args.seed, args.events, args.deadline_ms)
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Controller service for the lift and a simulated building client.")
+    parser.add_argument("command", choices=["serve", "simulate"])
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="path of the Unix socket")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=None, help="use TCP instead of a Unix socket")
+    parser.add_argument("--q-table", help="serve the greedy policy of this Q-table")
+    parser.add_argument("--policy", choices=[*POLICIES, "q-table"], default=None,
+                        help="policy to serve (default: q-table with --q-table, otherwise alternate); the -function "
+                             "variants and baseline decide state by state through function_policy")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--batch-window-us", type=float, default=0)
+    parser.add_argument("--deadline-ms", type=float, default=5)
+    parser.add_argument("--buildings", type=int, default=4)
+    parser.add_argument("--steps", type=int, default=learning.steps_per_episode)
+    parser.add_argument("--events", action="store_true", help="send button events instead of full states")
+    parser.add_argument("--inline", action="store_true", help="run the server in the simulating process")
+    parser.add_argument("--seed", type=int, default=learning.seed)
+    args = parser.parse_args()
+
+    asyncio.run(main(args))
@@ -1,6 +1,4 @@
 from pathlib import Path
-from tqdm import tqdm
-import numpy, pygame, imageio, matplotlib
 
 from Environment import *
 
@@ -29,6 +27,40 @@ def baseline(state):
   # Unpack the state for easier access
   current_floor, move_direction, door_state, cabin_buttons, call_buttons = state
 
+  # Close the door after serving a floor
+  if door_state == DOOR_OPEN:
+    return ACTION_DOOR
+
+  requested = [cabin or call for cabin, call in zip(cabin_buttons, call_buttons)]
+
+  # While moving, stop at the next floor if someone wants to enter or leave there (or nobody needs the lift)
+  if move_direction != DIRECTION_NONE:
+    next_floor = current_floor + (1 if move_direction == DIRECTION_UP else -1)
+
+    if not 0 <= next_floor < NUMBER_OF_FLOORS or requested[next_floor] or not any(requested):
+      return ACTION_STOP
+
+    return ACTION_NOOP
+
+  # Serve the current floor
+  if requested[current_floor]:
+    return ACTION_DOOR
+
+  # Passengers in the cabin are delivered first, otherwise the lift heads to the nearest call
+  targets = cabin_buttons if any(cabin_buttons) else call_buttons
+  floors = [floor for floor in range(NUMBER_OF_FLOORS) if targets[floor]]
+
+  if not floors:
+    return ACTION_NOOP
+
+  target = min(floors, key=lambda floor: abs(floor - current_floor))
+
+  if target > current_floor:
+    return ACTION_UP
+
+  if target < current_floor:
+    return ACTION_DOWN
+
   raise RuntimeError("The baseline policy could no produce a valid action")
 
 def run(policy, iterations=30, progress_bar=True):
@@ -44,6 +76,9 @@ def run(policy, iterations=30, progress_bar=True):
   iterations = range(iterations)
 
   if progress_bar:
+    # The import is done here, tqdm is not needed to use the baseline policy
+    from tqdm import tqdm
+
     iterations = tqdm(iterations)
 
   for _ in iterations:
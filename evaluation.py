@@ -0,0 +1,329 @@
+"""
+Parallel Monte-Carlo evaluation of policies under common random numbers.
+
+All policies play the same episode seeds, hence the same passenger arrivals. Every policy is compared with a
+reference policy (the first one by default) by the per-seed differences of total reward and mean waiting time.
+The arrivals cancel out in these paired differences, so their confidence intervals are much narrower than the
+intervals of the policies on their own, and a policy stops as soon as its difference to the reference is known
+precisely enough:
+
+    python evaluation.py up alternate baseline q_table_planned.qtab --precision 0.02
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from Environment.environment import Environment
+from Environment.constants import ACTION_NOOP
+from Environment import policy
+from q_table import QTable, ACTION_IDS
+import learning
+
+
+def _baseline():
+    # demonstration.py is only imported when the baseline is evaluated
+    from demonstration import baseline
+    return baseline
+
+
+# Policies which can be evaluated by name, every other name is read as path of a Q-table file
+NAMED_POLICIES = {
+    "up": lambda: policy.up,
+    "alternate": lambda: policy.alternate,
+    "baseline": _baseline,
+}
+
+# Two-sided 95 % quantile of the normal distribution, used for the confidence intervals
+Z_95 = 1.959963984540054
+
+# Policies loaded in a worker process, e.g. memory-mapped Q-tables
+_loaded = {}
+
+
+def load_policy(name):
+    """
+    Get the decision function of a policy by name (see NAMED_POLICIES) or Q-table path.
+
+    Parameters
+    ----------
+    name : str
+        The name of the policy or the path of a Q-table written by QTable.save.
+
+    Returns
+    -------
+    choose : callable
+        A function (state, rng) -> action.
+
+    waits : callable
+        A function state -> bool telling whether the policy takes ACTION_NOOP in a state for sure, i.e. every time it
+        is asked. Q-tables break ties at random, hence they only wait for sure if ACTION_NOOP is the only best action.
+    """
+    if name not in _loaded:
+        if name in NAMED_POLICIES:
+            function = NAMED_POLICIES[name]()
+            _loaded[name] = (lambda state, rng: function(state),
+                             lambda state: function(state) == ACTION_NOOP)
+        else:
+            Q = QTable.load(name)
+            noop = np.array([ACTION_IDS[ACTION_NOOP]])
+            _loaded[name] = (lambda state, rng: learning.choose_action(Q, state, 0.0, rng),
+                             lambda state: np.array_equal(
+                                 Q.best_actions(QTable.state_index(state), QTable.action_mask(state)), noop))
+
+    return _loaded[name]
+
+
+def run_episodes(name, seeds, steps, jump=True):
+    """
+    Worker task: play one episode per seed with a policy.
+
+    Every episode is identified by its seed only, the same seed produces the same passenger arrivals for every
+    policy (the arrivals do not depend on the actions), hence all policies are compared under common random numbers.
+    The arrivals of an episode are pre-drawn in one block (see Environment.arrival_block).
+
+    With jump=True, an idle lift whose policy keeps waiting is advanced to the next arrival by
+    Environment.advance_idle, and the reward of a waiting step is added once per skipped step. Thanks to the pre-drawn
+    arrivals, the episodes are the same as when every step is played.
+
+    Parameters
+    ----------
+    name : str
+        The policy, see load_policy.
+
+    seeds : list
+        One np.random.SeedSequence per episode.
+
+    steps : int
+        The length of an episode.
+
+    jump : bool
+        Whether idle periods are skipped.
+
+    Returns
+    -------
+    rewards : np.ndarray
+        The total reward of every episode.
+
+    waits : np.ndarray
+        The mean waiting time of a person in every episode (in steps). It is the number of waiting persons summed over
+        all steps, divided by the number of persons who appeared (Little's law).
+    """
+    choose, waits_for_sure = load_policy(name)
+    rewards = np.zeros(len(seeds))
+    waits = np.zeros(len(seeds))
+
+    for i, seed in enumerate(seeds):
+        # The children are derived without seed.spawn, which would advance the counter of the caller's sequence
+        env_seed, policy_seed = (np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (k,)) for k in (0, 1))
+        env = Environment(render_mode="none", seed=env_seed, arrival_block=steps)
+        rng = np.random.default_rng(policy_seed)
+
+        state = env.reset()
+        waiting = 0
+        step = 0
+
+        while step < steps:
+            if jump and env.is_idle() and waits_for_sure(state):
+                # The state does not change until the tick with the next arrival, hence neither does the action
+                ticks = env.advance_idle(steps - step)
+                rewards[i] += ticks * learning.effective_reward(env, state, ACTION_NOOP, state)
+                waiting += env.active_persons - env.get_persons_in_cabin()
+                step += ticks
+                continue
+
+            action = choose(state, rng)
+            next_state = env.step(action)
+            rewards[i] += learning.effective_reward(env, state, action, next_state)
+            waiting += env.active_persons - env.get_persons_in_cabin()
+            state = next_state
+            step += 1
+
+        waits[i] = waiting / max(env.person_counter, 1)
+
+    return rewards, waits
+
+
+def confidence(values):
+    """
+    Mean and half-width of the 95 % confidence interval of the mean.
+    """
+    if len(values) < 2:
+        return float(np.mean(values)), np.inf
+
+    return float(np.mean(values)), Z_95 * float(np.std(values, ddof=1)) / np.sqrt(len(values))
+
+
+def paired(values, reference):
+    """
+    Per-seed differences of a policy to the reference policy on the episodes played by both.
+    """
+    count = min(len(values), len(reference))
+    return np.asarray(values[:count]) - np.asarray(reference[:count])
+
+
+def evaluate(names, workers=4, batch=8, min_episodes=32, max_episodes=2000, precision=0.02, wait_precision=0.05,
+             steps=learning.steps_per_episode, seed=learning.seed, reference=None, reward_floor=1.0, wait_floor=0.1):
+    """
+    Evaluate policies with a process pool until the confidence intervals are tight enough.
+
+    In every round, each unfinished policy plays the next `workers * batch` episodes. All policies play the same
+    episode seeds, hence the i-th episodes of two policies see the same arrivals. Every policy is compared with the
+    reference policy by the per-seed differences of reward and waiting time. A policy is finished when the 95 %
+    confidence intervals of its mean differences are within precision and wait_precision (relative to the absolute
+    means of the reference, but at least reward_floor and wait_floor), or after max_episodes. The reference plays as
+    long as any other policy; evaluated on its own, it is finished when its own confidence intervals are within these
+    bounds.
+
+    Parameters
+    ----------
+    names : list
+        The policies, see load_policy.
+
+    workers : int
+        The number of worker processes.
+
+    batch : int
+        The number of episodes of a worker task.
+
+    min_episodes : int
+        The number of episodes before a policy can finish.
+
+    max_episodes : int
+        The maximal number of episodes per policy.
+
+    precision : float
+        The required relative half-width of the confidence interval of the mean reward.
+
+    wait_precision : float
+        The required relative half-width of the confidence interval of the mean waiting time.
+
+    steps : int
+        The length of an episode.
+
+    seed : int or None
+        The seed of the evaluation.
+
+    reference : str or None
+        The policy the others are compared with, the first of names if None.
+
+    reward_floor : float
+        The smallest required half-width of the reward interval, e.g. if the mean reward of the reference is close
+        to 0.
+
+    wait_floor : float
+        The smallest required half-width of the waiting time interval (in steps), e.g. if nobody waits under the
+        reference.
+
+    Returns
+    -------
+    results : dict
+        For every policy the number of episodes and mean and confidence half-width of reward and waiting time,
+        for the other policies also of the differences to the reference (reward_diff, wait_diff).
+    """
+    reference = names[0] if reference is None else reference
+
+    if reference not in names:
+        raise ValueError(f"The reference policy {reference!r} is not one of the evaluated policies {names}.")
+
+    seeds = np.random.SeedSequence(seed).spawn(max_episodes)
+    rewards = {name: [] for name in names}
+    waits = {name: [] for name in names}
+    finished = set()
+    played = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while played < max_episodes and len(finished) < len(names):
+            block = seeds[played:played + workers * batch]
+            futures = {}
+
+            for name in names:
+                if name in finished:
+                    continue
+
+                futures[name] = [pool.submit(run_episodes, name, block[i:i + batch], steps)
+                                 for i in range(0, len(block), batch)]
+
+            for name, tasks in futures.items():
+                for task in tasks:
+                    block_rewards, block_waits = task.result()
+                    rewards[name].extend(block_rewards)
+                    waits[name].extend(block_waits)
+
+            played += len(block)
+
+            if played < min_episodes:
+                continue
+
+            reward_bound = max(precision * abs(np.mean(rewards[reference])), reward_floor)
+            wait_bound = max(wait_precision * abs(np.mean(waits[reference])), wait_floor)
+
+            for name in futures:
+                if name == reference:
+                    continue
+
+                _, reward_ci = confidence(paired(rewards[name], rewards[reference]))
+                _, wait_ci = confidence(paired(waits[name], waits[reference]))
+
+                if reward_ci <= reward_bound and wait_ci <= wait_bound:
+                    finished.add(name)
+
+            # The reference is needed for the pairs of the other policies
+            if len(finished) == len(names) - 1:
+                _, reward_ci = confidence(rewards[reference])
+                _, wait_ci = confidence(waits[reference])
+
+                if len(names) > 1 or (reward_ci <= reward_bound and wait_ci <= wait_bound):
+                    finished.add(reference)
+
+    results = {}
+
+    for name in names:
+        reward, reward_ci = confidence(rewards[name])
+        wait, wait_ci = confidence(waits[name])
+        results[name] = {"episodes": len(rewards[name]), "reward": reward, "reward_ci": reward_ci,
+                         "wait": wait, "wait_ci": wait_ci}
+
+        if name != reference:
+            reward_diff, reward_diff_ci = confidence(paired(rewards[name], rewards[reference]))
+            wait_diff, wait_diff_ci = confidence(paired(waits[name], waits[reference]))
+            results[name].update({"reward_diff": reward_diff, "reward_diff_ci": reward_diff_ci,
+                                  "wait_diff": wait_diff, "wait_diff_ci": wait_diff_ci})
+
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Compare policies on common random numbers.")
+    parser.add_argument("policies", nargs="*", default=["up", "alternate", "baseline"],
+                        help="names of policies (up, alternate, baseline) or paths of Q-table files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch", type=int, default=8, help="episodes per worker task")
+    parser.add_argument("--min-episodes", type=int, default=32)
+    parser.add_argument("--max-episodes", type=int, default=2000)
+    parser.add_argument("--precision", type=float, default=0.02,
+                        help="CI half-width of the reward difference, relative to the mean reward of the reference")
+    parser.add_argument("--wait-precision", type=float, default=0.05,
+                        help="CI half-width of the wait difference, relative to the mean wait of the reference")
+    parser.add_argument("--reward-floor", type=float, default=1.0, help="smallest required CI half-width of the reward")
+    parser.add_argument("--wait-floor", type=float, default=0.1,
+                        help="smallest required CI half-width of the wait [steps]")
+    parser.add_argument("--reference", default=None, help="policy the others are compared with (default: the first)")
+    parser.add_argument("--steps", type=int, default=learning.steps_per_episode)
+    parser.add_argument("--seed", type=int, default=learning.seed)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = evaluate(args.policies, args.workers, args.batch, args.min_episodes, args.max_episodes, args.precision,
+                       args.wait_precision, args.steps, args.seed, args.reference, args.reward_floor, args.wait_floor)
+
+    print(f"{'policy':24s} {'episodes':>8s} {'reward':>18s} {'wait [steps]':>18s} "
+          f"{'Δ reward':>18s} {'Δ wait [steps]':>18s}")
+    for name, result in sorted(results.items(), key=lambda item: -item[1]["reward"]):
+        difference = (f"{result['reward_diff']:+9.1f} ± {result['reward_diff_ci']:6.1f} "
+                      f"{result['wait_diff']:+9.2f} ± {result['wait_diff_ci']:6.2f}"
+                      if "reward_diff" in result else f"{'(reference)':>18s}")
+        print(f"{name:24s} {result['episodes']:8d} {result['reward']:9.1f} ± {result['reward_ci']:6.1f} "
+              f"{result['wait']:9.2f} ± {result['wait_ci']:6.2f} {difference}")
+    print(f"{time.perf_counter() - start:.1f} s")
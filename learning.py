@@ -1,10 +1,16 @@
-import random
-from collections import defaultdict
-import matplotlib.pyplot as plt
+from time import perf_counter
 import numpy as np
 from Environment.environment import Environment
+from Environment.vector_environment import VectorEnvironment
+from Environment.encoding import encode_states, simplified_indices
+from Environment import batch_policy
+from q_table import QTable, ACTION_IDS
+from checkpoint import CheckpointWriter, load_checkpoint
+from metrics import MetricsLog
 from Environment.constants import ACTIONS, NUMBER_OF_FLOORS, DIRECTION_UP, DIRECTION_DOWN, DIRECTION_NONE, DOOR_OPEN, \
     DOOR_CLOSED, ACTION_DOOR, ACTION_UP, ACTION_DOWN, ACTION_STOP, ACTION_NOOP
+from Environment.vector_environment import STATE_FLOOR, STATE_DIRECTION, STATE_DOOR, STATE_CABIN_BUTTONS, \
+    STATE_CALL_BUTTONS, DIRECTION_NONE_ID, DOOR_OPEN_ID, DOOR_CLOSED_ID, ACTION_DOOR_ID, ACTION_UP_ID, ACTION_DOWN_ID
 
 
 def simplify_state(state):
@@ -31,7 +37,7 @@ def simplify_state(state):
     )
 
 
-def effective_reward(env, state, action, next_state, prev_persons):
+def effective_reward(env, state, action, next_state):
     reward = -0.05  # Kleine negative Belohnung pro Schritt
 
     current_floor, move_direction, door_state, cabin_buttons, call_buttons = state
@@ -45,11 +51,9 @@ def effective_reward(env, state, action, next_state, prev_persons):
     if action in [ACTION_UP, ACTION_DOWN] and move_direction == DIRECTION_NONE:
         reward += 2
 
-    # Sehr hohe Belohnung für Passagierablieferung
-    new_persons = env.get_active_persons()
-    delivered = prev_persons - new_persons
-    if delivered > 0:
-        reward += delivered * 50
+    # Sehr hohe Belohnung für Passagierablieferung (die Umgebung zählt die Aussteigenden im letzten Schritt)
+    if env.delivered > 0:
+        reward += env.delivered * 50
 
     # Strafe für unnötiges Öffnen/Schließen
     if action == ACTION_DOOR:
@@ -59,80 +63,285 @@ def effective_reward(env, state, action, next_state, prev_persons):
     return reward
 
 
-def choose_action(state, epsilon):
-    allowed_actions = Environment.get_available_actions(state)
+def effective_rewards(states, actions, delivered):
+    """
+    effective_reward für einen Batch von Übergängen der VectorEnvironment.
+    states und actions sind die Zustände (N×5) und Aktionsindizes vor dem Schritt,
+    delivered die Anzahl der im Schritt ausgestiegenen Personen (VectorEnvironment.delivered).
+    """
+    floor = states[:, STATE_FLOOR]
+    buttons = states[:, STATE_CABIN_BUTTONS] | states[:, STATE_CALL_BUTTONS]
+    requested = ((buttons >> floor) & 1) != 0
+    door = actions == ACTION_DOOR_ID
 
-    if random.random() < epsilon:
-        return random.choice(allowed_actions)
+    rewards = np.full(len(states), -0.05)
+    rewards += 10 * (door & (states[:, STATE_DOOR] == DOOR_CLOSED_ID) & requested)
+    rewards += 2 * (((actions == ACTION_UP_ID) | (actions == ACTION_DOWN_ID))
+                    & (states[:, STATE_DIRECTION] == DIRECTION_NONE_ID))
+    rewards += 50 * delivered
+    rewards -= 5 * (door & (states[:, STATE_DOOR] == DOOR_OPEN_ID) & ~requested)
 
-    state_key = simplify_state(state)
-    q_values = Q[state_key]
+    return rewards
 
-    best_value = max(q_values[a] for a in allowed_actions)
-    best_actions = [a for a in allowed_actions if q_values[a] == best_value]
-    return random.choice(best_actions)
+
+def choose_action(Q, state, epsilon, rng):
+    allowed_actions = Environment.get_available_actions(state)
+
+    if rng.random() < epsilon:
+        return allowed_actions[rng.integers(len(allowed_actions))]
+
+    best_actions = Q.best_actions(QTable.state_index(state), QTable.action_mask(state))
+    return ACTIONS[best_actions[rng.integers(len(best_actions))]]
 
 
 # Hyperparameter optimiert
 alpha = 0.1  # Höhere Lernrate
 gamma = 0.9  # Weniger Fokus auf langfristige Belohnung
 epsilon = 0.3  # Mehr Exploration
+epsilon_decay = 0.995
+epsilon_min = 0.05
 episodes = 3000
 steps_per_episode = 400
+seed = 0  # Startwert für reproduzierbare Läufe
+
+
+def epsilon_at(episode, epsilon=epsilon, decay=epsilon_decay, minimum=epsilon_min):
+    """
+    Explorationsrate in einer Episode: exponentiell fallend bis minimum (standardmäßig epsilon_min).
+    """
+    return max(minimum, epsilon * decay ** episode)
 
-Q = defaultdict(lambda: {a: 0.0 for a in ACTIONS})
-rewards = []
-moving_avgs = []
 
-for ep in range(episodes):
-    env = Environment(render_mode="none")
+def run_episode(Q, env, epsilon, rng, steps=steps_per_episode, tracer=None, alpha=alpha, gamma=gamma, visits=None):
+    """
+    Spielt eine Episode in env und aktualisiert Q direkt (Q-Learning) mit Lernrate alpha und Diskontfaktor gamma.
+    Gibt die Gesamtbelohnung der Episode zurück.
+    Mit einem Tracer (Environment.tracing) werden die Zeiten der Phasen eines Trainingsschritts erfasst.
+    Mit visits (Array in der Form von Q.values) wird jedes Update des Zustands-Aktions-Paars darin gezählt.
+    """
     state = env.reset()
     total_reward = 0
 
-    for step in range(steps_per_episode):
-        prev_persons = env.get_active_persons()
-        action = choose_action(state, epsilon)
+    for step in range(steps):
+        if tracer is not None:
+            started = perf_counter()
+
+        action = choose_action(Q, state, epsilon, rng)
+
+        if tracer is not None:
+            started = tracer.record("choose_action", started)
+
         next_state = env.step(action)
 
-        reward = effective_reward(env, state, action, next_state, prev_persons)
+        if tracer is not None:
+            started = tracer.record("env_step", started)
+
+        reward = effective_reward(env, state, action, next_state)
         total_reward += reward
 
-        # Q-Learning Update mit Fehlerbehandlung
-        state_key = simplify_state(state)
-        next_state_key = simplify_state(next_state)
+        if tracer is not None:
+            started = tracer.record("reward", started)
+
+        # Q-Learning Update
+        index = QTable.state_index(state)
+        Q.update(index, ACTION_IDS[action], reward, QTable.state_index(next_state), alpha, gamma)
 
-        current_q = Q[state_key][action]
-        next_max = max(Q[next_state_key].values())
-        new_q = current_q + alpha * (reward + gamma * next_max - current_q)
+        if visits is not None:
+            visits[index, ACTION_IDS[action]] += 1
 
-        Q[state_key][action] = new_q
         state = next_state
 
-    rewards.append(total_reward)
-
-    # Gleitenden Durchschnitt berechnen
-    if ep >= 100:
-        moving_avg = np.mean(rewards[-100:])
-        moving_avgs.append(moving_avg)
-
-    # Epsilon verringern
-    epsilon = max(0.05, epsilon * 0.995)
-
-    # Fortschrittsausgabe
-    if ep % 200 == 0:
-        avg_reward = np.mean(rewards[-50:]) if len(rewards) > 50 else total_reward
-        print(f"Episode {ep:04d}/{episodes} | Reward: {total_reward:7.1f} | Avg: {avg_reward:7.1f} | ε: {epsilon:.3f}")
-
-# Lernkurve mit gleitendem Durchschnitt plotten
-plt.figure(figsize=(12, 6))
-plt.plot(rewards, alpha=0.3, label='Episode Rewards')
-if moving_avgs:
-    plt.plot(range(100, 100 + len(moving_avgs)), moving_avgs, 'r-', linewidth=2, label='Moving Avg (100 episodes)')
-plt.xlabel("Episode")
-plt.ylabel("Total Reward")
-plt.title("Verbesserte Lernkurve des Aufzug-Agents")
-plt.legend()
-plt.grid(True)
-plt.tight_layout()
-plt.savefig("improved_learning_curve.png")
-plt.show()
\ No newline at end of file
+        if tracer is not None:
+            tracer.record("q_update", started)
+
+    return total_reward
+
+
+def episode_seeds(seed, episodes):
+    """
+    Unabhängige Seeds für den Agenten und jede Episode aus einer gemeinsamen SeedSequence.
+    Gibt (agent_seed, [episode_seed, ...]) zurück.
+    """
+    agent_seed, *seeds = np.random.SeedSequence(seed).spawn(episodes + 1)
+    return agent_seed, seeds
+
+
+def hyperparameters(overrides=None):
+    """
+    Die Hyperparameter, von denen der Verlauf des Trainings abhängt (werden in Checkpoints gespeichert).
+    Ohne overrides gelten die globalen Werte dieses Moduls, overrides (dict) ersetzt einzelne davon.
+    """
+    params = {"alpha": alpha, "gamma": gamma, "epsilon": epsilon, "epsilon_decay": epsilon_decay,
+              "epsilon_min": epsilon_min, "steps_per_episode": steps_per_episode}
+
+    if overrides:
+        unknown = set(overrides) - set(params)
+
+        if unknown:
+            raise ValueError(f"Unknown hyperparameters {sorted(unknown)}, expected some of {sorted(params)}.")
+
+        params.update(overrides)
+
+    return params
+
+
+def train(episodes=episodes, seed=seed, tracer=None, checkpoint=None, checkpoint_interval=100, resume=False,
+          metrics=None, params=None, verbose=True):
+    """
+    Sequenzielles Training auf einem Kern. Gibt Q und das MetricsLog (metrics.py) mit den gleitenden Kennzahlen der
+    Episodenbelohnungen zurück. Mit metrics (Dateipfad) wird jede Episode als CSV-Zeile angehängt, die Lernkurve
+    erzeugt danach "python metrics.py". Der Speicherbedarf hängt nicht von der Anzahl der Episoden ab.
+    Ein optionaler Tracer wird an die Umgebung und die Trainingsschleife weitergegeben.
+
+    Mit checkpoint wird alle checkpoint_interval Episoden (und am Ende) ein Checkpoint mit Q, Zufallsgenerator und
+    Zustand des Logs in diese Datei geschrieben, im Hintergrund (siehe checkpoint.py). Mit resume=True wird das
+    Training aus dem Checkpoint fortgesetzt und läuft bitgenau wie ein ununterbrochener Lauf weiter; der Seed des
+    Checkpoints ersetzt dann das Argument seed, das Log wird auf den Stand des Checkpoints gekürzt.
+
+    Zum Fortsetzen muss metrics dieselbe Datei wie im unterbrochenen Lauf sein (oder None).
+
+    params ersetzt einzelne Hyperparameter (siehe hyperparameters), z. B. für die Suche in sweep.py.
+    Mit verbose=False entfällt die Fortschrittsausgabe.
+    """
+    if resume and checkpoint is None:
+        raise ValueError("Resuming the training needs the checkpoint file to resume from.")
+
+    params = hyperparameters(params)
+    Q = QTable()
+    start = 0
+    rng_state = None
+    metrics_state = None
+
+    if resume:
+        saved = load_checkpoint(checkpoint)
+
+        if saved["hyperparameters"] != params:
+            raise ValueError(f"{checkpoint} was written with different hyperparameters: {saved['hyperparameters']}")
+
+        seed = saved["seed"]
+        start = saved["episode"]
+        rng_state = saved["rng"]
+        metrics_state = saved["metrics"]
+        Q = QTable(saved["values"])
+    elif checkpoint is not None and seed is None:
+        # Ohne festen Seed wird die gezogene Entropie gespeichert, damit der Lauf fortgesetzt werden kann
+        seed = np.random.SeedSequence().entropy
+
+    agent_seed, seeds = episode_seeds(seed, episodes)
+    rng = np.random.default_rng(agent_seed)
+
+    if rng_state is not None:
+        rng.bit_generator.state = rng_state
+
+    schedule = params["epsilon"], params["epsilon_decay"], params["epsilon_min"]
+    log = MetricsLog(metrics, state=metrics_state)
+    writer = None if checkpoint is None else CheckpointWriter(checkpoint)
+
+    try:
+        for ep in range(start, episodes):
+            env = Environment(render_mode="none", seed=seeds[ep], tracer=tracer)
+            exploration = epsilon_at(ep, *schedule)
+            total_reward = run_episode(Q, env, exploration, rng, params["steps_per_episode"], tracer,
+                                       params["alpha"], params["gamma"])
+
+            # Belohnung und gleitenden Durchschnitt protokollieren
+            log.log(ep, total_reward, exploration)
+
+            # Fortschrittsausgabe
+            if verbose and ep % 200 == 0:
+                print(f"Episode {ep:04d}/{episodes} | Reward: {total_reward:7.1f} | Avg: {log.moving_avg():7.1f} | "
+                      f"ε: {epsilon_at(ep + 1, *schedule):.3f}")
+
+            # Checkpoint nach der Episode, der Schreibvorgang blockiert das Training nicht
+            if writer is not None and ((ep + 1) % checkpoint_interval == 0 or ep + 1 == episodes):
+                writer.submit(ep + 1, Q.values, {"seed": seed, "rng": rng.bit_generator.state,
+                                                 "hyperparameters": params, "metrics": log.state()})
+    finally:
+        log.close()
+
+        if writer is not None:
+            writer.close()
+
+    return Q, log
+
+
+def train_batched(episodes=episodes, lanes=64, seed=seed, metrics=None, params=None, verbose=True):
+    """
+    Training auf einer VectorEnvironment: lanes Episoden laufen gleichzeitig, jeder Schritt aller Aufzüge ist ein
+    NumPy-Aufruf. Die Aktionen wählt batch_policy.greedy (ε-greedy auf den kodierten Zuständen), die Belohnungen
+    berechnet effective_rewards, und Q wird mit QTable.update_batch für alle Übergänge des Schritts auf einmal
+    aktualisiert. Die Explorationsrate gilt jeweils für einen Block von lanes Episoden (die der ersten Episode).
+
+    Die Ergebnisse sind mit demselben seed und derselben Anzahl lanes reproduzierbar, entsprechen aber nicht denen
+    von train. Checkpoints und das Fortsetzen unterstützt nur train. Rückgabe und metrics wie bei train.
+    """
+    params = hyperparameters(params)
+    schedule = params["epsilon"], params["epsilon_decay"], params["epsilon_min"]
+    steps = params["steps_per_episode"]
+
+    agent_seed, *block_seeds = np.random.SeedSequence(seed).spawn(-(-episodes // lanes) + 1)
+    rng = np.random.default_rng(agent_seed)
+    Q = QTable()
+    log = MetricsLog(metrics)
+
+    try:
+        for block, block_seed in enumerate(block_seeds):
+            first = block * lanes
+            count = min(lanes, episodes - first)
+            exploration = epsilon_at(first, *schedule)
+
+            venv = VectorEnvironment(count, seed=block_seed)
+            states = venv.get_states()
+            codes = encode_states(states)
+            totals = np.zeros(count)
+
+            for _ in range(steps):
+                actions = batch_policy.greedy(Q, codes, rng, exploration)
+                next_states, _ = venv.step(actions)
+                next_codes = encode_states(next_states)
+
+                rewards = effective_rewards(states, actions, venv.delivered)
+                totals += rewards
+
+                # Vektorisiertes Q-Learning-Update über alle Aufzüge
+                Q.update_batch(simplified_indices(codes), actions, rewards, simplified_indices(next_codes),
+                               params["alpha"], params["gamma"])
+                states, codes = next_states, next_codes
+
+            for lane, total_reward in enumerate(totals):
+                log.log(first + lane, total_reward, exploration)
+
+            if verbose:
+                print(f"Episode {first + count:04d}/{episodes} | Reward: {totals.mean():7.1f} | "
+                      f"Avg: {log.moving_avg():7.1f} | ε: {exploration:.3f}")
+    finally:
+        log.close()
+
+    return Q, log
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Q-Learning des Aufzug-Agents.")
+    parser.add_argument("--episodes", type=int, default=episodes)
+    parser.add_argument("--seed", type=int, default=seed)
+    parser.add_argument("--checkpoint", default="learning.ckpt", help="Datei für Checkpoints")
+    parser.add_argument("--checkpoint-interval", type=int, default=100, help="Episoden zwischen zwei Checkpoints")
+    parser.add_argument("--resume", action="store_true", help="Training aus dem Checkpoint fortsetzen")
+    parser.add_argument("--metrics", default="learning_metrics.csv", help="CSV-Datei für die Episodenbelohnungen")
+    parser.add_argument("--lanes", type=int, default=None,
+                        help="so viele Episoden gleichzeitig auf einer VectorEnvironment trainieren (ohne Checkpoints)")
+    args = parser.parse_args()
+
+    if args.lanes is not None:
+        Q, log = train_batched(args.episodes, args.lanes, args.seed, metrics=args.metrics)
+    else:
+        Q, log = train(args.episodes, args.seed, checkpoint=args.checkpoint,
+                       checkpoint_interval=args.checkpoint_interval, resume=args.resume, metrics=args.metrics)
+
+    # Q-Tabelle im Binärformat speichern (siehe q_table.py)
+    Q.save("q_table.qtab")
+
+    print(f"Gleitender Durchschnitt: {log.moving_avg():.1f} | bester: {log.best_moving_avg:.1f}")
+    print(f"Lernkurve: python metrics.py {args.metrics}")
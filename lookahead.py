@@ -0,0 +1,176 @@
+import time
+import numpy as np
+from Environment.environment import Environment
+from Environment.encoding import state_actions
+from Environment import policy
+import learning
+
+
+class LookaheadPolicy:
+    """
+    Monte-Carlo lookahead controller.
+
+    For every allowed action, the policy simulates short rollouts from a snapshot of the real environment: the action
+    is taken first, afterwards the rollout policy (uniformly random allowed actions by default) continues for depth
+    steps. The discounted rewards of learning.effective_reward are summed up and the action with the highest mean
+    is chosen.
+
+    In every round, all actions are evaluated with the same random numbers, so that differences between the actions
+    are not blurred by different arrivals. Rounds are repeated until the number of rollouts or the time budget per
+    decision is reached, at least one round is always completed.
+    """
+
+    def __init__(self, env, rollouts=8, depth=20, budget=None, gamma=learning.gamma, rollout_policy=None, seed=None):
+        """
+        Creates a lookahead policy for an environment.
+
+        Parameters
+        ----------
+        env : Environment
+            The real environment. It is only read through Environment.snapshot.
+
+        rollouts : int
+            The maximal number of rollouts per action and decision.
+
+        depth : int
+            The number of steps of a rollout.
+
+        budget : float or None
+            The time budget of a decision in seconds, None only limits the number of rollouts.
+
+        gamma : float
+            The discount factor of the rollout rewards.
+
+        rollout_policy : callable or None
+            A policy (state -> action) followed after the first action, None chooses random allowed actions.
+
+        seed : int or None
+            The seed of the simulated futures.
+        """
+        self.env = env
+        self.rollouts = rollouts
+        self.depth = depth
+        self.budget = budget
+        self.gamma = gamma
+        self.rollout_policy = rollout_policy
+
+        # The rollouts run in a separate environment with its own random generator
+        self.simulator = Environment(render_mode="none", max_capacity=env.max_capacity, compact=env.compact,
+                                     seed=seed, traffic=env.traffic, start_time=env.start_time)
+        self.rounds = 0
+        self.decisions = 0
+
+    def __call__(self, state):
+        """
+        Choose an action for the current state of the environment.
+
+        Parameters
+        ----------
+        state : tuple
+            The current state of the environment given to the constructor.
+
+        Returns
+        -------
+        action : str
+            The action to take.
+        """
+        started = time.perf_counter()
+        actions = state_actions(state)
+        self.decisions += 1
+
+        if len(actions) == 1:
+            return actions[0]
+
+        snapshot = self.env.snapshot()
+        rng = self.simulator.rng
+        totals = np.zeros(len(actions))
+
+        for _ in range(self.rollouts):
+            # Every action sees the same future arrivals
+            rng_state = rng.bit_generator.state
+
+            for i, action in enumerate(actions):
+                rng.bit_generator.state = rng_state
+                totals[i] += self._rollout(snapshot, action)
+
+            self.rounds += 1
+
+            if self.budget is not None and time.perf_counter() - started >= self.budget:
+                break
+
+        return actions[int(np.argmax(totals))]
+
+    def _rollout(self, snapshot, action):
+        """
+        Simulate depth steps starting with the given action.
+
+        Returns
+        -------
+        total : float
+            The discounted sum of the rewards.
+        """
+        simulator = self.simulator
+        simulator.restore(snapshot, rng=False)
+
+        state = simulator.state
+        total = 0.0
+        discount = 1.0
+
+        for step in range(self.depth):
+            if step > 0:
+                if self.rollout_policy is not None:
+                    action = self.rollout_policy(state)
+                else:
+                    allowed = state_actions(state)
+                    action = allowed[simulator.rng.integers(len(allowed))]
+
+            next_state = simulator.step(action)
+            total += discount * learning.effective_reward(simulator, state, action, next_state)
+            discount *= self.gamma
+            state = next_state
+
+        return total
+
+
+def run(choose, env, steps=learning.steps_per_episode):
+    """
+    Play one episode with a policy and return the total reward.
+    """
+    state = env.reset()
+    total = 0.0
+
+    for _ in range(steps):
+        action = choose(state)
+        next_state = env.step(action)
+        total += learning.effective_reward(env, state, action, next_state)
+        state = next_state
+
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the Monte-Carlo lookahead policy with policy.alternate.")
+    parser.add_argument("--episodes", type=int, default=5)
+    parser.add_argument("--rollouts", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--budget", type=float, default=None, help="time budget per decision in seconds")
+    parser.add_argument("--seed", type=int, default=learning.seed)
+    args = parser.parse_args()
+
+    seeds = np.random.SeedSequence(args.seed).spawn(args.episodes)
+
+    for name in ["alternate", "lookahead"]:
+        rewards = []
+        start = time.perf_counter()
+
+        for episode_seed in seeds:
+            env = Environment(render_mode="none", seed=episode_seed)
+            choose = policy.alternate if name == "alternate" else \
+                LookaheadPolicy(env, args.rollouts, args.depth, args.budget, seed=episode_seed.spawn(1)[0])
+            rewards.append(run(choose, env))
+
+        elapsed = time.perf_counter() - start
+        print(f"{name:10s} average reward {np.mean(rewards):8.1f} | "
+              f"{args.episodes * learning.steps_per_episode / elapsed:8.1f} decisions/s")
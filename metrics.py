@@ -0,0 +1,309 @@
+"""
+Streaming metrics of the training.
+
+MetricsLog appends one CSV row per episode and one per interval of episodes, the files are line buffered, hence
+they can be followed while the training runs (e.g. tail -f learning_metrics.csv). The rolling aggregates are updated
+in constant time and memory per episode. The learning curve is plotted offline from the log:
+
+    python metrics.py learning_metrics.csv --output improved_learning_curve.png
+"""
+import math
+import time
+from pathlib import Path
+import numpy as np
+
+EPISODE_COLUMNS = ["episode", "reward", "epsilon", "moving_avg"]
+INTERVAL_COLUMNS = ["episode", "episodes", "mean", "std", "min", "max", "moving_avg", "episodes_per_s"]
+
+
+class RollingWindow:
+    """
+    Mean and standard deviation of the last size values.
+
+    The values are kept in a ring buffer, the sums are updated in constant time. Whenever the ring buffer wraps
+    around, the sums are recomputed exactly, so that rounding errors do not accumulate over long runs.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.values = [0.0] * size
+        self.count = 0
+        self.position = 0
+        self.total = 0.0
+        self.squares = 0.0
+
+    def push(self, value):
+        value = float(value)
+
+        if self.count == self.size:
+            old = self.values[self.position]
+            self.total -= old
+            self.squares -= old * old
+        else:
+            self.count += 1
+
+        self.values[self.position] = value
+        self.total += value
+        self.squares += value * value
+        self.position = (self.position + 1) % self.size
+
+        if self.position == 0:
+            self.total = math.fsum(self.values)
+            self.squares = math.fsum(v * v for v in self.values)
+
+    def mean(self):
+        return self.total / self.count if self.count else math.nan
+
+    def std(self):
+        if not self.count:
+            return math.nan
+
+        mean = self.mean()
+        return math.sqrt(max(self.squares / self.count - mean * mean, 0.0))
+
+    def state(self):
+        return {"values": list(self.values), "count": self.count, "position": self.position, "total": self.total,
+                "squares": self.squares}
+
+    def restore(self, state):
+        if len(state["values"]) != self.size:
+            raise ValueError(f"Expected a window of {self.size} values, got {len(state['values'])}.")
+
+        self.values = list(state["values"])
+        self.count, self.position = state["count"], state["position"]
+        self.total, self.squares = state["total"], state["squares"]
+
+
+class MetricsLog:
+    """
+    Append-only log of the episode rewards with rolling aggregates.
+
+    Every episode adds a row (episode, reward, epsilon, moving_avg) to the episode file. The moving average over the
+    last window episodes is written from episode window on. After every interval episodes, a row with the count,
+    mean, standard deviation, minimum and maximum of the rewards of the interval, the moving average and the
+    throughput is added to the interval file (the episode file with the suffix .intervals.csv).
+    """
+
+    def __init__(self, path=None, window=100, interval=100, state=None):
+        """
+        Creates a log.
+
+        Parameters
+        ----------
+        path : str or Path or None
+            The episode file, None only keeps the aggregates in memory.
+
+        window : int
+            The number of episodes of the moving average.
+
+        interval : int
+            The number of episodes of an interval row.
+
+        state : dict or None
+            A state returned by MetricsLog.state, e.g. from a checkpoint. The files are truncated to the rows
+            written until then and the aggregates are restored, so that a resumed training continues the log.
+
+        Raises
+        ------
+        ValueError
+            If the state belongs to a log with a different episode file, or the files are missing or shorter than
+            when the state was taken.
+        """
+        self.window = RollingWindow(window)
+        self.interval = interval
+        self.episodes = 0
+        self.best_moving_avg = -math.inf
+        self._reset_interval()
+
+        self.path = None if path is None else Path(path)
+        self.interval_path = None if path is None else self.path.with_suffix(".intervals.csv")
+        self.episode_file = None
+        self.interval_file = None
+
+        if state is not None and self.path is not None and state.get("path") is not None and \
+                Path(state["path"]).resolve() != self.path.resolve():
+            raise ValueError(f"The state continues the metrics log {state['path']}, not {self.path}.")
+
+        if state is not None:
+            self.window.restore(state["window"])
+            self.episodes = state["episodes"]
+            self.best_moving_avg = state["best_moving_avg"]
+            self.interval_rewards = state["interval"]
+            # The interval continues with the time measured until the state was taken, the pause is not counted
+            self.interval_started = time.perf_counter() - state.get("interval_elapsed", 0.0)
+
+        if self.path is not None:
+            self.episode_file = self._open(self.path, EPISODE_COLUMNS, state and state["episode_offset"])
+            self.interval_file = self._open(self.interval_path, INTERVAL_COLUMNS, state and state["interval_offset"])
+
+    def log(self, episode, reward, epsilon):
+        """
+        Add the result of an episode.
+
+        Parameters
+        ----------
+        episode : int
+            The index of the episode.
+
+        reward : float
+            The total reward of the episode.
+
+        epsilon : float
+            The exploration rate of the episode.
+
+        Returns
+        -------
+        moving_avg : float or None
+            The moving average of the rewards, None before window episodes have been logged.
+        """
+        reward = float(reward)
+        self.window.push(reward)
+        self.episodes += 1
+
+        moving_avg = self.window.mean() if self.episodes > self.window.size else None
+
+        if moving_avg is not None:
+            self.best_moving_avg = max(self.best_moving_avg, moving_avg)
+
+        if self.episode_file is not None:
+            self.episode_file.write(f"{episode},{reward!r},{float(epsilon)!r},"
+                                    f"{'' if moving_avg is None else repr(moving_avg)}\n")
+
+        count, total, squares, low, high = self.interval_rewards
+        self.interval_rewards = [count + 1, total + reward, squares + reward * reward, min(low, reward),
+                                 max(high, reward)]
+
+        if self.episodes % self.interval == 0:
+            self._write_interval(episode, moving_avg)
+
+        return moving_avg
+
+    def moving_avg(self):
+        """
+        The mean reward of the last window episodes (or of all episodes, if there are fewer).
+        """
+        return self.window.mean()
+
+    def state(self):
+        """
+        The state of the aggregates and the length of the files, for checkpoints (JSON-serializable).
+        """
+        state = {"window": self.window.state(), "episodes": self.episodes, "best_moving_avg": self.best_moving_avg,
+                 "interval": list(self.interval_rewards),
+                 "interval_elapsed": time.perf_counter() - self.interval_started, "path": None,
+                 "episode_offset": None, "interval_offset": None}
+
+        if self.episode_file is not None:
+            state["path"] = str(self.path)
+            self.episode_file.flush()
+            self.interval_file.flush()
+            state["episode_offset"] = self.episode_file.tell()
+            state["interval_offset"] = self.interval_file.tell()
+
+        return state
+
+    def close(self):
+        if self.episode_file is not None:
+            self.episode_file.close()
+            self.interval_file.close()
+            self.episode_file = self.interval_file = None
+
+    def _reset_interval(self):
+        # Count, sum, sum of squares, minimum and maximum of the rewards of the current interval
+        self.interval_rewards = [0, 0.0, 0.0, math.inf, -math.inf]
+        self.interval_started = time.perf_counter()
+
+    def _write_interval(self, episode, moving_avg):
+        count, total, squares, low, high = self.interval_rewards
+        mean = total / count
+        std = math.sqrt(max(squares / count - mean * mean, 0.0))
+        rate = count / max(time.perf_counter() - self.interval_started, 1e-9)
+
+        if self.interval_file is not None:
+            self.interval_file.write(f"{episode},{count},{mean!r},{std!r},{low!r},{high!r},"
+                                     f"{'' if moving_avg is None else repr(moving_avg)},{rate:.1f}\n")
+
+        self._reset_interval()
+
+    @staticmethod
+    def _open(path, columns, offset=None):
+        """
+        Open a CSV file for appending, line buffered. A new file is started with the header, a resumed file is
+        truncated to offset.
+        """
+        if offset is None:
+            f = open(path, "w", buffering=1)
+            f.write(",".join(columns) + "\n")
+            return f
+
+        if not path.exists() or path.stat().st_size < offset:
+            raise ValueError(f"{path} cannot be continued, it is missing or shorter than the {offset} bytes written "
+                             f"until the state was taken.")
+
+        f = open(path, "r+", buffering=1)
+        f.truncate(offset)
+        f.seek(offset)
+        return f
+
+
+def read_log(path):
+    """
+    Read a CSV file written by MetricsLog.
+
+    Returns
+    -------
+    columns : dict
+        One float array per column, missing values are NaN.
+    """
+    data = np.genfromtxt(path, delimiter=",", names=True, ndmin=1)
+    return {name: data[name] for name in data.dtype.names}
+
+
+def plot_learning_curve(path, output="improved_learning_curve.png", max_points=100_000):
+    """
+    Plot the episode rewards and their moving average from a metrics log and save the figure.
+
+    Parameters
+    ----------
+    path : str or Path
+        The episode file of a MetricsLog.
+
+    output : str or Path
+        The image file.
+
+    max_points : int
+        Longer logs are thinned out to at most this many points per curve.
+    """
+    # The import is done here, matplotlib is only needed for plotting
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    log = read_log(path)
+    stride = max(1, -(-len(log["episode"]) // max_points))
+    episodes, rewards, moving_avgs = log["episode"][::stride], log["reward"][::stride], log["moving_avg"][::stride]
+
+    plt.figure(figsize=(12, 6))
+    plt.plot(episodes, rewards, alpha=0.3, label='Episode Rewards')
+    if not np.isnan(moving_avgs).all():
+        plt.plot(episodes, moving_avgs, 'r-', linewidth=2, label='Moving Avg')
+    plt.xlabel("Episode")
+    plt.ylabel("Total Reward")
+    plt.title("Verbesserte Lernkurve des Aufzug-Agents")
+    plt.legend()
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(output)
+    plt.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Plot the learning curve from a metrics log.")
+    parser.add_argument("log", nargs="?", default="learning_metrics.csv", help="episode file of the metrics log")
+    parser.add_argument("--output", default="improved_learning_curve.png")
+    args = parser.parse_args()
+
+    plot_learning_curve(args.log, args.output)
+    print(f"Saved {args.output}")
@@ -0,0 +1,173 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from Environment.environment import Environment
+from q_table import QTable
+from metrics import MetricsLog
+import learning
+
+
+def run_episodes(values, first_episode, agent_seed, seeds, params):
+    """
+    Worker task: train a private copy of the Q-table for a block of episodes.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        The Q-values of the central table at the last synchronisation.
+
+    first_episode : int
+        The global index of the first episode, used for the epsilon schedule.
+
+    agent_seed : np.random.SeedSequence
+        The seed of the action selection of this worker.
+
+    seeds : list
+        One seed per episode for the environments.
+
+    params : dict
+        The hyperparameters, see learning.hyperparameters.
+
+    Returns
+    -------
+    delta : np.ndarray
+        The change of the Q-values caused by this worker.
+
+    visits : np.ndarray
+        The number of updates of every state-action pair by this worker.
+
+    rewards : list
+        The total reward of every episode.
+    """
+    Q = QTable(values.copy())
+    visits = np.zeros(values.shape, dtype=np.int32)
+    rng = np.random.default_rng(agent_seed)
+    schedule = params["epsilon"], params["epsilon_decay"], params["epsilon_min"]
+    rewards = []
+
+    for i, episode_seed in enumerate(seeds):
+        env = Environment(render_mode="none", seed=episode_seed)
+        rewards.append(learning.run_episode(Q, env, learning.epsilon_at(first_episode + i, *schedule), rng,
+                                            params["steps_per_episode"], alpha=params["alpha"],
+                                            gamma=params["gamma"], visits=visits))
+
+    return Q.values - values, visits, rewards
+
+
+def merge(Q, results):
+    """
+    Merge the partial updates of several workers into the central table.
+    Every state-action pair moves by the average change of the workers that updated it. A pair counts as updated by
+    a worker if the worker visited it, even if its value did not change in the end.
+
+    Parameters
+    ----------
+    Q : QTable
+        The central table, updated in place.
+
+    results : list
+        The (delta, visits, rewards) tuples returned by run_episodes.
+    """
+    deltas = sum(delta for delta, _, _ in results)
+    counts = sum((visits > 0).astype(np.int32) for _, visits, _ in results)
+    Q.values += deltas / np.maximum(counts, 1)
+
+
+def train_parallel(episodes=learning.episodes, workers=4, sync_interval=10, seed=learning.seed, metrics=None,
+                   params=None, verbose=True):
+    """
+    Train a Q-table with a pool of worker processes.
+    In every round each worker runs sync_interval episodes on a copy of the central table, afterwards the partial
+    updates are merged. Every episode has its own seed, hence a run is reproducible for a fixed number of workers.
+
+    Parameters
+    ----------
+    episodes : int
+        The total number of episodes.
+
+    workers : int
+        The number of worker processes.
+
+    sync_interval : int
+        The number of episodes a worker runs between two synchronisations.
+
+    seed : int or None
+        The seed of the run.
+
+    metrics : str or Path or None
+        The episode file of the MetricsLog, None only keeps the aggregates in memory.
+
+    params : dict or None
+        Hyperparameters replacing the defaults, see learning.hyperparameters.
+
+    verbose : bool
+        Whether the progress is printed after every round.
+
+    Returns
+    -------
+    Q : QTable
+        The trained table.
+
+    log : MetricsLog
+        The rolling aggregates of the episode rewards, logged in the order of the episodes.
+    """
+    params = learning.hyperparameters(params)
+    schedule = params["epsilon"], params["epsilon_decay"], params["epsilon_min"]
+    agent_seed, seeds = learning.episode_seeds(seed, episodes)
+    worker_seeds = agent_seed.spawn(workers)
+
+    Q = QTable()
+    log = MetricsLog(metrics)
+    start = time.perf_counter()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            episode = 0
+
+            while episode < episodes:
+                futures = []
+                first = episode
+
+                for worker_seed in worker_seeds:
+                    block = seeds[episode:episode + sync_interval]
+
+                    if not block:
+                        break
+
+                    futures.append(pool.submit(run_episodes, Q.values, episode, worker_seed.spawn(1)[0], block,
+                                               params))
+                    episode += len(block)
+
+                results = [future.result() for future in futures]
+                merge(Q, results)
+
+                for _, _, block_rewards in results:
+                    for total_reward in block_rewards:
+                        log.log(first, total_reward, learning.epsilon_at(first, *schedule))
+                        first += 1
+
+                if verbose:
+                    elapsed = time.perf_counter() - start
+                    print(f"Episode {episode:04d}/{episodes} | Avg: {log.moving_avg():7.1f} | "
+                          f"ε: {learning.epsilon_at(episode, *schedule):.3f} | {episode / elapsed:6.1f} episodes/s")
+    finally:
+        log.close()
+
+    return Q, log
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Train the lift controller with several processes.")
+    parser.add_argument("--episodes", type=int, default=learning.episodes)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--sync-interval", type=int, default=10, help="episodes per worker between merges")
+    parser.add_argument("--seed", type=int, default=learning.seed)
+    parser.add_argument("--metrics", default="learning_metrics.csv", help="CSV file of the episode rewards")
+    parser.add_argument("--output", default="q_table.qtab")
+    args = parser.parse_args()
+
+    Q, _ = train_parallel(args.episodes, args.workers, args.sync_interval, args.seed, args.metrics)
+    Q.save(args.output)
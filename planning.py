@@ -0,0 +1,188 @@
+import time
+import numpy as np
+from Environment import batch_policy
+from Environment.encoding import encode_states
+from Environment.vector_environment import VectorEnvironment
+from q_table import QTable, NUMBER_OF_STATES, NUMBER_OF_ACTIONS
+import learning
+
+
+def estimate_model(transitions=2_000_000, lanes=1024, seed=learning.seed, steps=learning.steps_per_episode):
+    """
+    Estimate a transition and reward model over the simplified states of learning.simplify_state.
+    Many lifts are simulated at once with uniformly random allowed actions, and every observed transition between
+    simplified states is counted together with its reward (learning.effective_rewards).
+
+    Parameters
+    ----------
+    transitions : int
+        The number of simulated transitions.
+
+    lanes : int
+        The number of lifts simulated in parallel.
+
+    seed : int or None
+        The seed of the simulation and of the action selection.
+
+    steps : int
+        The episode length after which a lift is reset, as in the training.
+
+    Returns
+    -------
+    probabilities : np.ndarray
+        The estimated transition probabilities of shape (NUMBER_OF_STATES, NUMBER_OF_ACTIONS, NUMBER_OF_STATES).
+
+    rewards : np.ndarray
+        The mean reward of every state-action pair.
+
+    visits : np.ndarray
+        The number of observed transitions of every state-action pair.
+    """
+    env_seed, agent_seed = np.random.SeedSequence(seed).spawn(2)
+    venv = VectorEnvironment(lanes, episode_length=steps, seed=env_seed)
+    rng = np.random.default_rng(agent_seed)
+
+    pairs_count = NUMBER_OF_STATES * NUMBER_OF_ACTIONS
+    counts = np.zeros(pairs_count * NUMBER_OF_STATES, dtype=np.int64)
+    reward_sums = np.zeros(pairs_count)
+
+    states = venv.reset()
+
+    for _ in range(-(-transitions // lanes)):
+        masks = VectorEnvironment.get_available_actions(states)
+        actions = np.argmax(masks * rng.random(masks.shape), axis=1)
+        next_states, dones = venv.step(actions)
+
+        # Lanes which have been reset end in their last state before the reset
+        observed = next_states if not dones.any() else np.where(dones[:, None], venv.final_states, next_states)
+
+        pairs = QTable.state_indices(states) * NUMBER_OF_ACTIONS + actions
+        counts += np.bincount(pairs * NUMBER_OF_STATES + QTable.state_indices(observed), minlength=len(counts))
+        reward_sums += np.bincount(pairs, weights=learning.effective_rewards(states, actions, venv.delivered),
+                                   minlength=pairs_count)
+        states = next_states
+
+    counts = counts.reshape(NUMBER_OF_STATES, NUMBER_OF_ACTIONS, NUMBER_OF_STATES)
+    visits = counts.sum(axis=2)
+
+    probabilities = counts / np.maximum(visits, 1)[..., None]
+    rewards = reward_sums.reshape(NUMBER_OF_STATES, NUMBER_OF_ACTIONS) / np.maximum(visits, 1)
+
+    return probabilities, rewards, visits
+
+
+def value_iteration(probabilities, rewards, visits, gamma=learning.gamma, tolerance=1e-6, max_iterations=10000):
+    """
+    Solve the estimated model by value iteration.
+    Only observed state-action pairs take part in the maximisation, the others receive the lowest Q-value of the
+    table, so that choose_action never prefers them.
+
+    Parameters
+    ----------
+    probabilities : np.ndarray
+        The transition probabilities returned by estimate_model.
+
+    rewards : np.ndarray
+        The mean rewards returned by estimate_model.
+
+    visits : np.ndarray
+        The visit counts returned by estimate_model.
+
+    gamma : float
+        The discount factor.
+
+    tolerance : float
+        The iteration stops when no state value changes by more than this.
+
+    max_iterations : int
+        The maximum number of iterations.
+
+    Returns
+    -------
+    Q : QTable
+        The Q-values of the solution.
+
+    iterations : int
+        The number of iterations performed.
+    """
+    observed = visits > 0
+    reachable = observed.any(axis=1)
+    values = np.zeros(NUMBER_OF_STATES)
+
+    for iteration in range(1, max_iterations + 1):
+        q_values = rewards + gamma * probabilities @ values
+        new_values = np.where(reachable, np.where(observed, q_values, -np.inf).max(axis=1, initial=-np.inf), 0.0)
+
+        change = np.abs(new_values - values).max()
+        values = new_values
+
+        if change < tolerance:
+            break
+
+    q_values = rewards + gamma * probabilities @ values
+    q_values[~observed] = q_values[observed].min()
+
+    return QTable(q_values), iteration
+
+
+def evaluate(Q, episodes=256, seed=learning.seed, steps=learning.steps_per_episode):
+    """
+    Run the greedy policy of a Q-table and report the average episode reward.
+
+    Parameters
+    ----------
+    Q : QTable
+        The Q-table.
+
+    episodes : int
+        The number of episodes, all simulated at once.
+
+    seed : int or None
+        The seed of the environments and of the tie-breaking.
+
+    steps : int
+        The length of an episode.
+
+    Returns
+    -------
+    mean_reward : float
+        The average total reward of an episode.
+    """
+    env_seed, agent_seed = np.random.SeedSequence(seed).spawn(2)
+    venv = VectorEnvironment(episodes, seed=env_seed)
+    rng = np.random.default_rng(agent_seed)
+
+    states = venv.reset()
+    totals = np.zeros(episodes)
+
+    for _ in range(steps):
+        actions = batch_policy.greedy(Q, encode_states(states), rng)
+        next_states, _ = venv.step(actions)
+        totals += learning.effective_rewards(states, actions, venv.delivered)
+        states = next_states
+
+    return totals.mean()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compute a Q-table by value iteration on an estimated model.")
+    parser.add_argument("--transitions", type=int, default=2_000_000, help="simulated transitions for the model")
+    parser.add_argument("--lanes", type=int, default=1024, help="lifts simulated in parallel")
+    parser.add_argument("--gamma", type=float, default=learning.gamma)
+    parser.add_argument("--seed", type=int, default=learning.seed)
+    parser.add_argument("--output", default="q_table_planned.qtab")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    probabilities, rewards, visits = estimate_model(args.transitions, args.lanes, args.seed)
+    estimated = time.perf_counter()
+    Q, iterations = value_iteration(probabilities, rewards, visits, args.gamma)
+    solved = time.perf_counter()
+
+    print(f"Model: {np.count_nonzero(visits)} state-action pairs observed in {estimated - start:.1f} s")
+    print(f"Value iteration: {iterations} iterations in {solved - estimated:.2f} s")
+    print(f"Greedy policy: average episode reward {evaluate(Q):.1f}")
+
+    Q.save(args.output)
@@ -0,0 +1,459 @@
+import ast
+import os
+import struct
+import numpy as np
+from Environment.constants import ACTIONS, DIRECTIONS, DOORS, NUMBER_OF_FLOORS
+from Environment.encoding import DIRECTION_IDS, DOOR_IDS, encode_state
+from Environment.vector_environment import ACTION_MASK_TABLE, STATE_FLOOR, STATE_DIRECTION, STATE_DOOR, \
+    STATE_CABIN_BUTTONS, STATE_CALL_BUTTONS
+
+# Number of simplified states: floor × direction × door × (calls above, calls below, call on this floor)
+NUMBER_OF_STATES = NUMBER_OF_FLOORS * len(DIRECTIONS) * len(DOORS) * 8
+NUMBER_OF_ACTIONS = len(ACTIONS)
+
+# Lookup table to avoid list.index calls in the hot path
+ACTION_IDS = {action: i for i, action in enumerate(ACTIONS)}
+
+# Binary file format: a fixed 64 byte header, followed by the state-index table (int64, one key per state, sorted)
+# and the Q-values (float32, one row per key). Both arrays can be memory-mapped directly.
+FILE_MAGIC = b"QTAB"
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct("<4sHHII44s")
+FILE_HEADER_SIZE = 64
+
+# Kinds of keys in the state-index table
+KEYS_SIMPLIFIED = 0  # rows of QTable
+KEYS_FULL_STATE = 1  # full environment states encoded by Environment.encoding.encode_state
+
+# The kind of keys of a state in a text table, by the length of the state tuple
+STATE_KINDS = {5: KEYS_FULL_STATE, 6: KEYS_SIMPLIFIED}
+
+
+class QTable:
+    """
+    Dense Q-table over the simplified state space of learning.simplify_state.
+
+    Every simplified state (floor, direction, door, any_calls_above, any_calls_below, on_this_floor) is mapped to a
+    row of a contiguous float array, every action to the column given by its index in ACTIONS.
+    """
+
+    def __init__(self, values=None):
+        """
+        Creates a Q-table filled with zeros or with the given values.
+
+        Parameters
+        ----------
+        values : np.ndarray or None
+            An array of shape (NUMBER_OF_STATES, NUMBER_OF_ACTIONS) holding initial Q-values.
+        """
+        if values is None:
+            values = np.zeros((NUMBER_OF_STATES, NUMBER_OF_ACTIONS))
+
+        if values.shape != (NUMBER_OF_STATES, NUMBER_OF_ACTIONS):
+            raise ValueError(f"Expected Q-values of shape {(NUMBER_OF_STATES, NUMBER_OF_ACTIONS)}, got {values.shape}.")
+
+        self.values = values
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+    @staticmethod
+    def key_index(key):
+        """
+        Get the row of a simplified state as returned by learning.simplify_state.
+
+        Parameters
+        ----------
+        key : tuple
+            A simplified state.
+
+        Returns
+        -------
+        index : int
+            The row of the state in the table.
+        """
+        floor, direction, door, above, below, here = key
+        return (((floor * len(DIRECTIONS) + DIRECTION_IDS[direction]) * len(DOORS) + DOOR_IDS[door]) * 8
+                + 4 * bool(above) + 2 * bool(below) + bool(here))
+
+    @staticmethod
+    def state_index(state):
+        """
+        Get the row of a full environment state, without building the simplified tuple first.
+
+        Parameters
+        ----------
+        state : tuple
+            A state of the environment.
+
+        Returns
+        -------
+        index : int
+            The row of the simplified state in the table.
+        """
+        floor, direction, door, cabin_buttons, call_buttons = state
+
+        above = any(call_buttons[floor + 1:]) or any(cabin_buttons[floor + 1:])
+        below = any(call_buttons[:floor]) or any(cabin_buttons[:floor])
+        here = call_buttons[floor] or cabin_buttons[floor]
+
+        return (((floor * len(DIRECTIONS) + DIRECTION_IDS[direction]) * len(DOORS) + DOOR_IDS[door]) * 8
+                + 4 * above + 2 * below + here)
+
+    @staticmethod
+    def state_indices(states):
+        """
+        Get the rows for a batch of states of the VectorEnvironment.
+
+        Parameters
+        ----------
+        states : np.ndarray
+            An integer array of shape (N, 5) as returned by VectorEnvironment.step.
+
+        Returns
+        -------
+        indices : np.ndarray
+            The rows of the simplified states in the table.
+        """
+        floor = states[:, STATE_FLOOR]
+        buttons = states[:, STATE_CABIN_BUTTONS] | states[:, STATE_CALL_BUTTONS]
+
+        above = (buttons >> (floor + 1)) != 0
+        below = (buttons & ((1 << floor) - 1)) != 0
+        here = ((buttons >> floor) & 1) != 0
+
+        return (((floor * len(DIRECTIONS) + states[:, STATE_DIRECTION]) * len(DOORS) + states[:, STATE_DOOR]) * 8
+                + 4 * above + 2 * below + here)
+
+    @staticmethod
+    def action_mask(state):
+        """
+        Get the allowed actions of a full environment state as a boolean mask over ACTIONS.
+
+        Parameters
+        ----------
+        state : tuple
+            A state of the environment.
+
+        Returns
+        -------
+        mask : np.ndarray
+            A boolean array of length NUMBER_OF_ACTIONS.
+        """
+        return ACTION_MASK_TABLE[state[0], DIRECTION_IDS[state[1]], DOOR_IDS[state[2]]]
+
+    def best_actions(self, index, mask):
+        """
+        Get all allowed actions with the highest Q-value in a state.
+
+        Parameters
+        ----------
+        index : int
+            The row of the state.
+
+        mask : np.ndarray
+            A boolean mask of the allowed actions.
+
+        Returns
+        -------
+        actions : np.ndarray
+            The indices of the best actions in ascending order.
+        """
+        q_values = self.values[index]
+        best_value = q_values[mask].max()
+        return np.flatnonzero(mask & (q_values == best_value))
+
+    def greedy(self, indices, masks, rng):
+        """
+        Select the best allowed action for a batch of states. Ties are broken at random.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            The rows of the states.
+
+        masks : np.ndarray
+            A boolean array of shape (N, NUMBER_OF_ACTIONS) with the allowed actions.
+
+        rng : np.random.Generator
+            The random source used to break ties.
+
+        Returns
+        -------
+        actions : np.ndarray
+            The indices of the chosen actions.
+        """
+        q_values = np.where(masks, self.values[indices], -np.inf)
+        best = q_values == q_values.max(axis=1, keepdims=True)
+        return np.argmax(best * rng.random(best.shape), axis=1)
+
+    def update(self, index, action, reward, next_index, alpha, gamma):
+        """
+        Apply a single Q-learning update.
+
+        Parameters
+        ----------
+        index : int
+            The row of the state in which the action was taken.
+
+        action : int
+            The index of the action.
+
+        reward : float
+            The observed reward.
+
+        next_index : int
+            The row of the following state.
+
+        alpha : float
+            The learning rate.
+
+        gamma : float
+            The discount factor.
+        """
+        current_q = self.values[index, action]
+        next_max = self.values[next_index].max()
+        self.values[index, action] = current_q + alpha * (reward + gamma * next_max - current_q)
+
+    def update_batch(self, indices, actions, rewards, next_indices, alpha, gamma):
+        """
+        Apply Q-learning updates for a batch of transitions.
+        All targets are computed from the values before the call. If the same state-action pair occurs several
+        times, the mean of its TD errors is applied once, so that the step size does not grow with the batch.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            The rows of the states in which the actions were taken.
+
+        actions : np.ndarray
+            The indices of the actions.
+
+        rewards : np.ndarray
+            The observed rewards.
+
+        next_indices : np.ndarray
+            The rows of the following states.
+
+        alpha : float
+            The learning rate.
+
+        gamma : float
+            The discount factor.
+        """
+        errors = rewards + gamma * self.values[next_indices].max(axis=1) - self.values[indices, actions]
+        pairs = indices * NUMBER_OF_ACTIONS + actions
+
+        counts = np.bincount(pairs, minlength=self.values.size)
+        sums = np.bincount(pairs, weights=errors, minlength=self.values.size)
+        visited = np.flatnonzero(counts)
+
+        rows, columns = np.divmod(visited, NUMBER_OF_ACTIONS)
+        self.values[rows, columns] += alpha * sums[visited] / counts[visited]
+
+    def save(self, path):
+        """
+        Write the table in the binary Q-table format.
+
+        Parameters
+        ----------
+        path : str or Path
+            The output file.
+        """
+        save_table(path, np.arange(NUMBER_OF_STATES), self.values, KEYS_SIMPLIFIED)
+
+    @classmethod
+    def load(cls, path, mode="r"):
+        """
+        Memory-map a Q-table written by QTable.save.
+
+        Parameters
+        ----------
+        path : str or Path
+            The input file.
+
+        mode : str
+            The np.memmap mode, "r" shares one read-only copy between processes, "c" allows local updates.
+
+        Returns
+        -------
+        table : QTable
+            A table backed by the mapped file.
+        """
+        kind, keys, values = load_table(path, mode)
+
+        if kind != KEYS_SIMPLIFIED or not np.array_equal(keys, np.arange(NUMBER_OF_STATES)):
+            raise ValueError(f"{path} does not contain a Q-table over the simplified states.")
+
+        return cls(values)
+
+
+def save_table(path, keys, values, kind):
+    """
+    Write keys and Q-values in the binary Q-table format.
+    The file is written to a temporary location first and moved into place, so readers never see partial files.
+
+    Parameters
+    ----------
+    path : str or Path
+        The output file.
+
+    keys : np.ndarray
+        The state keys, one per row of values.
+
+    values : np.ndarray
+        The Q-values of shape (len(keys), NUMBER_OF_ACTIONS).
+
+    kind : int
+        KEYS_SIMPLIFIED or KEYS_FULL_STATE.
+    """
+    keys = np.asarray(keys, dtype="<i8")
+    values = np.asarray(values, dtype="<f4")
+
+    # Keys are stored sorted to allow lookups by binary search
+    order = np.argsort(keys, kind="stable")
+    header = FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, kind, len(keys), values.shape[1],
+                              ",".join(ACTIONS).encode("ascii"))
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header.ljust(FILE_HEADER_SIZE, b"\0"))
+        f.write(keys[order].tobytes())
+        f.write(values[order].tobytes())
+
+    os.replace(tmp_path, path)
+
+
+def load_table(path, mode="r"):
+    """
+    Memory-map a file in the binary Q-table format.
+
+    Parameters
+    ----------
+    path : str or Path
+        The input file.
+
+    mode : str
+        The np.memmap mode.
+
+    Returns
+    -------
+    kind : int
+        KEYS_SIMPLIFIED or KEYS_FULL_STATE.
+
+    keys : np.ndarray
+        The sorted state-index table.
+
+    values : np.ndarray
+        The Q-values, one row per key.
+    """
+    with open(path, "rb") as f:
+        magic, version, kind, num_states, num_actions, actions = FILE_HEADER.unpack(f.read(FILE_HEADER.size))
+
+    if magic != FILE_MAGIC:
+        raise ValueError(f"{path} is not a Q-table file.")
+
+    if version != FILE_VERSION:
+        raise ValueError(f"{path} has version {version}, only version {FILE_VERSION} is supported.")
+
+    if actions.rstrip(b"\0").decode("ascii").split(",") != ACTIONS:
+        raise ValueError(f"{path} was written for different actions.")
+
+    keys = np.memmap(path, dtype="<i8", mode="r", offset=FILE_HEADER_SIZE, shape=(num_states,))
+    values = np.memmap(path, dtype="<f4", mode=mode, offset=FILE_HEADER_SIZE + keys.nbytes,
+                       shape=(num_states, num_actions))
+
+    return kind, keys, values
+
+
+def lookup(keys, values, key):
+    """
+    Find the Q-values of a key in a loaded table.
+
+    Parameters
+    ----------
+    keys : np.ndarray
+        The sorted state-index table.
+
+    values : np.ndarray
+        The Q-values.
+
+    key : int
+        The key to look up, e.g. from encode_state.
+
+    Returns
+    -------
+    q_values : np.ndarray or None
+        The Q-values of the key, None if the key is not in the table.
+    """
+    i = np.searchsorted(keys, key)
+
+    if i == len(keys) or keys[i] != key:
+        return None
+
+    return values[i]
+
+
+def convert_text_table(text_path, path):
+    """
+    Convert a pretty-printed Q-table (blocks of "State: (...)" followed by one "action: value" line per action)
+    into the binary Q-table format. All states have to be either full states or simplified states.
+
+    Parameters
+    ----------
+    text_path : str or Path
+        The text file, e.g. q_table.txt.
+
+    path : str or Path
+        The output file.
+
+    Returns
+    -------
+    num_states : int
+        The number of converted states.
+    """
+    keys = []
+    rows = []
+    kind = None
+
+    with open(text_path) as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+
+            if line.startswith("State:"):
+                state = ast.literal_eval(line[len("State:"):].strip())
+                state_kind = STATE_KINDS.get(len(state))
+
+                if state_kind is None:
+                    raise ValueError(f"{text_path}:{number}: expected a full state (5 elements) or a simplified "
+                                     f"state (6 elements), got {state}.")
+
+                if kind is not None and state_kind != kind:
+                    raise ValueError(f"{text_path}:{number}: {state} is a different kind of state than the states "
+                                     f"before, a table cannot mix full and simplified states.")
+
+                kind = state_kind
+                keys.append(encode_state(state) if kind == KEYS_FULL_STATE else QTable.key_index(state))
+                rows.append(np.zeros(NUMBER_OF_ACTIONS))
+
+            elif line:
+                action, value = line.split(":")
+                rows[-1][ACTION_IDS[action.strip()]] = float(value)
+
+    if not keys:
+        raise ValueError(f"{text_path} does not contain any states.")
+
+    save_table(path, keys, np.array(rows).reshape(-1, NUMBER_OF_ACTIONS), kind)
+
+    return len(keys)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Convert a text Q-table into the binary Q-table format.")
+    parser.add_argument("text_path", nargs="?", default="q_table.txt")
+    parser.add_argument("path", nargs="?", default="q_table_full.qtab")
+    args = parser.parse_args()
+
+    print(f"Converted {convert_text_table(args.text_path, args.path)} states into {args.path}")
@@ -0,0 +1,220 @@
+import itertools
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from checkpoint import load_checkpoint
+from q_table import QTable
+import learning
+import planning
+
+# Search space used without --space: every hyperparameter of learning.hyperparameters with its candidate values
+DEFAULT_SPACE = {
+    "alpha": [0.05, 0.1, 0.2],
+    "gamma": [0.8, 0.9, 0.95],
+    "epsilon": [0.1, 0.3],
+    "epsilon_decay": [0.99, 0.995, 0.999],
+}
+
+
+def configurations(space, samples=None, seed=learning.seed):
+    """
+    Enumerate the grid of a search space.
+
+    Parameters
+    ----------
+    space : dict
+        The candidate values of every hyperparameter, e.g. {"alpha": [0.05, 0.1], "gamma": [0.9, 0.95]}.
+
+    samples : int or None
+        Draw this many configurations of the grid at random (without repetition), None uses the whole grid.
+
+    seed : int or None
+        The seed of the sampling.
+
+    Returns
+    -------
+    configs : list
+        One dict of hyperparameters per configuration.
+    """
+    # Raises a ValueError for names which are not hyperparameters of learning.py
+    learning.hyperparameters(dict.fromkeys(space))
+    names = list(space)
+    configs = [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+    if samples is not None and samples < len(configs):
+        chosen = np.random.default_rng(seed).choice(len(configs), samples, replace=False)
+        configs = [configs[i] for i in sorted(chosen)]
+
+    return configs
+
+
+def run_trial(params, episodes, resume, checkpoint, seed, eval_episodes, eval_seed):
+    """
+    Worker task: train a configuration up to a number of episodes and evaluate its greedy policy.
+
+    The training continues from the checkpoint of the previous rung, so a configuration which is promoted only trains
+    the additional episodes. All configurations use the same training seed and are evaluated on the same episodes.
+
+    Parameters
+    ----------
+    params : dict
+        The hyperparameters, see learning.hyperparameters.
+
+    episodes : int
+        The total number of training episodes after this trial.
+
+    resume : bool
+        Continue from the checkpoint instead of starting a new table.
+
+    checkpoint : str
+        The checkpoint file of the configuration.
+
+    seed : int
+        The seed of the training.
+
+    eval_episodes : int
+        The number of evaluation episodes.
+
+    eval_seed : int
+        The seed of the evaluation episodes.
+
+    Returns
+    -------
+    score : float
+        The average reward of the greedy policy (planning.evaluate), over episodes of the trained length.
+
+    moving_avg : float
+        The moving average of the training rewards.
+
+    seconds : float
+        The duration of the trial.
+    """
+    start = time.perf_counter()
+    Q, log = learning.train(episodes, seed, checkpoint=checkpoint, checkpoint_interval=episodes, resume=resume,
+                            params=params, verbose=False)
+
+    # Configurations with a different episode length are scored on episodes of their own length
+    steps = learning.hyperparameters(params)["steps_per_episode"]
+    return planning.evaluate(Q, eval_episodes, eval_seed, steps), log.moving_avg(), time.perf_counter() - start
+
+
+def successive_halving(configs, directory, min_episodes=100, max_episodes=learning.episodes, eta=3, workers=4,
+                       seed=learning.seed, eval_episodes=64, eval_seed=learning.seed + 1):
+    """
+    Successive halving over a list of configurations with a process pool.
+
+    All configurations are trained for min_episodes and evaluated. The best 1/eta of them are promoted and trained
+    eta times as many episodes, until max_episodes is reached or a single configuration is left. Hence most of the
+    training episodes are spent on the promising configurations.
+
+    Parameters
+    ----------
+    configs : list
+        The hyperparameters of the configurations, see configurations.
+
+    directory : str or Path
+        The directory of the checkpoints, one per configuration.
+
+    min_episodes : int
+        The training episodes of the first rung.
+
+    max_episodes : int
+        The maximal training episodes of a configuration.
+
+    eta : int
+        The factor by which the configurations are reduced and the episodes are increased per rung.
+
+    workers : int
+        The number of worker processes.
+
+    seed : int
+        The training seed shared by all configurations.
+
+    eval_episodes : int
+        The number of evaluation episodes.
+
+    eval_seed : int
+        The seed of the evaluation episodes shared by all configurations.
+
+    Returns
+    -------
+    results : list
+        One dict per configuration with its hyperparameters, trained episodes, score, moving average of the training
+        rewards, checkpoint and training time, ranked by rung reached and score.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    results = [{"config": i, "params": params, "episodes": 0, "score": -np.inf, "moving_avg": np.nan,
+                "checkpoint": str(directory / f"config_{i:03d}.ckpt"), "seconds": 0.0}
+               for i, params in enumerate(configs)]
+    alive = list(range(len(configs)))
+    episodes = min(min_episodes, max_episodes)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            futures = {i: pool.submit(run_trial, results[i]["params"], episodes, results[i]["episodes"] > 0,
+                                      results[i]["checkpoint"], seed, eval_episodes, eval_seed) for i in alive}
+
+            for i, future in futures.items():
+                score, moving_avg, seconds = future.result()
+                results[i].update(episodes=episodes, score=score, moving_avg=moving_avg,
+                                  seconds=results[i]["seconds"] + seconds)
+
+            alive.sort(key=lambda i: -results[i]["score"])
+            print(f"Rung {episodes:5d} episodes | {len(alive):3d} configurations | "
+                  f"best score {results[alive[0]]['score']:7.1f} ({results[alive[0]]['params']})")
+
+            if episodes >= max_episodes or len(alive) == 1:
+                break
+
+            alive = alive[:max(1, len(alive) // eta)]
+            episodes = min(episodes * eta, max_episodes)
+
+    return sorted(results, key=lambda result: (-result["episodes"], -result["score"]))
+
+
+if __name__ == "__main__":
+    import argparse
+    import os
+
+    parser = argparse.ArgumentParser(description="Hyperparameter search for learning.py with successive halving.")
+    parser.add_argument("--space", help="search space as JSON object or path of a JSON file (default: DEFAULT_SPACE)")
+    parser.add_argument("--samples", type=int, default=None, help="random configurations of the grid (default: all)")
+    parser.add_argument("--min-episodes", type=int, default=100, help="training episodes of the first rung")
+    parser.add_argument("--max-episodes", type=int, default=learning.episodes)
+    parser.add_argument("--eta", type=int, default=3, help="reduction factor per rung")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--eval-episodes", type=int, default=64)
+    parser.add_argument("--seed", type=int, default=learning.seed)
+    parser.add_argument("--directory", default="sweep", help="directory of the checkpoints and the results")
+    parser.add_argument("--output", default="q_table_sweep.qtab", help="Q-table of the best configuration")
+    args = parser.parse_args()
+
+    if args.space is None:
+        space = DEFAULT_SPACE
+    elif os.path.exists(args.space):
+        with open(args.space) as f:
+            space = json.load(f)
+    else:
+        space = json.loads(args.space)
+
+    start = time.perf_counter()
+    configs = configurations(space, args.samples, args.seed)
+    results = successive_halving(configs, args.directory, args.min_episodes, args.max_episodes, args.eta,
+                                 args.workers, args.seed, args.eval_episodes, args.seed + 1)
+
+    names = list(space)
+    print(f"{'rank':>4s} {'episodes':>8s} {'score':>8s} {'train avg':>9s}  " + "  ".join(f"{n:>13s}" for n in names))
+    for rank, result in enumerate(results, 1):
+        print(f"{rank:4d} {result['episodes']:8d} {result['score']:8.1f} {result['moving_avg']:9.1f}  " +
+              "  ".join(f"{result['params'][n]:13g}" for n in names))
+
+    with open(Path(args.directory) / "results.json", "w") as f:
+        json.dump(results, f, indent=2)
+
+    best = results[0]
+    QTable(load_checkpoint(best["checkpoint"])["values"]).save(args.output)
+    print(f"Best configuration {best['params']} saved to {args.output} ({time.perf_counter() - start:.1f} s)")
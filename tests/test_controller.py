@@ -0,0 +1,101 @@
+import argparse
+import asyncio
+import json
+import time
+
+import pytest
+
+from Environment import batch_policy
+from Environment.constants import *
+from Environment.encoding import encode_state
+from Environment.tracing import Tracer
+from controller import ControllerServer, POLICIES, load_decide
+
+STATE = [3, DIRECTION_NONE, DOOR_CLOSED, [False] * NUMBER_OF_FLOORS, [True] + [False] * (NUMBER_OF_FLOORS - 1)]
+
+
+def test_exact_percentiles_of_kept_timings():
+  tracer = Tracer(samples={"decision": 100})
+
+  for microseconds in range(1, 301):
+    tracer.record("decision", time.perf_counter() - microseconds * 1e-6)
+
+  phase = tracer.summary()["phases"]["decision"]
+
+  # Only the last 100 timings (201..300 us) are kept
+  assert phase["samples"] == 100 and phase["calls"] == 300
+  assert 245 < phase["p50_us"] < 260
+  assert 295 < phase["p99_us"] < 310
+
+
+def test_failing_decisions_are_answered_with_the_fallback(tmp_path):
+  calls = []
+
+  def decide(codes):
+    calls.append(len(codes))
+    if len(calls) == 1:
+      raise RuntimeError("broken policy")
+    return batch_policy.up(codes)
+
+  async def run():
+    server = ControllerServer(decide, deadline=1.0)
+    await server.start(str(tmp_path / "controller.sock"))
+    reader, writer = await asyncio.open_unix_connection(str(tmp_path / "controller.sock"))
+    answers = []
+
+    for request_id in range(3):
+      writer.write(json.dumps({"id": request_id, "type": "state", "state": STATE}).encode() + b"\n")
+      answers.append(json.loads(await reader.readline()))
+
+    metrics = server.metrics()
+    writer.close()
+    await server.close()
+    return answers, metrics
+
+  answers, metrics = asyncio.run(run())
+
+  assert answers[0]["action"] == ACTION_NOOP and answers[0]["fallback"]
+  assert [answer["action"] for answer in answers[1:]] == [ACTION_UP, ACTION_UP]
+  assert not any(answer.get("fallback") for answer in answers[1:])
+  assert metrics["decisions"] == 3 and metrics["failures"] == 1 and metrics["fallbacks"] == 1
+
+
+def test_late_decisions_are_answered_with_the_fallback(tmp_path):
+  async def run():
+    server = ControllerServer(batch_policy.up)
+    await server.start(str(tmp_path / "controller.sock"))
+    reader, writer = await asyncio.open_unix_connection(str(tmp_path / "controller.sock"))
+
+    writer.write(json.dumps({"id": 0, "type": "state", "state": STATE, "deadline_ms": 0}).encode() + b"\n")
+    answer = json.loads(await reader.readline())
+
+    metrics = server.metrics()
+    writer.close()
+    await server.close()
+    return answer, metrics
+
+  answer, metrics = asyncio.run(run())
+
+  # A timeout is not a failure of the decision function
+  assert answer["action"] == ACTION_NOOP and answer["fallback"]
+  assert metrics["fallbacks"] == 1 and metrics["failures"] == 0
+
+
+def test_policies_of_the_command_line():
+  state = tuple(STATE[:3]) + tuple(map(tuple, STATE[3:]))
+  codes = [encode_state(state)]
+  actions = {name: ACTIONS[list(load_decide(argparse.Namespace(policy=name, q_table=None, seed=0))(codes))[0]]
+             for name in POLICIES}
+
+  # Floor 0 calls while the lift waits on floor 3
+  assert actions["up"] == actions["up-function"] == ACTION_UP
+  assert actions["alternate"] == actions["alternate-function"]
+  assert actions["baseline"] == ACTION_DOWN
+
+
+def test_q_table_policy_needs_a_file():
+  with pytest.raises(ValueError, match="--q-table"):
+    load_decide(argparse.Namespace(policy="q-table", q_table=None, seed=0))
+
+  with pytest.raises(ValueError, match="--q-table"):
+    load_decide(argparse.Namespace(policy="up", q_table="q_table.qtab", seed=0))
@@ -0,0 +1,51 @@
+import numpy as np
+
+from Environment.constants import *
+from Environment.encoding import NUMBER_OF_CODES, encode_state, decode_state, encode_states, decode_states, \
+  action_masks, available_actions, state_actions, simplified_indices
+from Environment.environment import Environment
+from Environment.vector_environment import VectorEnvironment
+from q_table import QTable
+
+
+def random_states(count, seed=0):
+  rng = np.random.default_rng(seed)
+  return [(int(rng.integers(NUMBER_OF_FLOORS)), DIRECTIONS[rng.integers(len(DIRECTIONS))],
+           DOORS[rng.integers(len(DOORS))], BUTTON_TUPLES[rng.integers(1 << NUMBER_OF_FLOORS)],
+           BUTTON_TUPLES[rng.integers(1 << NUMBER_OF_FLOORS)]) for _ in range(count)]
+
+
+def test_round_trip_of_all_codes():
+  codes = np.arange(NUMBER_OF_CODES)
+
+  np.testing.assert_array_equal(encode_states(decode_states(codes)), codes)
+
+  for code in codes[::97]:
+    assert encode_state(decode_state(code)) == code
+
+
+def test_codes_agree_with_the_environment():
+  for state in random_states(500):
+    code = encode_state(state)
+
+    assert decode_state(code) == state
+    assert set(available_actions(code)) == set(Environment.get_available_actions(state))
+    assert state_actions(state) == available_actions(code)
+    assert [ACTIONS[i] for i in np.flatnonzero(action_masks(code))] == list(available_actions(code))
+    assert simplified_indices(code) == QTable.state_index(state)
+
+
+def test_codes_of_vector_environment_states():
+  venv = VectorEnvironment(64, seed=2)
+  rng = np.random.default_rng(2)
+
+  for _ in range(50):
+    states = venv.get_states()
+    codes = encode_states(states)
+
+    np.testing.assert_array_equal(decode_states(codes), states)
+    np.testing.assert_array_equal(simplified_indices(codes), QTable.state_indices(states))
+
+    masks = action_masks(codes)
+    venv.step(np.argmax(masks * rng.random(masks.shape), axis=1))
+
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from Environment.environment import Environment
+from evaluation import evaluate, paired, run_episodes, load_policy
+
+
+def test_paired_differences_use_the_common_episodes():
+  np.testing.assert_array_equal(paired([3.0, 5.0], [1.0, 1.0, 2.0]), [2.0, 4.0])
+
+
+def test_policies_stop_on_paired_differences():
+  results = evaluate(["up", "alternate"], workers=2, batch=4, min_episodes=8, max_episodes=64, precision=0.5,
+                     wait_precision=0.5, steps=40, seed=3)
+
+  up, alternate = results["up"], results["alternate"]
+  assert "reward_diff" not in up
+  assert alternate["episodes"] == up["episodes"]
+  assert alternate["reward_diff"] == pytest.approx(alternate["reward"] - up["reward"])
+  assert alternate["reward_diff_ci"] <= max(0.5 * abs(up["reward"]), 1.0) or alternate["episodes"] == 64
+
+
+def test_reference_has_to_be_evaluated():
+  with pytest.raises(ValueError):
+    evaluate(["up"], reference="alternate")
+
+
+def test_same_seeds_give_the_same_episodes():
+  seeds = np.random.SeedSequence(5).spawn(3)
+  rewards, waits = run_episodes("alternate", seeds, 50)
+  again, waits_again = run_episodes("alternate", seeds, 50)
+
+  assert [seed.n_children_spawned for seed in seeds] == [0, 0, 0]
+  np.testing.assert_array_equal(rewards, again)
+  np.testing.assert_array_equal(waits, waits_again)
+
+
+def test_floors_finish_policies_without_relative_precision():
+  results = evaluate(["up", "alternate"], workers=2, batch=4, min_episodes=8, max_episodes=64, precision=0.0,
+                     wait_precision=0.0, steps=40, seed=3, reward_floor=1e6, wait_floor=1e6)
+
+  assert results["alternate"]["episodes"] == 8
+
+
+@pytest.mark.parametrize("name", ["baseline", "q_table.qtab"])
+def test_idle_jumps_play_the_same_episodes(name):
+  seeds = np.random.SeedSequence(7).spawn(4)
+  rewards, waits = run_episodes(name, seeds, 400, jump=True)
+  stepped_rewards, stepped_waits = run_episodes(name, np.random.SeedSequence(7).spawn(4), 400, jump=False)
+
+  np.testing.assert_allclose(rewards, stepped_rewards)
+  np.testing.assert_array_equal(waits, stepped_waits)
+
+
+def test_policies_see_the_same_arrivals():
+  arrivals = []
+
+  for name in ["up", "alternate", "baseline"]:
+    choose, _ = load_policy(name)
+    env = Environment(render_mode="none", seed=np.random.SeedSequence(6))
+    rng = np.random.default_rng(0)
+    state = env.reset()
+    spawned = [env.person_counter]
+
+    for _ in range(300):
+      state = env.step(choose(state, rng))
+      spawned.append(env.person_counter)
+
+    arrivals.append(spawned)
+
+  assert arrivals[0] == arrivals[1] == arrivals[2]
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from Environment.constants import *
+from Environment.environment import Environment
+from Environment.traffic import OFFICE_DAY, DAY_LENGTH
+from demonstration import baseline
+
+TRIALS = 2000
+
+# Critical value of the chi-square distribution with 6 degrees of freedom at p=0.001
+CHI_SQUARE_CRITICAL = 22.46
+
+# Schedules with the start time of the idle period and the ticks to skip at most. Under OFFICE_DAY, the idle period
+# starts 30 ticks before the end of a quiet night period and runs into the rising morning traffic.
+SCHEDULES = {
+  "constant": (None, 0, 40),
+  "office_day": (OFFICE_DAY, DAY_LENGTH * 25 // 96 - 30, 150),
+}
+
+
+def idle_snapshot(traffic, start_time, arrival_block=None):
+  # Search a seed whose reset leaves the building empty
+  for seed in range(100):
+    env = Environment(render_mode="none", seed=seed, traffic=traffic, start_time=start_time,
+                      arrival_block=arrival_block)
+
+    if env.is_idle():
+      return env, env.snapshot()
+
+  raise RuntimeError("No idle reset found.")
+
+
+def waiting_per_floor(env):
+  return [len(env.buffer_floor[floor]) for floor in range(NUMBER_OF_FLOORS)]
+
+
+def idle_periods(traffic, start_time, max_ticks, jump):
+  env, snapshot = idle_snapshot(traffic, start_time)
+  ticks = np.zeros(TRIALS)
+  spawned = np.zeros((TRIALS, NUMBER_OF_FLOORS))
+
+  for trial in range(TRIALS):
+    # Every trial starts in the same idle situation, but draws new random numbers
+    env.restore(snapshot, rng=False)
+
+    if jump:
+      ticks[trial] = env.advance_idle(max_ticks)
+    else:
+      while env.active_persons == 0 and ticks[trial] < max_ticks:
+        env.step(ACTION_NOOP)
+        ticks[trial] += 1
+
+    assert env.time == ticks[trial]
+    spawned[trial] = waiting_per_floor(env)
+
+  return ticks, spawned
+
+
+def assert_same_mean(a, b):
+  error = np.sqrt(a.var(ddof=1) / len(a) + b.var(ddof=1) / len(b))
+  assert abs(a.mean() - b.mean()) < 4 * error
+
+
+def assert_same_distribution(a, b):
+  # Chi-square test of the 2×7 contingency table of two histograms
+  table = np.array([a, b])
+  expected = table.sum(axis=1, keepdims=True) * table.sum(axis=0) / table.sum()
+  assert ((table - expected) ** 2 / expected).sum() < CHI_SQUARE_CRITICAL
+
+
+def histogram(ticks, max_ticks):
+  # Bins 1, 2-3, 4-7, 8-15, 16-31, 32 up to max_ticks - 1 and max_ticks (nobody appeared)
+  return np.bincount(np.digitize(ticks, [2, 4, 8, 16, 32, max_ticks]), minlength=7)
+
+
+@pytest.mark.parametrize("schedule", SCHEDULES)
+def test_idle_jump_matches_noop_steps(schedule):
+  traffic, start_time, max_ticks = SCHEDULES[schedule]
+
+  stepped_ticks, stepped = idle_periods(traffic, start_time, max_ticks, jump=False)
+  jumped_ticks, jumped = idle_periods(traffic, start_time, max_ticks, jump=True)
+
+  # Skipped ticks and number of new persons
+  assert_same_mean(stepped_ticks, jumped_ticks)
+  assert_same_mean(stepped.sum(axis=1), jumped.sum(axis=1))
+  assert_same_distribution(histogram(stepped_ticks, max_ticks), histogram(jumped_ticks, max_ticks))
+
+  # Start floors of the new persons
+  assert_same_distribution(stepped.sum(axis=0), jumped.sum(axis=0))
+
+
+@pytest.mark.parametrize("traffic", [None, OFFICE_DAY])
+def test_idle_jump_with_pre_drawn_arrivals_is_exact(traffic):
+  env, snapshot = idle_snapshot(traffic, DAY_LENGTH // 4, arrival_block=64)
+  stepped, _ = idle_snapshot(traffic, DAY_LENGTH // 4, arrival_block=64)
+
+  for _ in range(20):
+    ticks = env.advance_idle(500)
+    skipped = 0
+
+    while skipped < ticks:
+      stepped.step(ACTION_NOOP)
+      skipped += 1
+
+    assert stepped.time == env.time
+    assert waiting_per_floor(stepped) == waiting_per_floor(env)
+    assert stepped.rng.bit_generator.state == env.rng.bit_generator.state
+
+    # Serve the new persons until the lift is idle again
+    while not env.is_idle():
+      action = baseline(env.state)
+      assert stepped.step(action) == env.step(action)
@@ -0,0 +1,28 @@
+import subprocess
+import sys
+
+from benchmarks.run import IMPORT_BUDGET, import_time
+
+OPTIONAL_DEPENDENCIES = ["pygame", "imageio", "matplotlib", "tqdm"]
+
+
+def test_import_is_lazy_and_within_budget():
+  seconds, loaded = import_time("import Environment", repeat=3)
+
+  assert not loaded, f"import Environment loaded {loaded}"
+  assert seconds <= IMPORT_BUDGET
+
+
+def test_star_import_skips_optional_dependencies():
+  seconds, loaded = import_time("from Environment import *", repeat=3)
+
+  assert not set(loaded) & set(OPTIONAL_DEPENDENCIES), f"from Environment import * loaded {loaded}"
+  assert seconds <= IMPORT_BUDGET
+
+
+def test_star_import_provides_the_public_names():
+  code = ("from Environment import *; "
+          "print(Environment.__name__, policy.__name__, ACTION_NOOP, 'np' in dir(), 'BUTTON_MASKS' in dir())")
+  output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+  assert output.stdout.split() == ["Environment", "Environment.policy", "noop", "False", "False"]
@@ -0,0 +1,99 @@
+import numpy as np
+import pytest
+
+import learning
+import metrics
+from parallel_learning import merge, train_parallel
+from q_table import QTable
+
+PARAMS = {"steps_per_episode": 60}
+
+
+def train(episodes, tmp_path, name, **kwargs):
+  kwargs.setdefault("metrics", tmp_path / f"{name}.csv")
+  return learning.train(episodes, seed=4, checkpoint=tmp_path / f"{name}.ckpt", checkpoint_interval=5, params=PARAMS,
+                        verbose=False, **kwargs)
+
+
+def test_resumed_training_is_bit_exact(tmp_path):
+  Q, _ = train(15, tmp_path, "full")
+
+  train(5, tmp_path, "interrupted")
+  resumed, _ = train(15, tmp_path, "interrupted", resume=True)
+
+  assert resumed.values.tobytes() == Q.values.tobytes()
+  assert (tmp_path / "interrupted.csv").read_text() == (tmp_path / "full.csv").read_text()
+
+
+def test_resume_needs_a_checkpoint():
+  with pytest.raises(ValueError, match="checkpoint"):
+    learning.train(5, resume=True, checkpoint=None, verbose=False)
+
+
+def test_resume_needs_the_metrics_log_of_the_checkpoint(tmp_path):
+  train(5, tmp_path, "run")
+
+  with pytest.raises(ValueError, match="run.csv"):
+    train(10, tmp_path, "run", resume=True, metrics=tmp_path / "other.csv")
+
+  (tmp_path / "run.csv").unlink()
+
+  with pytest.raises(ValueError, match="cannot be continued"):
+    train(10, tmp_path, "run", resume=True)
+
+
+def test_batched_training_is_reproducible(tmp_path):
+  Q, log = learning.train_batched(10, lanes=4, seed=4, metrics=tmp_path / "a.csv", params=PARAMS, verbose=False)
+  again, _ = learning.train_batched(10, lanes=4, seed=4, metrics=tmp_path / "b.csv", params=PARAMS, verbose=False)
+
+  assert Q.values.any()
+  assert Q.values.tobytes() == again.values.tobytes()
+  assert (tmp_path / "a.csv").read_text() == (tmp_path / "b.csv").read_text()
+  assert log.episodes == 10
+
+
+def test_parallel_training_is_reproducible(tmp_path):
+  Q, log = train_parallel(8, workers=2, sync_interval=2, seed=4, metrics=tmp_path / "a.csv", params=PARAMS,
+                          verbose=False)
+  again, _ = train_parallel(8, workers=2, sync_interval=2, seed=4, metrics=tmp_path / "b.csv", params=PARAMS,
+                            verbose=False)
+
+  assert Q.values.any()
+  assert Q.values.tobytes() == again.values.tobytes()
+  assert (tmp_path / "a.csv").read_text() == (tmp_path / "b.csv").read_text()
+  assert log.episodes == 8
+
+
+def test_merge_averages_over_the_visiting_workers():
+  Q = QTable()
+  changed, unchanged = np.zeros_like(Q.values), np.zeros_like(Q.values)
+  changed_visits, unchanged_visits = np.zeros(Q.values.shape, dtype=np.int32), np.zeros(Q.values.shape, dtype=np.int32)
+
+  # Both workers updated the pair, but the updates of the second one cancelled out
+  changed[3, 1] = 2.0
+  changed_visits[3, 1] = 3
+  unchanged_visits[3, 1] = 1
+
+  merge(Q, [(changed, changed_visits, []), (unchanged, unchanged_visits, [])])
+  assert Q.values[3, 1] == 1.0
+  assert np.count_nonzero(Q.values) == 1
+
+
+def test_resumed_interval_keeps_its_elapsed_time(tmp_path, monkeypatch):
+  clock = iter(range(0, 1000, 10))
+  monkeypatch.setattr(metrics.time, "perf_counter", lambda: next(clock))
+
+  # 2 episodes in 10 s, then the run is paused and the next 2 episodes take another 10 s
+  log = metrics.MetricsLog(tmp_path / "run.csv", interval=4)
+  log.log(0, 1.0, 0.1)
+  log.log(1, 1.0, 0.1)
+  state = log.state()
+  log.close()
+
+  resumed = metrics.MetricsLog(tmp_path / "run.csv", interval=4, state=state)
+  resumed.log(2, 1.0, 0.1)
+  resumed.log(3, 1.0, 0.1)
+  resumed.close()
+
+  rows = metrics.read_log(tmp_path / "run.intervals.csv")
+  assert rows["episodes_per_s"][0] == 0.2
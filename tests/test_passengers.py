@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from Environment.environment import Environment
+from Environment.passengers import grow_ring_buffers
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2, 3])
+def test_compact_passengers_match_person_buffers(seed):
+  env = Environment(render_mode="none", seed=seed)
+  compact = Environment(render_mode="none", seed=seed, compact=True)
+  rng = np.random.default_rng(seed)
+
+  state = env.reset()
+  assert compact.reset() == state
+
+  for _ in range(600):
+    actions = Environment.get_available_actions(state)
+    action = actions[rng.integers(len(actions))]
+
+    state = env.step(action)
+    assert compact.step(action) == state
+    assert compact.get_waiting_persons() == env.get_waiting_persons()
+    assert compact.get_persons_in_cabin() == env.get_persons_in_cabin()
+    assert (compact.delivered, compact.boarded) == (env.delivered, env.boarded)
+
+
+def test_compact_snapshot_restores_the_passengers():
+  env = Environment(render_mode="none", seed=5, compact=True)
+  state = env.reset()
+
+  for _ in range(50):
+    state = env.step(Environment.get_available_actions(state)[-1])
+
+  snapshot = env.snapshot()
+  waiting = env.get_waiting_persons()
+  states = [env.step(Environment.get_available_actions(env.state)[-1]) for _ in range(50)]
+
+  env.restore(snapshot)
+  assert env.get_waiting_persons() == waiting
+  assert [env.step(Environment.get_available_actions(env.state)[-1]) for _ in range(50)] == states
+
+
+@pytest.mark.parametrize("shape", [(3,), (2, 3)])
+def test_grown_ring_buffers_keep_the_order(shape):
+  # Buffers of size 4 with 3 waiting persons which wrap around the end
+  queue = np.tile([30, 0, 10, 20], shape + (1,))
+  queue_head = np.full(shape, 2)
+
+  assert grow_ring_buffers(queue, queue_head, 4) is queue
+  assert (queue_head == 2).all()
+
+  grown = grow_ring_buffers(queue, queue_head, 5)
+  assert grown.shape == shape + (8,)
+  assert (queue_head == 0).all()
+  np.testing.assert_array_equal(grown[..., :3], np.tile([10, 20, 30], shape + (1,)))
@@ -0,0 +1,41 @@
+from pathlib import Path
+import numpy as np
+import pytest
+
+from q_table import QTable, KEYS_FULL_STATE, NUMBER_OF_STATES, convert_text_table, load_table
+
+ROOT = Path(__file__).resolve().parent.parent
+FULL_STATE = f"State: (2, 'none', 'closed', {(False,) * 7}, {(True,) + (False,) * 6})"
+SIMPLIFIED_STATE = "State: (2, 'none', 'closed', False, True, False)"
+
+
+def test_shipped_table_is_a_simplified_table():
+  Q = QTable.load(ROOT / "q_table.qtab")
+  assert Q.values.shape[0] == NUMBER_OF_STATES
+
+
+def test_convert_text_table(tmp_path):
+  (tmp_path / "q_table.txt").write_text(f"{FULL_STATE}\n  door: 1.5\n  noop: -2.0\n")
+
+  assert convert_text_table(tmp_path / "q_table.txt", tmp_path / "q_table.qtab") == 1
+
+  kind, keys, values = load_table(tmp_path / "q_table.qtab")
+  assert kind == KEYS_FULL_STATE
+  np.testing.assert_array_equal(values, [[0, 0, 0, 1.5, -2.0]])
+
+
+def test_convert_text_table_rejects_mixed_states(tmp_path):
+  (tmp_path / "q_table.txt").write_text(f"{SIMPLIFIED_STATE}\n  up: 1.0\n"
+                                        f"{FULL_STATE}\n  up: 1.0\n")
+
+  with pytest.raises(ValueError, match="cannot mix"):
+    convert_text_table(tmp_path / "q_table.txt", tmp_path / "q_table.qtab")
+
+
+def test_batch_update_averages_repeated_pairs():
+  Q = QTable()
+  Q.update_batch(np.array([3, 3, 5]), np.array([1, 1, 0]), np.array([2.0, 4.0, 1.0]), np.array([0, 0, 0]), 0.5, 0.9)
+
+  assert Q.values[3, 1] == pytest.approx(1.5)
+  assert Q.values[5, 0] == pytest.approx(0.5)
+  assert np.count_nonzero(Q.values) == 2
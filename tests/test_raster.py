@@ -0,0 +1,33 @@
+import numpy as np
+import imageio.v3 as iio
+import pytest
+
+from Environment.environment import Environment
+from Environment.recording import FrameRecorder
+
+
+def alternate(state):
+  return Environment.get_available_actions(state)[-1]
+
+
+@pytest.mark.parametrize("frame_skip, scale", [(1, 1), (3, 1), (1, 4)])
+def test_numpy_backend_recording_is_readable(tmp_path, frame_skip, scale):
+  path = tmp_path / "animation.gif"
+  recorder = FrameRecorder(path, frame_skip=frame_skip, scale=scale)
+  env = Environment(render_mode="rgb_array", render_backend="numpy", seed=3, recorder=recorder)
+
+  state = env.reset()
+  frames = []
+  for _ in range(12):
+    frames.append(env.render().copy())
+    state = env.step(alternate(state))
+  env.close()
+
+  recorded = iio.imread(path, index=None)[..., :3]
+  frames = np.stack(frames[::frame_skip])
+  height, width = frames.shape[1] // scale, frames.shape[2] // scale
+
+  assert recorded.shape == (len(frames), height, width, 3)
+
+  if scale == 1:
+    np.testing.assert_array_equal(recorded, frames)
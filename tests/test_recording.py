@@ -0,0 +1,35 @@
+import numpy as np
+import imageio.v3 as iio
+import pytest
+
+from Environment.recording import FrameRecorder
+
+
+def record(path, frames, **kwargs):
+  recorder = FrameRecorder(path, **kwargs)
+  for frame in frames:
+    recorder.append(frame)
+  recorder.close()
+  return iio.imread(path, index=None)[..., :3]
+
+
+@pytest.mark.parametrize("colours", [1, 3, 16, 256])
+def test_gif_round_trip(tmp_path, colours):
+  rng = np.random.default_rng(colours)
+  palette = rng.integers(0, 256, size=(colours, 3), dtype=np.uint8)
+  frames = [palette[rng.integers(0, colours, size=(40, 50))] for _ in range(4)]
+
+  recorded = record(tmp_path / "animation.gif", frames)
+
+  assert recorded.shape == (4, 40, 50, 3)
+  for expected, actual in zip(frames, recorded):
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_gif_frame_skip_and_scale(tmp_path):
+  frames = [np.full((40, 60, 3), 20 * index, dtype=np.uint8) for index in range(6)]
+
+  recorded = record(tmp_path / "animation.gif", frames, frame_skip=2, scale=2)
+
+  assert recorded.shape == (3, 20, 30, 3)
+  np.testing.assert_array_equal(recorded[:, 0, 0, 0], [0, 40, 80])
@@ -0,0 +1,72 @@
+import hashlib
+import os
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+pytest.importorskip("pygame")
+
+from Environment.environment import Environment
+
+# SHA-256 of the first 40 frames of the trajectory below, drawn by the renderer before the static layers were cached
+# (with pygame 2.6 and its bundled default font). The frames show waiting persons, passengers, open doors and
+# pressed buttons.
+REFERENCE_FRAMES = "c9d583d201ea9e5101606d32bc7654b762d26e63231af17a686e73240fdb39e7"
+
+
+def frames(env, count=40, seed=7):
+  state = env.reset()
+  rng = np.random.default_rng(seed)
+
+  for _ in range(count):
+    yield env.render()
+
+    actions = Environment.get_available_actions(state)
+    state = env.step(actions[rng.integers(len(actions))])
+
+
+def test_frames_match_the_reference_renderer():
+  env = Environment(render_mode="rgb_array", seed=7)
+  digest = hashlib.sha256()
+
+  for frame in frames(env):
+    digest.update(frame.tobytes())
+
+  env.close()
+  assert digest.hexdigest() == REFERENCE_FRAMES
+
+
+def test_cached_layers_render_the_same_frames():
+  env = Environment(render_mode="rgb_array", seed=7)
+
+  for frame in frames(env):
+    frame = frame.copy()
+
+    # Rebuilding the background, font and text surfaces draws the frame from scratch
+    env._build_render_cache()
+    np.testing.assert_array_equal(env.render(), frame)
+
+  env.close()
+
+
+class ListRecorder:
+  def __init__(self):
+    self.frames = []
+
+  def append(self, frame):
+    self.frames.append(frame)
+
+  def close(self):
+    pass
+
+
+def test_recorder_gets_the_returned_frame():
+  recorder = ListRecorder()
+  env = Environment(render_mode="rgb_array", seed=7, recorder=recorder)
+
+  returned = list(frames(env, count=5))
+  env.close()
+
+  assert all(recorded is frame for recorded, frame in zip(recorder.frames, returned))
+  assert len(recorder.frames) == 5
@@ -0,0 +1,51 @@
+import numpy as np
+
+from Environment.environment import Environment
+from Environment.traffic import OFFICE_DAY, DAY_LENGTH
+
+# 8 o'clock, the arrivals ramp up towards the morning peak
+START_TIME = DAY_LENGTH * 8 // 24
+STEPS = 360
+
+
+def arrivals_per_step(arrival_block, episodes):
+  counts = np.zeros((episodes, STEPS))
+
+  for episode in range(episodes):
+    env = Environment(render_mode="none", compact=True, traffic=OFFICE_DAY, start_time=START_TIME,
+                      arrival_block=arrival_block, seed=episode)
+    state = env.reset()
+
+    for step in range(STEPS):
+      spawned = env.person_counter
+      state = env.step(Environment.get_available_actions(state)[0])
+      counts[episode, step] = env.person_counter - spawned
+
+  return counts
+
+
+def test_arrival_stream_follows_the_clock_of_the_environment():
+  env = Environment(render_mode="none", traffic=OFFICE_DAY, start_time=START_TIME, arrival_block=64, seed=1)
+
+  for _ in range(5):
+    env.reset()
+    assert env.arrivals.time + env.arrivals.cursor == env.start_time + env.time
+
+    for _ in range(100):
+      env.step(Environment.get_available_actions(env.state)[0])
+
+    assert env.arrivals.time + env.arrivals.cursor == env.start_time + env.time
+
+
+def test_block_and_stepped_arrivals_agree_under_office_day():
+  episodes = 150
+  periods = [OFFICE_DAY.period(START_TIME + step) for step in range(STEPS)]
+  expected = OFFICE_DAY.probabilities[periods].sum(axis=1)
+
+  for arrival_block in (None, 100):
+    counts = arrivals_per_step(arrival_block, episodes)
+
+    # The arrivals per step are compared with the schedule in windows of 60 steps
+    observed = counts.reshape(episodes, -1, 60).sum(axis=2)
+    error = observed.std(axis=0, ddof=1) / np.sqrt(episodes)
+    np.testing.assert_array_less(np.abs(observed.mean(axis=0) - expected.reshape(-1, 60).sum(axis=1)), 4 * error)
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from Environment.constants import *
+from Environment.environment import Environment
+from Environment.vector_environment import VectorEnvironment
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_single_lane_reproduces_environment(seed):
+  env = Environment(render_mode="none", seed=seed)
+  venv = VectorEnvironment(1, seed=seed)
+  rng = np.random.default_rng(seed)
+
+  state = env.reset()
+  assert venv.get_state(0) == state
+
+  for _ in range(400):
+    actions = Environment.get_available_actions(state)
+    action = actions[rng.integers(len(actions))]
+
+    state = env.step(action)
+    venv.step(np.array([ACTIONS.index(action)]))
+
+    assert venv.get_state(0) == state
+    assert venv.delivered[0] == env.delivered
+    assert venv.get_active_persons()[0] == env.get_active_persons()
+
+
+def test_lanes_reset_after_episode_length():
+  venv = VectorEnvironment(8, episode_length=5, seed=3)
+
+  for step in range(5):
+    states, dones = venv.step(np.argmax(VectorEnvironment.get_available_actions(venv.get_states()), axis=1))
+
+  assert dones.all()
+  np.testing.assert_array_equal(venv.elapsed, 0)